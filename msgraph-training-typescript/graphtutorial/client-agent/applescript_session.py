@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""
+Persistent AppleScript session for macOS
+Keeps one interpreter process alive and feeds it scripts over a pipe, so each
+Outlook operation pays for script execution instead of an osascript cold start.
+Registered templates are compiled once and then only run with new arguments.
+AsyncAppleScriptSession drives a pool of the same workers from asyncio.
+"""
+
+import asyncio
+import json
+import os
+import selectors
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from applescript_templates import ScriptTemplate
+from bridge_metrics import metrics
+from mail_index import default_cache_dir
+
+
+# JXA worker run by osascript. It reads framed JSON requests from stdin,
+# executes AppleScript with NSAppleScript and writes framed replies. Requests:
+#   {"op": "exec", "source": ...}                   compile and run source once
+#   {"op": "call", "key", "source", "path", "argv"}  run a template's `on run argv`
+#     handler; the compiled script is kept per key, loaded from the precompiled
+#     .scpt at path when present, otherwise compiled from source
+#   {"op": "load", "key", "source", "path"}          load a template without running it
+#   {"op": "ping"}
+#
+# Request frame:  "<byte length>\n<json payload>"
+# Reply frame:    "<OK|ERR> <byte length>\n<utf-8 payload>"
+WORKER_SOURCE = r'''
+ObjC.import('Foundation');
+
+function readLine(input) {
+    var bytes = [];
+    while (true) {
+        var chunk = input.readDataOfLength(1);
+        if (chunk.length === 0) {
+            return bytes.length ? bytes.join('') : null;
+        }
+        var ch = $.NSString.alloc.initWithDataEncoding(chunk, $.NSUTF8StringEncoding).js;
+        if (ch === '\n') {
+            return bytes.join('');
+        }
+        bytes.push(ch);
+    }
+}
+
+function reply(output, status, text) {
+    var data = $(text).dataUsingEncoding($.NSUTF8StringEncoding);
+    var header = $(status + ' ' + data.length + '\n').dataUsingEncoding($.NSUTF8StringEncoding);
+    output.writeData(header);
+    output.writeData(data);
+}
+
+function describe(result, error) {
+    if (!result || result.isNil()) {
+        var message = error[0] ? error[0].objectForKey('NSAppleScriptErrorMessage') : null;
+        return ['ERR', message ? ObjC.unwrap(message) : 'AppleScript execution failed'];
+    }
+    var text = result.stringValue;
+    return ['OK', text && !text.isNil() ? text.js : ''];
+}
+
+function execute(source) {
+    var script = $.NSAppleScript.alloc.initWithSource($(source));
+    var error = Ref();
+    return describe(script.executeAndReturnError(error), error);
+}
+
+var compiled = {};
+
+function load(request) {
+    var script = compiled[request.key];
+    if (script) {
+        return [script, null];
+    }
+    var error = Ref();
+    if (request.path) {
+        script = $.NSAppleScript.alloc.initWithContentsOfURLError(
+            $.NSURL.fileURLWithPath($(request.path)), error);
+    }
+    if (!script || script.isNil()) {
+        script = $.NSAppleScript.alloc.initWithSource($(request.source));
+        if (!script.compileAndReturnError(error)) {
+            return [null, describe(null, error)[1]];
+        }
+    }
+    compiled[request.key] = script;
+    return [script, null];
+}
+
+function call(request) {
+    var loaded = load(request);
+    if (!loaded[0]) {
+        return ['ERR', loaded[1]];
+    }
+    // 'aevt'/'oapp' with a list direct parameter invokes `on run argv`
+    var args = $.NSAppleEventDescriptor.listDescriptor;
+    request.argv.forEach(function (value, i) {
+        args.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString($(String(value))), i + 1);
+    });
+    var event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        0x61657674, 0x6f617070, $.NSAppleEventDescriptor.currentProcessDescriptor, -1, 0);
+    event.setParamDescriptorForKeyword(args, 0x2d2d2d2d);
+    var error = Ref();
+    return describe(loaded[0].executeAppleEventError(event, error), error);
+}
+
+function run() {
+    var input = $.NSFileHandle.fileHandleWithStandardInput;
+    var output = $.NSFileHandle.fileHandleWithStandardOutput;
+    while (true) {
+        var header = readLine(input);
+        if (header === null) {
+            return;
+        }
+        var length = parseInt(header, 10);
+        var body = $.NSString.alloc.initWithDataEncoding(
+            input.readDataOfLength(length), $.NSUTF8StringEncoding).js;
+        var request;
+        try {
+            request = JSON.parse(body);
+        } catch (e) {
+            reply(output, 'ERR', 'Malformed request: ' + e);
+            continue;
+        }
+        if (request.op === 'ping') {
+            reply(output, 'OK', 'pong');
+        } else if (request.op === 'exec') {
+            var outcome = execute(request.source);
+            reply(output, outcome[0], outcome[1]);
+        } else if (request.op === 'call') {
+            var outcome = call(request);
+            reply(output, outcome[0], outcome[1]);
+        } else if (request.op === 'load') {
+            var loaded = load(request);
+            reply(output, loaded[0] ? 'OK' : 'ERR', loaded[0] ? '' : loaded[1]);
+        } else {
+            reply(output, 'ERR', 'Unknown op: ' + request.op);
+        }
+    }
+}
+'''
+
+# Environment override for the worker command, e.g. a stand-in interpreter
+# that speaks the same framing protocol when running off macOS
+# (stand_in_worker.py answers from a synthetic mailbox).
+WORKER_COMMAND_ENV = "OUTLOOK_SCRIPT_WORKER"
+
+
+class SessionError(Exception):
+    """Raised when the worker process dies or violates the framing protocol."""
+
+
+def default_worker_command() -> List[str]:
+    """Return the command used to launch the AppleScript worker."""
+    override = os.environ.get(WORKER_COMMAND_ENV)
+    if override:
+        return shlex.split(override)
+    return ['osascript', '-l', 'JavaScript', '-e', WORKER_SOURCE]
+
+
+def compiled_script_dir() -> str:
+    """Return the directory holding precompiled template scripts."""
+    return os.path.join(default_cache_dir(), "scripts")
+
+
+def compile_template(template: ScriptTemplate) -> Optional[str]:
+    """
+    Compile a template to <cache>/scripts/<key>.scpt with osacompile, once per machine.
+
+    Returns:
+        Path of the compiled script, or None if osacompile is unavailable or
+        compilation failed (the worker then compiles from source itself)
+    """
+    path = os.path.join(compiled_script_dir(), f"{template.key}.scpt")
+    if os.path.exists(path):
+        return path
+    if shutil.which('osacompile') is None:
+        return None
+
+    os.makedirs(compiled_script_dir(), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.scpt"
+    with metrics.span('compile', template.name):
+        result = subprocess.run(
+            ['osacompile', '-o', tmp_path, '-e', template.source],
+            capture_output=True,
+            text=True
+        )
+    if result.returncode != 0:
+        print(f"Error compiling {template.name}: {result.stderr.strip()}", file=sys.stderr)
+        return None
+    os.replace(tmp_path, path)
+    return path
+
+
+def _strip_output(text: str) -> str:
+    """Trim surrounding whitespace but keep the ASCII separators str.strip() would also drop."""
+    return text.strip(' \t\r\n')
+
+
+def encode_request(payload: dict) -> bytes:
+    """Frame a request payload for the worker."""
+    body = json.dumps(payload).encode('utf-8')
+    return str(len(body)).encode('ascii') + b'\n' + body
+
+
+def is_safe_to_resend(payload: dict) -> bool:
+    """
+    Return True if a request the worker may already have run can be sent to a new one.
+
+    Pings and loads only compile; calls are safe when their template and
+    arguments cannot open anything (see deadline_scheduler.is_safe_to_retry).
+    Free-form scripts may do anything and never are.
+    """
+    # deadline_scheduler builds on this module, so it is imported here
+    from deadline_scheduler import is_safe_to_retry
+
+    if payload['op'] in ('ping', 'load'):
+        return True
+    if payload['op'] == 'call':
+        return is_safe_to_retry(payload.get('name', ''), payload.get('argv'))
+    return False
+
+
+class ScriptBackend:
+    """
+    What the Outlook managers run scripts through.
+
+    AppleScriptSession talks to Outlook; synthetic_mailbox.SyntheticBackend
+    answers the same templates from generated data, so everything above the
+    bridge can be exercised and measured without a Mac.
+    """
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Execute AppleScript source; returns its output or None if execution failed."""
+        raise NotImplementedError
+
+    def call(self, template: ScriptTemplate, argv: Optional[List[str]] = None,
+             timeout: Optional[float] = None) -> Optional[str]:
+        """Run a registered template with arguments; returns its output or None if it failed."""
+        raise NotImplementedError
+
+    def fork(self) -> Optional['ScriptBackend']:
+        """
+        Return another backend of the same kind that can run calls concurrently
+        with this one, or None if the backend cannot run calls in parallel.
+        """
+        return None
+
+    def cancel(self):
+        """Abort the call in progress, if any, from another thread."""
+
+    def close(self):
+        """Release the backend's resources."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AppleScriptSession(ScriptBackend):
+    """A long-lived AppleScript interpreter reused across calls."""
+
+    def __init__(self, command: Optional[List[str]] = None, timeout: Optional[float] = 30.0,
+                 max_restarts: int = 1):
+        """
+        Initialize the session. The worker is started lazily on first use.
+
+        Args:
+            command: Worker command line (default: osascript running WORKER_SOURCE)
+            timeout: Seconds to wait for a reply before killing the worker
+            max_restarts: How many times a call may restart a crashed worker
+        """
+        self.command = command or default_worker_command()
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self._process: Optional[subprocess.Popen] = None
+        self._buffer = b''
+        self._lock = threading.Lock()
+        self._compiled_paths = {}
+        # Template keys the current worker has loaded (tracked only while profiling)
+        self._loaded = set()
+        self._cancelled = False
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Execute AppleScript source in the worker.
+
+        Args:
+            script: The AppleScript code to execute
+            timeout: Per-call override of the session timeout
+
+        Returns:
+            The output of the script or None if execution failed
+        """
+        status, text = self.request({'op': 'exec', 'source': script}, timeout=timeout)
+        if status != 'OK':
+            print(f"Error executing AppleScript: {text}", file=sys.stderr)
+            return None
+        return _strip_output(text)
+
+    def call(self, template: ScriptTemplate, argv: Optional[List[str]] = None,
+             timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Run a registered template's `on run argv` handler with arguments.
+
+        The template is compiled at most once per worker (from a precompiled
+        .scpt when available), so repeated calls only pay for execution. While
+        metrics are enabled the worker loads it in a separate request first, so
+        compilation and execution are timed apart.
+
+        Args:
+            template: The template to run
+            argv: String arguments passed to the run handler
+            timeout: Per-call override of the session timeout
+
+        Returns:
+            The output of the script or None if execution failed
+        """
+        if template.key not in self._compiled_paths:
+            self._compiled_paths[template.key] = compile_template(template)
+
+        if metrics.enabled and template.key not in self._loaded:
+            status, _ = self.request({
+                'op': 'load',
+                'name': template.name,
+                'key': template.key,
+                'source': template.source,
+                'path': self._compiled_paths[template.key],
+            }, timeout=timeout)
+            if status == 'OK':
+                self._loaded.add(template.key)
+
+        status, text = self.request({
+            'op': 'call',
+            'name': template.name,
+            'key': template.key,
+            'source': template.source,
+            'path': self._compiled_paths[template.key],
+            'argv': [str(arg) for arg in (argv or [])],
+        }, timeout=timeout)
+        if status != 'OK':
+            if not self._cancelled:
+                print(f"Error executing AppleScript {template.name}: {text}", file=sys.stderr)
+            return None
+        return _strip_output(text)
+
+    def request(self, payload: dict, timeout: Optional[float] = None) -> Tuple[str, str]:
+        """
+        Send one framed request and return the (status, text) reply.
+
+        A worker that has exited or broken the protocol is restarted and the
+        request retried, up to max_restarts times, but only if the request
+        never reached it or is safe to run twice (see is_safe_to_resend()): a
+        worker dying after it read an open must not make it open twice.
+        """
+        frame = encode_request(payload)
+        deadline_budget = self.timeout if timeout is None else timeout
+        operation = payload.get('name', payload['op'])
+
+        with self._lock:
+            self._cancelled = False
+            attempts = 0
+            while True:
+                sent = False
+                try:
+                    self._ensure_started(operation, deadline_budget)
+                    span = (metrics.span('compile', operation) if payload['op'] == 'load'
+                            else metrics.execute(operation))
+                    with span:
+                        self._process.stdin.write(frame)
+                        self._process.stdin.flush()
+                        sent = True
+                        return self._read_reply(deadline_budget)
+                except subprocess.TimeoutExpired:
+                    self._stop()
+                    return 'ERR', 'AppleScript timeout'
+                except (BrokenPipeError, OSError, SessionError) as e:
+                    self._stop()
+                    if self._cancelled:
+                        return 'ERR', 'AppleScript call cancelled'
+                    if attempts >= self.max_restarts:
+                        return 'ERR', f'AppleScript worker failed: {e}'
+                    if sent and not is_safe_to_resend(payload):
+                        return 'ERR', f'AppleScript worker failed after the request was sent: {e}'
+                    attempts += 1
+
+    def fork(self) -> 'AppleScriptSession':
+        """Return a session with its own worker process, sharing this one's compiled templates."""
+        forked = AppleScriptSession(self.command, self.timeout, self.max_restarts)
+        forked._compiled_paths = self._compiled_paths
+        return forked
+
+    def cancel(self):
+        """
+        Abort the call in progress by killing the worker; safe from any thread.
+
+        The interrupted call returns an error instead of restarting the worker,
+        and the next call starts a new one.
+        """
+        self._cancelled = True
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def close(self):
+        """Stop the worker process."""
+        with self._lock:
+            self._stop()
+
+    def _ensure_started(self, operation: str = '', timeout: Optional[float] = None):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._stop()
+        with metrics.span('spawn', operation):
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=None,
+                bufsize=0
+            )
+            if metrics.enabled:
+                # Include interpreter startup: the worker is ready once it answers
+                self._process.stdin.write(encode_request({'op': 'ping'}))
+                self._process.stdin.flush()
+                self._read_reply(timeout)
+
+    def _stop(self):
+        process, self._process = self._process, None
+        self._buffer = b''
+        self._loaded.clear()
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+
+    def _read_until(self, predicate, deadline: Optional[float]) -> None:
+        """Read from the worker until predicate(buffer) holds."""
+        stdout = self._process.stdout
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout, selectors.EVENT_READ)
+            while not predicate(self._buffer):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.command[0], self.timeout)
+                if not selector.select(remaining):
+                    continue
+                chunk = os.read(stdout.fileno(), 65536)
+                if not chunk:
+                    raise SessionError('worker exited')
+                self._buffer += chunk
+
+    def _read_reply(self, timeout: Optional[float]) -> Tuple[str, str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        self._read_until(lambda buf: b'\n' in buf, deadline)
+        header, self._buffer = self._buffer.split(b'\n', 1)
+        try:
+            status, length = header.decode('ascii').split(' ', 1)
+            length = int(length)
+        except ValueError:
+            raise SessionError(f'malformed reply header {header[:40]!r}')
+
+        self._read_until(lambda buf: len(buf) >= length, deadline)
+        body, self._buffer = self._buffer[:length], self._buffer[length:]
+        return status, body.decode('utf-8', errors='replace')
+
+
+def _parse_reply_header(header: bytes) -> Tuple[str, int]:
+    """Split a reply header line into (status, payload length)."""
+    try:
+        status, length = header.decode('ascii').rstrip('\n').split(' ', 1)
+        return status, int(length)
+    except ValueError:
+        raise SessionError(f'malformed reply header {header[:40]!r}')
+
+
+class _AsyncWorker:
+    """One worker process driven through asyncio pipes."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    async def send(self, frame: bytes):
+        self.process.stdin.write(frame)
+        await self.process.stdin.drain()
+
+    async def receive(self) -> Tuple[str, str]:
+        try:
+            status, length = _parse_reply_header(await self.process.stdout.readuntil(b'\n'))
+            body = await self.process.stdout.readexactly(length)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            raise SessionError(f'worker exited: {e}')
+        return status, body.decode('utf-8', errors='replace')
+
+    async def kill(self):
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        await self.process.wait()
+
+
+class AsyncAppleScriptSession:
+    """
+    A pool of AppleScript workers driven from asyncio.
+
+    Each worker runs one request at a time, so `workers` bounds how many calls
+    are in flight; further calls wait for a free worker. A call that times out
+    or is cancelled kills its worker (its reply would desynchronise the pipe)
+    and a fresh one is started on demand.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, workers: int = 2,
+                 timeout: Optional[float] = 30.0, max_restarts: int = 1):
+        """
+        Initialize the pool. Workers are started lazily.
+
+        Args:
+            command: Worker command line (default: osascript running WORKER_SOURCE)
+            workers: Maximum number of worker processes, i.e. concurrent calls
+            timeout: Default deadline in seconds for a call, including the wait for a worker
+            max_restarts: How many times a call may restart a crashed worker
+        """
+        self.command = command or default_worker_command()
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self._semaphore = asyncio.Semaphore(workers)
+        self._idle: List[_AsyncWorker] = []
+        self._busy = set()
+        self._compiled_paths = {}
+
+    async def run(self, script: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Execute AppleScript source; see AppleScriptSession.run()."""
+        status, text = await self.request({'op': 'exec', 'source': script}, timeout=timeout)
+        if status != 'OK':
+            print(f"Error executing AppleScript: {text}", file=sys.stderr)
+            return None
+        return _strip_output(text)
+
+    async def call(self, template: ScriptTemplate, argv: Optional[List[str]] = None,
+                   timeout: Optional[float] = None) -> Optional[str]:
+        """Run a registered template with arguments; see AppleScriptSession.call()."""
+        if template.key not in self._compiled_paths:
+            self._compiled_paths[template.key] = await asyncio.get_running_loop().run_in_executor(
+                None, compile_template, template)
+
+        status, text = await self.request({
+            'op': 'call',
+            'name': template.name,
+            'key': template.key,
+            'source': template.source,
+            'path': self._compiled_paths[template.key],
+            'argv': [str(arg) for arg in (argv or [])],
+        }, timeout=timeout)
+        if status != 'OK':
+            print(f"Error executing AppleScript {template.name}: {text}", file=sys.stderr)
+            return None
+        return _strip_output(text)
+
+    async def request(self, payload: dict, timeout: Optional[float] = None) -> Tuple[str, str]:
+        """
+        Send one framed request on a free worker and return the (status, text) reply.
+
+        The deadline covers waiting for a worker as well as the reply. On
+        timeout ('ERR', 'AppleScript timeout') is returned; cancellation
+        propagates to the caller after the worker has been stopped.
+        """
+        frame = encode_request(payload)
+        budget = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._request(frame, payload.get('name', payload['op']),
+                                                        is_safe_to_resend(payload)), budget)
+        except asyncio.TimeoutError:
+            return 'ERR', 'AppleScript timeout'
+
+    async def close(self):
+        """Stop all worker processes."""
+        workers, self._idle = self._idle + list(self._busy), []
+        self._busy.clear()
+        for worker in workers:
+            await worker.kill()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _request(self, frame: bytes, operation: str = '', resendable: bool = False) -> Tuple[str, str]:
+        async with self._semaphore:
+            attempts = 0
+            while True:
+                worker = self._idle.pop() if self._idle else await self._start(operation)
+                self._busy.add(worker)
+                sent = False
+                try:
+                    with metrics.execute(operation):
+                        await worker.send(frame)
+                        sent = True
+                        reply = await worker.receive()
+                except (BrokenPipeError, ConnectionError, OSError, SessionError) as e:
+                    self._busy.discard(worker)
+                    await worker.kill()
+                    if attempts >= self.max_restarts:
+                        return 'ERR', f'AppleScript worker failed: {e}'
+                    if sent and not resendable:
+                        # Like AppleScriptSession.request(): the worker may have run it already
+                        return 'ERR', f'AppleScript worker failed after the request was sent: {e}'
+                    attempts += 1
+                    continue
+                except BaseException:
+                    # Timeout or cancellation mid-request: the reply may still arrive
+                    self._busy.discard(worker)
+                    await asyncio.shield(worker.kill())
+                    raise
+                self._busy.discard(worker)
+                self._idle.append(worker)
+                return reply
+
+    async def _start(self, operation: str = '') -> _AsyncWorker:
+        with metrics.span('spawn', operation):
+            process = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=None,
+                limit=2 ** 24
+            )
+            worker = _AsyncWorker(process)
+            if metrics.enabled:
+                # Include interpreter startup: the worker is ready once it answers
+                await worker.send(encode_request({'op': 'ping'}))
+                await worker.receive()
+        return worker
@@ -0,0 +1,838 @@
+#!/usr/bin/env python3
+"""
+AppleScript template registry
+Every script the Outlook managers run is a fixed source with an `on run argv`
+handler. User input travels as arguments, never spliced into source, so each
+template compiles once (keyed by a hash of its source) and is reused.
+"""
+
+import hashlib
+from typing import Dict, List
+
+
+OUTLOOK_APP = "Microsoft Outlook"
+
+# ASCII unit/record separators delimiting fields and records in script output
+FIELD_SEPARATOR = '\x1f'
+RECORD_SEPARATOR = '\x1e'
+
+# Version tag opening every record frame (see bridge_records)
+RECORD_FORMAT = "R1"
+
+# Marker returned by scripts that were handed a folder id Outlook no longer knows
+STALE_FOLDER = "STALEFOLDER"
+
+
+class ScriptTemplate:
+    """An AppleScript source with an `on run argv` handler, identified by its content hash."""
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        self.key = hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+    def __repr__(self):
+        return f"ScriptTemplate({self.name!r}, key={self.key})"
+
+
+def folder_groups_arg(groups: List[List[int]]) -> str:
+    """Encode folder id groups as the argument parsed by parseFolderGroups ("1,2;;3")."""
+    return ";".join(",".join(str(int(folder_id)) for folder_id in group) for group in groups)
+
+
+def flag_arg(value: bool) -> str:
+    """Encode a boolean argument."""
+    return "1" if value else "0"
+
+
+# Sets epochDate/gmtOffset (for Unix timestamps), fieldSep/recordSep and the
+# frameHeader every record frame starts with
+_PRELUDE = '''
+    set epochDate to current date
+    set year of epochDate to 1970
+    set month of epochDate to January
+    set day of epochDate to 1
+    set time of epochDate to 0
+    set gmtOffset to time to GMT
+    set fieldSep to character id 31
+    set recordSep to character id 30
+    set frameHeader to "''' + RECORD_FORMAT + '''" & fieldSep
+'''
+
+# Turns "1,2;;3" into {{1, 2}, {}, {3}}
+_PARSE_FOLDER_GROUPS = '''
+on parseFolderGroups(spec)
+    set savedDelimiters to AppleScript's text item delimiters
+    set folderGroups to {}
+    set AppleScript's text item delimiters to ";"
+    set groupSpecs to text items of spec
+    repeat with groupSpec in groupSpecs
+        set folderIds to {}
+        if (contents of groupSpec) is not "" then
+            set AppleScript's text item delimiters to ","
+            repeat with folderId in text items of (contents of groupSpec)
+                set end of folderIds to (folderId as integer)
+            end repeat
+            set AppleScript's text item delimiters to ";"
+        end if
+        set end of folderGroups to folderIds
+    end repeat
+    set AppleScript's text item delimiters to savedDelimiters
+    return folderGroups
+end parseFolderGroups
+'''
+
+# Message-ID of a message's header block (its `headers`, never the whole
+# `source`), without angle brackets; "" if it has none. Only fields before the
+# first blank line are read and folded values are unfolded, so an id quoted in
+# the body or in another field (In-Reply-To, X-Original-Message-ID) never
+# counts. messageIdMatches compares it exactly, case included.
+_MESSAGE_ID_OF = '''
+on messageIdOf(msgHeader)
+    set headerLines to paragraphs of msgHeader
+    set lineCount to count of headerLines
+    repeat with i from 1 to lineCount
+        set headerLine to item i of headerLines
+        if headerLine is "" then exit repeat
+        if headerLine starts with "Message-ID:" then
+            set idValue to ""
+            if (length of headerLine) > 11 then set idValue to text 12 thru -1 of headerLine
+            repeat while i < lineCount
+                set nextLine to item (i + 1) of headerLines
+                if not (nextLine starts with space or nextLine starts with tab) then exit repeat
+                set idValue to idValue & nextLine
+                set i to i + 1
+            end repeat
+            return my trimMessageId(idValue)
+        end if
+    end repeat
+    return ""
+end messageIdOf
+
+on trimMessageId(idValue)
+    set trimChars to {space, tab, "<", ">"}
+    repeat while idValue is not "" and (character 1 of idValue) is in trimChars
+        if (length of idValue) is 1 then return ""
+        set idValue to text 2 thru -1 of idValue
+    end repeat
+    repeat while idValue is not "" and (character -1 of idValue) is in trimChars
+        if (length of idValue) is 1 then return ""
+        set idValue to text 1 thru -2 of idValue
+    end repeat
+    return idValue
+end trimMessageId
+
+on messageIdMatches(msgHeader, wantedId)
+    set foundId to my messageIdOf(msgHeader)
+    considering case
+        return foundId is wantedId
+    end considering
+end messageIdMatches
+'''
+
+
+_SOURCES: Dict[str, str] = {}
+
+_SOURCES['is_outlook_running'] = '''
+on run argv
+    tell application "System Events"
+        return (name of processes) contains "{app}"
+    end tell
+end run
+'''
+
+_SOURCES['activate'] = '''
+on run argv
+    tell application "{app}" to activate
+    return "SUCCESS"
+end run
+'''
+
+# argv: message id
+_SOURCES['open_message'] = '''
+on run argv
+    tell application "{app}"
+        try
+            set theMessage to message id ((item 1 of argv) as integer)
+            open theMessage
+            activate
+            return "SUCCESS"
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: message id, Internet Message-ID it must still carry
+_SOURCES['open_verified_message'] = _MESSAGE_ID_OF + '''
+on run argv
+    set msgIdToFind to item 2 of argv
+    tell application "{app}"
+        try
+            set theMessage to message id ((item 1 of argv) as integer)
+            if not my messageIdMatches(headers of theMessage, msgIdToFind) then return "STALE"
+            open theMessage
+            activate
+            return "SUCCESS"
+        on error
+            return "STALE"
+        end try
+    end tell
+end run
+'''
+
+_SOURCES['list_folders'] = '''
+on run argv
+''' + _PRELUDE + '''
+    tell application "{app}"
+        set folderInfo to {}
+        try
+            repeat with aFolder in (get every mail folder)
+                set end of folderInfo to (name of aFolder) & fieldSep & (count messages of aFolder)
+            end repeat
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to folderInfo as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "folders" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+_SOURCES['list_folder_ids'] = '''
+on run argv
+''' + _PRELUDE + '''
+    tell application "{app}"
+        try
+            set folderInfo to {}
+            set allFolders to every mail folder
+            set folderIds to id of every mail folder
+            set folderNames to name of every mail folder
+
+            repeat with i from 1 to count of folderIds
+                set accountName to ""
+                try
+                    set accountName to name of account of item i of allFolders
+                end try
+                set end of folderInfo to ((item i of folderIds) as string) & fieldSep & (item i of folderNames) & fieldSep & accountName
+            end repeat
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to folderInfo as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "folder_ids" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# Change markers of every folder from three bulk reads, where list_folders
+# counts the messages of each folder in turn
+_SOURCES['folder_markers'] = '''
+on run argv
+''' + _PRELUDE + '''
+    tell application "{app}"
+        try
+            set markerRecords to {}
+            set folderIds to id of every mail folder
+            set folderNames to name of every mail folder
+            set unreadCounts to unread count of every mail folder
+
+            repeat with i from 1 to count of folderIds
+                set end of markerRecords to ((item i of folderIds) as string) & fieldSep & (item i of folderNames) & fieldSep & ((item i of unreadCounts) as string)
+            end repeat
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to markerRecords as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "markers" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups
+_SOURCES['folder_counts'] = _PARSE_FOLDER_GROUPS + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderIds to item 1 of my parseFolderGroups(item 1 of argv)
+
+    tell application "{app}"
+        try
+            set countRecords to {}
+            repeat with folderId in folderIds
+                set aFolder to missing value
+                try
+                    set aFolder to mail folder id folderId
+                on error
+                    return "STALEFOLDER"
+                end try
+                set end of countRecords to ((contents of folderId) as string) & fieldSep & (count messages of aFolder)
+            end repeat
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to countRecords as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "counts" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups, subject, exact flag, Internet Message-ID (or ""), policy ("first"/"newest"),
+# optionally an open flag ("0" only reports the match). The frame's header carries the
+# match's received time as a Unix timestamp.
+_SOURCES['search_and_open'] = _PARSE_FOLDER_GROUPS + _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderGroups to my parseFolderGroups(item 1 of argv)
+    set searchSubject to item 2 of argv
+    set exactMatch to (item 3 of argv is "1")
+    set msgIdToFind to item 4 of argv
+    set searchPolicy to item 5 of argv
+    set openFound to true
+    if (count of argv) > 5 then set openFound to (item 6 of argv is "1")
+
+    tell application "{app}"
+        try
+            set foundMessage to missing value
+            set foundGroup to 0
+            set foundDate to missing value
+            set matchedById to false
+            set staleFolder to false
+
+            -- Folder groups arrive in priority order, one id list per requested name
+            repeat with groupIndex from 1 to count of folderGroups
+                repeat with folderId in item groupIndex of folderGroups
+                    set aFolder to missing value
+                    try
+                        set aFolder to mail folder id folderId
+                    on error
+                        set staleFolder to true
+                    end try
+                    if aFolder is not missing value then
+                        -- Get messages matching criteria
+                        if exactMatch then
+                            set matchingMessages to (messages of aFolder whose subject is searchSubject)
+                        else
+                            set matchingMessages to (messages of aFolder whose subject contains searchSubject)
+                        end if
+
+                        if (count of matchingMessages) > 0 then
+                            set candidate to missing value
+                            set candidateById to false
+
+                            -- If we have an Internet Message-ID, find the exact match
+                            if msgIdToFind is not "" then
+                                repeat with aMessage in matchingMessages
+                                    try
+                                        if my messageIdMatches(headers of aMessage, msgIdToFind) then
+                                            set candidate to contents of aMessage
+                                            set candidateById to true
+                                            exit repeat
+                                        end if
+                                    end try
+                                end repeat
+                            end if
+
+                            -- Without a Message-ID match, use the first match
+                            if candidate is missing value then
+                                set candidate to item 1 of matchingMessages
+                            end if
+
+                            set candidateDate to time received of candidate
+                            if foundMessage is missing value or (candidateById and not matchedById) or ((candidateById is matchedById) and candidateDate > foundDate) then
+                                set foundMessage to candidate
+                                set foundGroup to groupIndex
+                                set foundDate to candidateDate
+                                set matchedById to candidateById
+                            end if
+                        end if
+                    end if
+                end repeat
+
+                -- Early exit: the first folder name with a match wins
+                if searchPolicy is "first" and foundMessage is not missing value then exit repeat
+            end repeat
+
+            -- Open the message
+            if foundMessage is not missing value then
+                if openFound then
+                    open foundMessage
+                    activate
+                end if
+                set msgSender to sender of foundMessage
+                set receivedAt to (foundDate - epochDate) - gmtOffset
+                return frameHeader & "opened" & fieldSep & (receivedAt as string) & recordSep & foundGroup & fieldSep & (id of foundMessage) & fieldSep & matchedById & fieldSep & (foundDate as string) & fieldSep & (address of msgSender) & fieldSep & (subject of foundMessage)
+            end if
+
+            if staleFolder then return "STALEFOLDER"
+            return "NOTFOUND"
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups, strategy ("exact"/"contains"/"any"), subject, sender (or ""),
+# window start and end as Unix timestamps, open-newest flag
+_SOURCES['planned_search'] = _PARSE_FOLDER_GROUPS + _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderGroups to my parseFolderGroups(item 1 of argv)
+    set matchMode to item 2 of argv
+    set searchSubject to item 3 of argv
+    set senderFilter to item 4 of argv
+    set windowStart to epochDate + gmtOffset + ((item 5 of argv) as number)
+    set windowEnd to epochDate + gmtOffset + ((item 6 of argv) as number)
+    set openNewest to (item 7 of argv is "1")
+
+    tell application "{app}"
+        try
+            set searchResults to {}
+            set newestId to missing value
+            set newestDate to missing value
+            set staleFolder to false
+
+            repeat with groupIndex from 1 to count of folderGroups
+                repeat with folderId in item groupIndex of folderGroups
+                    set aFolder to missing value
+                    try
+                        set aFolder to mail folder id folderId
+                    on error
+                        set staleFolder to true
+                    end try
+                    if aFolder is not missing value then
+                        -- Outlook evaluates the whose clause; only matches cross the bridge
+                        if matchMode is "exact" then
+                            set matches to a reference to (messages of aFolder whose subject is searchSubject and time received >= windowStart and time received < windowEnd)
+                        else if matchMode is "contains" then
+                            set matches to a reference to (messages of aFolder whose subject contains searchSubject and time received >= windowStart and time received < windowEnd)
+                        else
+                            set matches to a reference to (messages of aFolder whose time received >= windowStart and time received < windowEnd)
+                        end if
+
+                        set matchIds to id of matches
+                        if (count of matchIds) > 0 then
+                            set matchSubjects to subject of matches
+                            set matchSenders to sender of matches
+                            set matchDates to time received of matches
+
+                            repeat with i from 1 to count of matchIds
+                                set senderAddress to ""
+                                try
+                                    set senderAddress to address of item i of matchSenders
+                                end try
+
+                                -- The sender is a record, which whose clauses cannot reach into
+                                if senderFilter is "" or senderAddress contains senderFilter then
+                                    set msgSubject to item i of matchSubjects
+                                    if msgSubject is missing value then set msgSubject to ""
+                                    set msgDate to item i of matchDates
+                                    set receivedAt to (msgDate - epochDate) - gmtOffset
+                                    set end of searchResults to ((item i of matchIds) as string) & fieldSep & groupIndex & fieldSep & msgSubject & fieldSep & senderAddress & fieldSep & (receivedAt as string)
+                                    if newestDate is missing value or msgDate > newestDate then
+                                        set newestDate to msgDate
+                                        set newestId to item i of matchIds
+                                    end if
+                                end if
+                            end repeat
+                        end if
+                    end if
+                end repeat
+            end repeat
+
+            if staleFolder and (count of searchResults) is 0 then return "STALEFOLDER"
+
+            -- Header metadata: id and Message-ID of the opened message, if any
+            set openedInfo to ""
+            if openNewest and newestId is not missing value then
+                set theMessage to message id newestId
+                open theMessage
+                activate
+                set internetId to ""
+                try
+                    set internetId to my messageIdOf(headers of theMessage)
+                end try
+                set openedInfo to (newestId as string) & fieldSep & internetId
+            end if
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to searchResults as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "results" & fieldSep & openedInfo & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups
+_SOURCES['export_folder'] = _PARSE_FOLDER_GROUPS + _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderIds to item 1 of my parseFolderGroups(item 1 of argv)
+
+    tell application "{app}"
+        try
+            set exportRecords to {}
+            set staleFolder to false
+            repeat with folderId in folderIds
+                set aFolder to missing value
+                try
+                    set aFolder to mail folder id folderId
+                on error
+                    set staleFolder to true
+                end try
+                if aFolder is not missing value then
+                    set msgIds to id of every message of aFolder
+                    set msgSubjects to subject of every message of aFolder
+                    set msgSenders to sender of every message of aFolder
+                    set msgDates to time received of every message of aFolder
+                    set msgHeaders to headers of every message of aFolder
+
+                    repeat with i from 1 to count of msgIds
+                        set msgSubject to item i of msgSubjects
+                        if msgSubject is missing value then set msgSubject to ""
+
+                        set senderAddress to ""
+                        try
+                            set senderAddress to address of item i of msgSenders
+                        end try
+
+                        set receivedAt to 0
+                        try
+                            set receivedAt to ((item i of msgDates) - epochDate) - gmtOffset
+                        end try
+
+                        set internetId to ""
+                        try
+                            set internetId to my messageIdOf(item i of msgHeaders)
+                        end try
+
+                        set end of exportRecords to ((item i of msgIds) as string) & fieldSep & msgSubject & fieldSep & senderAddress & fieldSep & (receivedAt as string) & fieldSep & internetId
+                    end repeat
+                end if
+            end repeat
+
+            if staleFolder then return "STALEFOLDER"
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to exportRecords as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "messages" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder id, index of the first message (1-based), number of messages.
+# Reads only that range of the folder, so a chunked export holds one chunk at a
+# time however large the folder is. The frame's header carries the folder's
+# current message count; a range past the end returns no records.
+_SOURCES['export_range'] = _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set firstIndex to (item 2 of argv) as integer
+    set wantedCount to (item 3 of argv) as integer
+
+    tell application "{app}"
+        set aFolder to missing value
+        try
+            set aFolder to mail folder id ((item 1 of argv) as integer)
+        on error
+            return "STALEFOLDER"
+        end try
+        try
+            set totalCount to count messages of aFolder
+            set exportRecords to {}
+            set lastIndex to firstIndex + wantedCount - 1
+            if lastIndex > totalCount then set lastIndex to totalCount
+
+            if firstIndex <= lastIndex then
+                set msgRange to a reference to (messages firstIndex thru lastIndex of aFolder)
+                set msgIds to id of msgRange
+                set msgSubjects to subject of msgRange
+                set msgSenders to sender of msgRange
+                set msgDates to time received of msgRange
+                set msgHeaders to headers of msgRange
+
+                repeat with i from 1 to count of msgIds
+                    set msgSubject to item i of msgSubjects
+                    if msgSubject is missing value then set msgSubject to ""
+
+                    set senderAddress to ""
+                    try
+                        set senderAddress to address of item i of msgSenders
+                    end try
+
+                    set receivedAt to 0
+                    try
+                        set receivedAt to ((item i of msgDates) - epochDate) - gmtOffset
+                    end try
+
+                    set internetId to ""
+                    try
+                        set internetId to my messageIdOf(item i of msgHeaders)
+                    end try
+
+                    set end of exportRecords to ((item i of msgIds) as string) & fieldSep & msgSubject & fieldSep & senderAddress & fieldSep & (receivedAt as string) & fieldSep & internetId
+                end repeat
+            end if
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to exportRecords as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "messages" & fieldSep & (totalCount as string) & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups, window start as a Unix timestamp. Returns every message of the
+# folders received since then with one bulk fetch per property, and in the frame's
+# header each folder's message count ("id=count"), so the caller can tell whether
+# the messages are the whole folder and notice when a folder changes.
+_SOURCES['recent_messages'] = _PARSE_FOLDER_GROUPS + _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderGroups to my parseFolderGroups(item 1 of argv)
+    set windowStart to epochDate + gmtOffset + ((item 2 of argv) as number)
+
+    tell application "{app}"
+        try
+            set recentRecords to {}
+            set folderCounts to {}
+            repeat with groupIndex from 1 to count of folderGroups
+                repeat with folderId in item groupIndex of folderGroups
+                    set aFolder to missing value
+                    try
+                        set aFolder to mail folder id folderId
+                    on error
+                        return "STALEFOLDER"
+                    end try
+                    set end of folderCounts to ((contents of folderId) as string) & "=" & (count messages of aFolder)
+
+                    set recent to a reference to (messages of aFolder whose time received >= windowStart)
+                    set msgIds to id of recent
+                    if (count of msgIds) > 0 then
+                        set msgSubjects to subject of recent
+                        set msgSenders to sender of recent
+                        set msgDates to time received of recent
+                        set msgHeaders to headers of recent
+
+                        repeat with i from 1 to count of msgIds
+                            set msgSubject to item i of msgSubjects
+                            if msgSubject is missing value then set msgSubject to ""
+
+                            set senderAddress to ""
+                            try
+                                set senderAddress to address of item i of msgSenders
+                            end try
+
+                            set receivedAt to 0
+                            try
+                                set receivedAt to ((item i of msgDates) - epochDate) - gmtOffset
+                            end try
+
+                            set internetId to ""
+                            try
+                                set internetId to my messageIdOf(item i of msgHeaders)
+                            end try
+
+                            set end of recentRecords to ((item i of msgIds) as string) & fieldSep & groupIndex & fieldSep & msgSubject & fieldSep & senderAddress & fieldSep & (receivedAt as string) & fieldSep & internetId
+                        end repeat
+                    end if
+                end repeat
+            end repeat
+
+            set AppleScript's text item delimiters to fieldSep
+            set countText to folderCounts as text
+            set AppleScript's text item delimiters to recordSep
+            set resultText to recentRecords as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "recent" & fieldSep & countText & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: folder groups, then per query: subject (or ""), exact flag, Internet Message-ID (or ""), open flag
+_SOURCES['batch_resolve'] = _PARSE_FOLDER_GROUPS + _MESSAGE_ID_OF + '''
+on run argv
+''' + _PRELUDE + '''
+    set folderGroups to my parseFolderGroups(item 1 of argv)
+    set queryCount to ((count of argv) - 1) div 4
+
+    tell application "{app}"
+        try
+            set batchResults to {}
+            set staleFolder to false
+
+            repeat with queryIndex from 1 to queryCount
+                set argBase to 1 + (queryIndex - 1) * 4
+                set searchSubject to item (argBase + 1) of argv
+                set exactMatch to (item (argBase + 2) of argv is "1")
+                set msgIdToFind to item (argBase + 3) of argv
+                set openMatch to (item (argBase + 4) of argv is "1")
+                set foundMessage to missing value
+                set foundGroup to 0
+
+                repeat with groupIndex from 1 to count of folderGroups
+                    repeat with folderId in item groupIndex of folderGroups
+                        set aFolder to missing value
+                        try
+                            set aFolder to mail folder id folderId
+                        on error
+                            set staleFolder to true
+                        end try
+                        if aFolder is not missing value and foundMessage is missing value then
+                            if searchSubject is "" then
+                                -- Message-ID only: compare the header of every message
+                                set candidates to every message of aFolder
+                            else if exactMatch then
+                                set candidates to (messages of aFolder whose subject is searchSubject)
+                            else
+                                set candidates to (messages of aFolder whose subject contains searchSubject)
+                            end if
+
+                            repeat with aMessage in candidates
+                                if msgIdToFind is "" then
+                                    set foundMessage to contents of aMessage
+                                else
+                                    try
+                                        if my messageIdMatches(headers of aMessage, msgIdToFind) then
+                                            set foundMessage to contents of aMessage
+                                        end if
+                                    end try
+                                end if
+                                if foundMessage is not missing value then exit repeat
+                            end repeat
+
+                            -- With a subject, fall back to the first match like single searches do
+                            if foundMessage is missing value and searchSubject is not "" and (count of candidates) > 0 then
+                                set foundMessage to item 1 of candidates
+                            end if
+                            if foundMessage is not missing value then set foundGroup to groupIndex
+                        end if
+                    end repeat
+                    if foundMessage is not missing value then exit repeat
+                end repeat
+
+                if foundMessage is not missing value then
+                    if openMatch then open foundMessage
+                    set senderAddress to ""
+                    try
+                        set senderAddress to address of (sender of foundMessage)
+                    end try
+                    set receivedAt to ((time received of foundMessage) - epochDate) - gmtOffset
+                    set end of batchResults to (queryIndex as string) & fieldSep & foundGroup & fieldSep & (id of foundMessage) & fieldSep & (subject of foundMessage) & fieldSep & senderAddress & fieldSep & (receivedAt as string)
+                end if
+            end repeat
+
+            if staleFolder and (count of batchResults) < queryCount then return "STALEFOLDER"
+
+            set AppleScript's text item delimiters to recordSep
+            set resultText to batchResults as text
+            set AppleScript's text item delimiters to ""
+            return frameHeader & "results" & recordSep & resultText
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+# argv: Outlook message id; replies with the message's raw header block
+_SOURCES['message_headers'] = '''
+on run argv
+    tell application "{app}"
+        try
+            return headers of message id ((item 1 of argv) as integer)
+        on error
+            return "NOTFOUND"
+        end try
+    end tell
+end run
+'''
+
+# argv: Internet Message-ID
+_SOURCES['open_by_message_id_scan'] = _MESSAGE_ID_OF + '''
+on run argv
+    set msgIdToFind to item 1 of argv
+
+    tell application "{app}"
+        try
+            set foundMessage to missing value
+
+            -- Search through all messages
+            repeat with aMessage in (every message)
+                try
+                    if my messageIdMatches(headers of aMessage, msgIdToFind) then
+                        set foundMessage to aMessage
+                        exit repeat
+                    end if
+                end try
+            end repeat
+
+            -- Open if found
+            if foundMessage is not missing value then
+                open foundMessage
+                activate
+                return "SUCCESS" & (character id 31) & (id of foundMessage)
+            else
+                return "NOTFOUND"
+            end if
+
+        on error errMsg
+            return "ERROR:" & errMsg
+        end try
+    end tell
+end run
+'''
+
+
+_TEMPLATES: Dict[tuple, ScriptTemplate] = {}
+
+
+def get_template(name: str, app_name: str = OUTLOOK_APP) -> ScriptTemplate:
+    """
+    Return the registered template for an operation.
+
+    Args:
+        name: Template name (see template_names())
+        app_name: Application the script targets; it must be a literal in the
+                  source so its terminology resolves at compile time
+
+    Returns:
+        The ScriptTemplate, built once per (name, app_name)
+    """
+    cache_key = (name, app_name)
+    template = _TEMPLATES.get(cache_key)
+    if template is None:
+        template = ScriptTemplate(name, _SOURCES[name].replace('{app}', app_name))
+        _TEMPLATES[cache_key] = template
+    return template
+
+
+def template_names() -> List[str]:
+    """Return the names of all registered templates."""
+    return sorted(_SOURCES)
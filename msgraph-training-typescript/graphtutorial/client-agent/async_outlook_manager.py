@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Outlook Manager for macOS
+asyncio counterpart of OutlookManager for long-running agents: calls run on a
+bounded pool of AppleScript workers with per-call deadlines, can be cancelled,
+and independent lookups (several folders, several accounts) overlap instead of
+running one after another.
+"""
+
+import asyncio
+import sys
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, TypeVar
+
+from applescript_session import AsyncAppleScriptSession
+from applescript_templates import STALE_FOLDER, folder_groups_arg, get_template
+from bridge_metrics import metrics
+from folder_registry import FolderRegistry
+from outlook_manager import OutlookManager
+from query_planner import CHUNK_SIZE, SearchQuery, plan_search
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+
+async def fan_out(fn: Callable[[K], Awaitable[T]], items: Iterable[K],
+                  return_exceptions: bool = False) -> Dict[K, T]:
+    """
+    Run fn for every item concurrently and collect the results by item.
+
+    Concurrency is bounded by the session the coroutines call into. If one call
+    raises (and return_exceptions is False) the others are cancelled before the
+    exception propagates, as are all of them if the caller is cancelled.
+
+    Args:
+        fn: Coroutine function taking one item
+        items: Distinct, hashable items (folder names, accounts, ...)
+        return_exceptions: Store exceptions as results instead of raising
+
+    Returns:
+        Mapping of item to result, in the order of items
+    """
+    tasks = {item: asyncio.ensure_future(fn(item)) for item in items}
+    try:
+        results = await asyncio.gather(*tasks.values(), return_exceptions=return_exceptions)
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return dict(zip(tasks, results))
+
+
+class AsyncOutlookManager:
+    """Manages Outlook operations using AppleScript on macOS, from asyncio."""
+
+    def __init__(self, session: Optional[AsyncAppleScriptSession] = None,
+                 folders: Optional[FolderRegistry] = None, max_concurrency: int = 4,
+                 timeout: Optional[float] = 30.0):
+        """
+        Initialize the manager.
+
+        Args:
+            session: Worker pool to run scripts on (default: one with max_concurrency workers)
+            folders: Folder name -> id registry; refreshed by this manager, never by itself
+            max_concurrency: Number of workers of the default session
+            timeout: Default deadline in seconds for each script call
+        """
+        self.app_name = "Microsoft Outlook"
+        self.session = session or AsyncAppleScriptSession(workers=max_concurrency, timeout=timeout)
+        self.folders = folders or FolderRegistry(None)
+        self._registry_lock = asyncio.Lock()
+
+    async def close(self):
+        """Stop the worker processes."""
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _call(self, name: str, argv: Optional[List[str]] = None,
+                    timeout: Optional[float] = None) -> Optional[str]:
+        """Run a registered AppleScript template; None if it failed or timed out."""
+        return await self.session.call(get_template(name, self.app_name), argv, timeout=timeout)
+
+    async def refresh_folders(self, force: bool = False):
+        """Re-read the folder registry if it is stale (or always, with force)."""
+        async with self._registry_lock:
+            # Callers queued behind a refresh find the registry fresh and return
+            if not force and not self.folders.is_stale():
+                return
+            self.folders.apply_listing(await self._call('list_folder_ids'))
+
+    async def resolve_folders(self, name: str) -> List[Dict[str, object]]:
+        """Return the registry entries ({'id', 'name', 'account'}) of every folder with this name."""
+        await self.refresh_folders()
+        matches = self.folders.lookup(name)
+        if not matches and self.folders.refresh_on_miss():
+            await self.refresh_folders(force=True)
+            matches = self.folders.lookup(name)
+        return matches
+
+    async def _call_in_folders(self, name: str, folders: List[str], argv: Optional[List[str]] = None,
+                               grouped: bool = False, timeout: Optional[float] = None) -> Optional[str]:
+        """Run a template against folders resolved by name; see OutlookManager._call_in_folders()."""
+        with metrics.folders(folders):
+            for attempt in range(2):
+                resolved = await fan_out(self.resolve_folders, list(dict.fromkeys(folders)))
+                groups = [[f['id'] for f in resolved[folder]] for folder in folders]
+                result = await self._call_with_groups(name, groups, argv, grouped, timeout)
+                if result != STALE_FOLDER:
+                    return result
+                self.folders.invalidate()
+        return "NOTFOUND"
+
+    async def _call_with_groups(self, name: str, groups: List[List[int]], argv: Optional[List[str]],
+                                grouped: bool, timeout: Optional[float]) -> Optional[str]:
+        if not any(groups):
+            return "NOTFOUND"
+        if not grouped:
+            merged = []
+            for group in groups:
+                merged.extend(folder_id for folder_id in group if folder_id not in merged)
+            groups = [merged]
+        return await self._call(name, [folder_groups_arg(groups)] + list(argv or []), timeout=timeout)
+
+    async def is_outlook_running(self) -> bool:
+        """Check if Microsoft Outlook is running."""
+        with metrics.precheck():
+            return await self._call('is_outlook_running') == "true"
+
+    async def list_folders(self) -> List[Dict[str, any]]:
+        """List all mail folders with their message counts; see OutlookManager.list_folders()."""
+        result = await self._call('list_folders')
+        with metrics.span('parse', 'list_folders'):
+            return OutlookManager._parse_folder_list(result)
+
+    async def open_email(self, email_id: str) -> bool:
+        """Open an email in Outlook by its native id."""
+        return await self._call('open_message', [str(email_id)]) == "SUCCESS"
+
+    async def export_folder_metadata(self, folder: str) -> Optional[List[Dict[str, object]]]:
+        """Export metadata of every message in a folder; see OutlookManager.export_folder_metadata()."""
+        result = await self._call_in_folders('export_folder', [folder])
+        with metrics.span('parse', 'export_folder', folder):
+            return OutlookManager._parse_export(result, folder)
+
+    async def export_folders(self, folders: List[str]) -> Dict[str, Optional[List[Dict[str, object]]]]:
+        """Export several folders concurrently, keyed by folder name."""
+        return await fan_out(self.export_folder_metadata, folders)
+
+    async def find_messages(self, query: SearchQuery, folders: List[str], offset: int = 0,
+                            chunk_size: int = CHUNK_SIZE) -> Optional[List[Dict[str, object]]]:
+        """
+        Run a planned search over folders as one group, newest first.
+
+        Windows are fetched newest to oldest like OutlookManager.iter_messages()
+        and fetching stops once offset + query.limit results are known.
+
+        Returns:
+            Message dictionaries (id, subject, sender, received, folder), or None
+            if a script run failed
+        """
+        async def run_window(args: List[str]) -> Optional[str]:
+            return await self._call_in_folders('planned_search', folders, args, grouped=True)
+
+        return await self._scan(query, run_window, folders, offset, chunk_size)
+
+    async def find_in_folders(self, query: SearchQuery, folders: List[str]) -> Optional[List[Dict[str, object]]]:
+        """
+        Search each folder name separately and concurrently, then merge newest first.
+
+        Returns:
+            Up to query.limit merged results, or None if every folder failed
+        """
+        results = await fan_out(lambda folder: self.find_messages(query, [folder]), list(dict.fromkeys(folders)))
+        return self._merge(results.values(), query.limit)
+
+    async def find_in_accounts(self, query: SearchQuery, folder: str) -> Dict[str, Optional[List[Dict[str, object]]]]:
+        """
+        Search a folder name in every account that has it, one concurrent call per account.
+
+        Returns:
+            Mapping of account name to its results (None where the call failed)
+        """
+        by_account: Dict[str, List[int]] = {}
+        for entry in await self.resolve_folders(folder):
+            by_account.setdefault(str(entry['account']), []).append(entry['id'])
+
+        async def search_account(account: str) -> Optional[List[Dict[str, object]]]:
+            async def run_window(args: List[str]) -> Optional[str]:
+                return await self._call_with_groups('planned_search', [by_account[account]], args, True, None)
+
+            records = await self._scan(query, run_window, [folder])
+            for record in records or []:
+                record['account'] = account
+            return records
+
+        return await fan_out(search_account, by_account)
+
+    async def _scan(self, query: SearchQuery, run_window: Callable[[List[str]], Awaitable[Optional[str]]],
+                    folders: List[str], offset: int = 0,
+                    chunk_size: int = CHUNK_SIZE) -> Optional[List[Dict[str, object]]]:
+        """Fetch planned_search windows newest first until offset + limit results are known."""
+        plan = plan_search(query)
+        windows = plan.windows(chunk_size)
+        found = []
+        for window in windows:
+            result = await run_window(plan.template_args(window))
+            if result == STALE_FOLDER:
+                self.folders.invalidate()
+                return None
+            with metrics.span('parse', 'planned_search', ','.join(folders)):
+                records = OutlookManager._parse_window(result, folders)
+            if records is None:
+                return None
+            windows.record(len(records))
+            records.sort(key=lambda record: record['received'], reverse=True)
+            found.extend(records)
+            if plan.limit is not None and len(found) >= offset + plan.limit:
+                break
+        return found[offset:offset + plan.limit] if plan.limit is not None else found[offset:]
+
+    @staticmethod
+    def _merge(result_lists: Iterable[Optional[List[Dict[str, object]]]],
+               limit: Optional[int]) -> Optional[List[Dict[str, object]]]:
+        """Merge per-call results newest first; None if every call failed."""
+        lists = [records for records in result_lists if records is not None]
+        if not lists:
+            return None
+        merged = sorted((record for records in lists for record in records),
+                        key=lambda record: record['received'], reverse=True)
+        return merged[:limit] if limit is not None else merged
+
+
+async def _main(args):
+    async with AsyncOutlookManager(max_concurrency=args.concurrency, timeout=args.timeout) as manager:
+        if not await manager.is_outlook_running():
+            print(f"Error: {manager.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+            return 1
+        query = SearchQuery(args.subject, exact=args.exact, sender=args.sender, limit=args.limit)
+        records = await manager.find_in_folders(query, args.folders or ['Inbox'])
+        if records is None:
+            return 1
+        for record in records:
+            print(f"{record['folder']:<20} {record['id']:>10}  {record['subject']}")
+        return 0 if records else 1
+
+
+def main():
+    """Search several folders concurrently from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search Outlook folders concurrently")
+    parser.add_argument('subject', type=str, nargs='?', default=None, help='Subject text to search for')
+    parser.add_argument('--folder', type=str, action='append', dest='folders',
+                        help='Folder to search (default: Inbox); repeat to search several at once')
+    parser.add_argument('--sender', type=str, default=None, help='Sender address contains this text')
+    parser.add_argument('--exact', action='store_true', help='Match the whole subject instead of a substring')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent script workers (default: 4)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Deadline per script call in seconds')
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Open-latency benchmark for fixed versus learned deadlines
+Runs search-and-open queries for recent messages against a synthetic mailbox
+in which every call costs a per-message scan and a small share of calls stall
+(Outlook busy syncing or behind a dialog). Two folders are searched: a small
+one that normally answers in about a second and a large one whose scan takes
+longer than the fixed timeout. All times are real ones multiplied by --scale,
+so the fixed 15 s timeout of open_outlook_email.py becomes 0.3 s and the run
+takes minutes rather than hours. Three configurations:
+
+    fixed timeout      every call gets 15 s, nothing is retried or hedged
+    learned deadlines  deadline_scheduler.DeadlineScheduler sets each call's
+                       deadline from the latencies seen for its folders
+    learned + hedging  as above, and a search still running at its 95th
+                       percentile is raced by a search of recent mail, where
+                       that percentile is at least MIN_HEDGE_DELAY
+
+Each configuration first runs --warmup queries per folder to learn from; the
+report covers the queries after that: p50/p99/max open latency and how many
+opens failed.
+
+Usage:
+    python3 benchmarks/bench_deadlines.py [--messages 5000] [--queries 100] [--scale 0.02]
+                                          [--stall-rate 0.05] [--stall 30] [--json results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import percentile  # noqa: E402
+from deadline_scheduler import MAX_TIMEOUT, MIN_HEDGE_DELAY, MIN_TIMEOUT, DeadlineScheduler, LatencyModel  # noqa: E402
+from folder_registry import FolderRegistry  # noqa: E402
+from folder_snapshot import FolderSnapshot  # noqa: E402
+from outlook_manager import HEDGE_WINDOW_SECONDS, OutlookManager  # noqa: E402
+from synthetic_mailbox import SyntheticBackend, SyntheticMailbox  # noqa: E402
+
+# (folder, label) pairs searched; Receipts gets about 2% of the mail, Inbox 40%
+FOLDERS = [('Receipts', 'small folder'), ('Inbox', 'large folder')]
+
+# The timeout open_outlook_email.py used for every call
+FIXED_TIMEOUT = 15.0
+
+
+def recent_subjects(mailbox: SyntheticMailbox, folder: str, count: int, rng: random.Random):
+    """Draw subjects of messages received in the folder within the hedge window."""
+    since = mailbox.now - HEDGE_WINDOW_SECONDS
+    folder_ids = [folder_id for folder_id, entry in mailbox.folders.items() if entry['name'] == folder]
+    recent = [message[2] for folder_id in folder_ids for message in mailbox.window(folder_id, since, mailbox.now + 1)]
+    return rng.choices(recent, k=count)
+
+
+def run_config(args, mailbox: SyntheticMailbox, name: str, queries):
+    fixed = FIXED_TIMEOUT * args.scale
+    if name == 'fixed timeout':
+        scheduler = DeadlineScheduler(LatencyModel(path=''), default_timeout=fixed, min_timeout=fixed,
+                                      max_timeout=fixed)
+    else:
+        scheduler = DeadlineScheduler(LatencyModel(path=''), default_timeout=fixed,
+                                      min_timeout=MIN_TIMEOUT * args.scale, max_timeout=MAX_TIMEOUT * args.scale,
+                                      min_hedge_delay=MIN_HEDGE_DELAY * args.scale)
+    backend = SyntheticBackend(mailbox, latency=args.latency * args.scale,
+                               scan_latency=args.scan_latency * args.scale,
+                               stall_rate=args.stall_rate, stall_seconds=args.stall * args.scale, seed=args.seed)
+    manager = OutlookManager(session=backend, folders=FolderRegistry(None, path=''),
+                             snapshot=FolderSnapshot(None, path=''), scheduler=scheduler,
+                             parallel_accounts=1 if name != 'learned + hedging' else 2)
+    manager.folders = FolderRegistry(manager._call, path='')
+
+    results = []
+    for folder, label in FOLDERS:
+        samples = []
+        failures = 0
+        for position, subject in enumerate(queries[folder]):
+            started = time.perf_counter()
+            with contextlib.redirect_stderr(io.StringIO()):
+                result = manager.search_and_open_in_folders(subject, [folder])
+            if position < args.warmup:
+                continue
+            samples.append(time.perf_counter() - started)
+            failures += not result['success']
+        results.append({
+            'case': f"{name}, {label}",
+            'calls': len(samples),
+            'failed': failures,
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+            'max_ms': max(samples) * 1000,
+            'timeouts': scheduler.timeouts,
+        })
+    manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fixed versus learned deadlines for opening email')
+    parser.add_argument('--messages', type=int, default=5000, help='Messages in the mailbox (default: 5000)')
+    parser.add_argument('--queries', type=int, default=100, help='Measured queries per folder (default: 100)')
+    parser.add_argument('--warmup', type=int, default=12, help='Queries per folder to learn from first (default: 12)')
+    parser.add_argument('--scale', type=float, default=0.02,
+                        help='Factor applied to every simulated time, timeouts included (default: 0.02)')
+    parser.add_argument('--latency', type=float, default=0.25, help='Seconds every call costs (default: 0.25)')
+    parser.add_argument('--scan-latency', type=float, default=0.01,
+                        help='Seconds per message a search walks (default: 0.01)')
+    parser.add_argument('--stall-rate', type=float, default=0.05, help='Share of calls that stall (default: 0.05)')
+    parser.add_argument('--stall', type=float, default=30.0, help='Seconds a stall lasts (default: 30)')
+    parser.add_argument('--seed', type=int, default=0, help='Mailbox, query and stall seed (default: 0)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mailbox = SyntheticMailbox(messages=args.messages, accounts=1, seed=args.seed)
+    queries = {folder: recent_subjects(mailbox, folder, args.warmup + args.queries, rng) for folder, _ in FOLDERS}
+
+    results = []
+    for name in ('fixed timeout', 'learned deadlines', 'learned + hedging'):
+        results.extend(run_config(args, mailbox, name, queries))
+
+    print(f"Times are scaled by {args.scale}; divide by it for seconds at Outlook speed")
+    print(f"{'Case':<36} {'calls':>6} {'failed':>7} {'p50':>10} {'p99':>10} {'max':>10}")
+    for result in results:
+        print(f"{result['case']:<36} {result['calls']:>6} {result['failed']:>7} {result['p50_ms']:>8.1f}ms "
+              f"{result['p99_ms']:>8.1f}ms {result['max_ms']:>8.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'messages': args.messages, 'scale': args.scale, 'stall_rate': args.stall_rate,
+                       'seed': args.seed, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
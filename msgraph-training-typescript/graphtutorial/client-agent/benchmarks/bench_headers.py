@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Message-ID matching benchmark over large .eml files
+Writes multi-megabyte sample messages (a text part that quotes another
+message's id, plus a base64 attachment) and times finding their Message-ID:
+
+    source substring   read the whole message and search it for the id (what
+                       matching on `source of aMessage` did)
+    email.parser       the standard library parser, full and headers-only
+    header block       mime_headers.read_header_block(), which stops at the
+                       first blank line, then an exact comparison
+    header cache       a repeated lookup answered by mime_headers.HeaderCache
+
+For each case it reports latency, how much of the file was read, and whether
+the quoted id was wrongly taken for the message's own.
+
+Usage:
+    python3 benchmarks/bench_headers.py [--size 1 --size 8 ...] [--iterations 20]
+                                        [--dir fixtures/] [--json results.json]
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+from email import policy
+from email.parser import BytesParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import measure  # noqa: E402
+from mail_index import normalize_message_id  # noqa: E402
+from mime_headers import HeaderCache, message_id_of, parse_headers, read_header_block  # noqa: E402
+
+DEFAULT_SIZES_MB = [1, 4, 16]
+
+
+def write_fixture(path: str, size_mb: int, rng: random.Random) -> dict:
+    """Write a sample message of about size_mb megabytes and return its ids."""
+    own_id = f"<fixture{size_mb}.{rng.randrange(10 ** 9)}@bench.example>"
+    quoted_id = f"<quoted{size_mb}.{rng.randrange(10 ** 9)}@bench.example>"
+    boundary = "=_bench_boundary"
+    headers = [
+        "Received: from mx1.bench.example (mx1.bench.example [192.0.2.1])",
+        "\tby mail.bench.example with ESMTPS; Mon, 1 Jan 2024 09:00:00 +0000",
+        "From: Alex Example <alex@bench.example>",
+        "To: Sam Example <sam@bench.example>",
+        f"Subject: Quarterly report ({size_mb} MB)",
+        "Date: Mon, 1 Jan 2024 09:00:00 +0000",
+        f"In-Reply-To: {quoted_id}",
+        f"X-Original-Message-ID: {quoted_id}",
+        "Message-ID:",
+        f" {own_id}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/mixed; boundary="{boundary}"',
+    ]
+    text = (f"--{boundary}\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n"
+            f"Replying to Message-ID: {quoted_id}\r\n\r\n")
+    payload = base64.encodebytes(rng.randbytes(size_mb * 1024 * 1024 * 3 // 4)).replace(b"\n", b"\r\n")
+    with open(path, 'wb') as f:
+        f.write("\r\n".join(headers).encode('ascii') + b"\r\n\r\n")
+        f.write(text.encode('ascii'))
+        f.write(f"--{boundary}\r\nContent-Type: application/octet-stream\r\n"
+                f"Content-Transfer-Encoding: base64\r\n"
+                f'Content-Disposition: attachment; filename="data.bin"\r\n\r\n'.encode('ascii'))
+        f.write(payload)
+        f.write(f"\r\n--{boundary}--\r\n".encode('ascii'))
+    return {'own': normalize_message_id(own_id), 'quoted': normalize_message_id(quoted_id)}
+
+
+def substring_match(path: str, wanted: str):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return wanted.encode('ascii') in data, len(data)
+
+
+def parser_match(path: str, wanted: str, headers_only: bool):
+    with open(path, 'rb') as f:
+        message = BytesParser(policy=policy.default).parse(f, headersonly=headers_only)
+        read = f.tell()
+    return normalize_message_id(str(message['Message-ID'])) == wanted, read
+
+
+def header_block_match(path: str, wanted: str):
+    with open(path, 'rb') as f:
+        headers = parse_headers(f)
+        read = f.tell()
+    return message_id_of(headers) == wanted, read
+
+
+def run_suite(args, directory: str):
+    rng = random.Random(args.seed)
+    results = []
+    for size_mb in args.sizes:
+        path = os.path.join(directory, f"sample_{size_mb}mb.eml")
+        ids = write_fixture(path, size_mb, rng)
+        paths = [path] * args.iterations
+
+        cases = [
+            ('source substring', substring_match),
+            ('email.parser (full)', lambda p, wanted: parser_match(p, wanted, False)),
+            ('email.parser (headers only)', lambda p, wanted: parser_match(p, wanted, True)),
+            ('header block (streamed)', header_block_match),
+        ]
+        for name, match in cases:
+            result = measure(f"{name}, {size_mb} MB", lambda p: match(p, ids['own']), paths)
+            found, read = match(path, ids['own'])
+            false_positive, _ = match(path, ids['quoted'])
+            result.update(bytes_read=read, matches=found, false_positive=false_positive)
+            results.append(result)
+
+        cache = HeaderCache()
+        cache.put(1, read_header_block(path))
+        result = measure(f"header cache hit, {size_mb} MB",
+                         lambda p: message_id_of(cache.get(1)) == ids['own'], paths * 10)
+        result.update(bytes_read=0, matches=message_id_of(cache.get(1)) == ids['own'],
+                      false_positive=message_id_of(cache.get(1)) == ids['quoted'])
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Message-ID matching over large .eml files')
+    parser.add_argument('--size', type=int, action='append', dest='sizes',
+                        help=f'Fixture size in MB; repeat for several (default: {DEFAULT_SIZES_MB})')
+    parser.add_argument('--iterations', type=int, default=20, help='Lookups per case (default: 20)')
+    parser.add_argument('--seed', type=int, default=0, help='Fixture seed (default: 0)')
+    parser.add_argument('--dir', type=str, default=None,
+                        help='Keep the generated fixtures in this directory (default: a temporary one)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+    args.sizes = args.sizes or DEFAULT_SIZES_MB
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        results = run_suite(args, args.dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix='bench_headers_') as directory:
+            results = run_suite(args, directory)
+
+    print(f"{'Case':<40} {'calls':>6} {'p50':>10} {'p99':>10} {'read':>10}  {'match':<5} {'false +':<7}")
+    for result in results:
+        print(f"{result['case']:<40} {result['calls']:>6} {result['p50_ms']:>8.3f}ms {result['p99_ms']:>8.3f}ms "
+              f"{result['bytes_read'] / 1024:>8.0f}KB  {str(result['matches']):<5} {str(result['false_positive']):<7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'sizes_mb': args.sizes, 'seed': args.seed, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Open-latency benchmark for the startup prefetch
+Replays the agent's Open Email requests (exact subject plus Message-ID over
+Inbox and Sent Items, as src/main.ts sends them) against a synthetic mailbox
+whose scans cost time per message walked. Most requests are for mail received
+in the last few days, the rest for older mail; every --arrival-every requests
+a new message is delivered to the Inbox and the next request asks for it.
+Two configurations, each on a freshly started manager:
+
+    cold      no prefetch: every open scans the folders
+    prefetch  prefetch() runs at start (timed separately); opens are matched
+              against the warm cache first
+
+All times are real ones multiplied by --scale. Reports the first open, p50/p99
+over all opens, the warm cache hit rate, and how many opens failed.
+
+Usage:
+    python3 benchmarks/bench_prefetch.py [--messages 20000] [--queries 200] [--recent 0.9]
+                                         [--scale 0.05] [--json results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import percentile  # noqa: E402
+from folder_registry import FolderRegistry  # noqa: E402
+from folder_snapshot import FolderSnapshot  # noqa: E402
+from outlook_manager import OutlookManager  # noqa: E402
+from synthetic_mailbox import ID, SUBJECT, SyntheticBackend, SyntheticMailbox  # noqa: E402
+from warm_cache import PREFETCH_FOLDERS  # noqa: E402
+
+# Requests for mail received this recently count as recent
+RECENT_SECONDS = 3 * 24 * 3600
+
+
+def draw_requests(mailbox: SyntheticMailbox, args, rng: random.Random):
+    """Return (folders, subject, Message-ID) requests plus the positions a new message arrives before."""
+    folder_ids = [folder_id for folder_id, entry in mailbox.folders.items() if entry['name'] in PREFETCH_FOLDERS]
+    cutoff = mailbox.now - RECENT_SECONDS
+    recent = [(folder_id, message) for folder_id in folder_ids
+              for message in mailbox.window(folder_id, cutoff, mailbox.now + 1)]
+    older = [(folder_id, message) for folder_id in folder_ids for message in mailbox.window(folder_id, 0, cutoff)]
+    requests = []
+    for _ in range(args.queries):
+        folder_id, message = rng.choice(recent if rng.random() < args.recent else older)
+        outgoing = mailbox.folders[folder_id]['name'] == "Sent Items"
+        folders = ["Sent Items", "Inbox"] if outgoing else ["Inbox", "Sent Items"]
+        requests.append((folders, message[SUBJECT], mailbox.message_id(message[ID])))
+    arrivals = set(range(args.arrival_every, args.queries, args.arrival_every)) if args.arrival_every else set()
+    return requests, arrivals
+
+
+def run_config(args, name: str, requests, arrivals):
+    # Each configuration gets its own copy of the mailbox, as deliveries change it
+    mailbox = SyntheticMailbox(messages=args.messages, accounts=args.accounts, seed=args.seed)
+    inbox = next(folder_id for folder_id, entry in mailbox.folders.items() if entry['name'] == "Inbox")
+    backend = SyntheticBackend(mailbox, latency=args.latency * args.scale,
+                               scan_latency=args.scan_latency * args.scale)
+    manager = OutlookManager(session=backend, folders=FolderRegistry(None, path=''),
+                             snapshot=FolderSnapshot(None, path=''), parallel_accounts=1)
+    manager.folders = FolderRegistry(manager._call, path='')
+
+    prefetch_ms = None
+    if name == 'prefetch':
+        started = time.perf_counter()
+        manager.prefetch()
+        prefetch_ms = (time.perf_counter() - started) * 1000
+
+    samples = []
+    failures = 0
+    for position, (folders, subject, message_id) in enumerate(requests):
+        if position in arrivals:
+            subject = f"New arrival {position}"
+            outlook_id = mailbox.add_message(inbox, subject, "sender@example.com")
+            folders, message_id = ["Inbox", "Sent Items"], mailbox.message_id(outlook_id)
+        started = time.perf_counter()
+        with contextlib.redirect_stderr(io.StringIO()):
+            result = manager.search_and_open_in_folders(subject, folders, True, message_id)
+        samples.append(time.perf_counter() - started)
+        failures += not result['success']
+
+    warm = manager.warm.stats() if manager.warm is not None else None
+    manager.close()
+    return {
+        'case': name,
+        'calls': len(samples),
+        'failed': failures,
+        'prefetch_ms': prefetch_ms,
+        'first_ms': samples[0] * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'hit_rate': warm['hit_rate'] if warm else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark opening email with and without the startup prefetch')
+    parser.add_argument('--messages', type=int, default=20000, help='Messages in the mailbox (default: 20000)')
+    parser.add_argument('--accounts', type=int, default=1, help='Accounts in the mailbox (default: 1)')
+    parser.add_argument('--queries', type=int, default=200, help='Open requests replayed (default: 200)')
+    parser.add_argument('--recent', type=float, default=0.9,
+                        help='Share of requests for mail of the last three days (default: 0.9)')
+    parser.add_argument('--arrival-every', type=int, default=20,
+                        help='Deliver a new message and request it every N requests, 0 for never (default: 20)')
+    parser.add_argument('--scale', type=float, default=0.05,
+                        help='Factor applied to every simulated time (default: 0.05)')
+    parser.add_argument('--latency', type=float, default=0.25, help='Seconds every call costs (default: 0.25)')
+    parser.add_argument('--scan-latency', type=float, default=0.0002,
+                        help='Seconds per message a search walks (default: 0.0002)')
+    parser.add_argument('--seed', type=int, default=0, help='Mailbox and request seed (default: 0)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    mailbox = SyntheticMailbox(messages=args.messages, accounts=args.accounts, seed=args.seed)
+    requests, arrivals = draw_requests(mailbox, args, random.Random(args.seed))
+    results = [run_config(args, name, requests, arrivals) for name in ('cold', 'prefetch')]
+
+    print(f"Times are scaled by {args.scale}; divide by it for seconds at Outlook speed")
+    print(f"{'Case':<10} {'calls':>6} {'failed':>7} {'prefetch':>10} {'first':>10} {'p50':>10} {'p99':>10} "
+          f"{'hit rate':>9}")
+    for result in results:
+        prefetch = f"{result['prefetch_ms']:>8.1f}ms" if result['prefetch_ms'] is not None else f"{'-':>10}"
+        hit_rate = f"{result['hit_rate']:>9.1%}" if result['hit_rate'] is not None else f"{'-':>9}"
+        print(f"{result['case']:<10} {result['calls']:>6} {result['failed']:>7} {prefetch} "
+              f"{result['first_ms']:>8.1f}ms {result['p50_ms']:>8.1f}ms {result['p99_ms']:>8.1f}ms {hit_rate}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'messages': args.messages, 'scale': args.scale, 'seed': args.seed, 'results': results}, f,
+                      indent=2)
+
+
+if __name__ == '__main__':
+    main()
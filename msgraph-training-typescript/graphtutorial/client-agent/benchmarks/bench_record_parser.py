@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy "KEY:value|..." lines vs R1 record frames
+Builds the same synthetic listing in both formats (every tenth subject contains
+'|' or ':') and times parsing it, reporting how many records each parser got
+back intact.
+
+Usage:
+    python3 benchmarks/bench_record_parser.py [--records 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from applescript_templates import FIELD_SEPARATOR, RECORD_FORMAT, RECORD_SEPARATOR  # noqa: E402
+from bridge_records import parse_frame  # noqa: E402
+
+
+def make_messages(count: int):
+    """Return (subject, sender, date, id) tuples; every tenth subject has separators in it."""
+    messages = []
+    for i in range(count):
+        subject = f"Quarterly report {i}" if i % 10 else f"Re: budget | draft {i}"
+        messages.append((subject, f"user{i % 97}@example.com", "Monday, 1 January 2024 at 09:00:00", str(i)))
+    return messages
+
+
+def legacy_payload(messages) -> str:
+    return "\n".join(f"SUBJECT:{s}|SENDER:{f}|DATE:{d}|ID:{i}" for s, f, d, i in messages)
+
+
+def frame_payload(messages) -> str:
+    header = RECORD_FORMAT + FIELD_SEPARATOR + "results"
+    return RECORD_SEPARATOR.join([header] + [FIELD_SEPARATOR.join(m) for m in messages])
+
+
+def parse_legacy(result: str):
+    """The line parser search results used before record frames."""
+    emails = []
+    for line in result.split('\n'):
+        if not line:
+            continue
+        email_info = {}
+        for part in line.split('|'):
+            if ':' in part:
+                key, value = part.split(':', 1)
+                email_info[key.lower()] = value
+        if email_info:
+            emails.append(email_info)
+    return emails
+
+
+def parse_frame_dicts(result: str):
+    return [{'subject': s, 'sender': f, 'date': d, 'id': i}
+            for s, f, d, i in parse_frame(result, 4, 'results').records]
+
+
+def best_time(fn, payload, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = fn(payload)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parsed
+
+
+def intact(parsed, messages) -> int:
+    return sum(1 for record, (subject, sender, date, msg_id) in zip(parsed, messages)
+               if record['subject'] == subject and record['sender'] == sender and record['id'] == msg_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the legacy line parser with R1 record frames')
+    parser.add_argument('--records', type=int, default=100000, help='Records per payload (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per parser, best is reported (default: 5)')
+    args = parser.parse_args()
+
+    messages = make_messages(args.records)
+    legacy = legacy_payload(messages)
+    framed = frame_payload(messages)
+
+    print(f"{'Parser':<24} {'best':>10} {'records/s':>12} {'intact':>14}")
+    for name, fn, payload in [
+        ('legacy lines', parse_legacy, legacy),
+        ('R1 frame (tuples)', lambda p: parse_frame(p, 4, 'results').records, framed),
+        ('R1 frame (dicts)', parse_frame_dicts, framed),
+    ]:
+        elapsed, parsed = best_time(fn, payload, args.repeat)
+        if parsed and isinstance(parsed[0], tuple):
+            parsed = [{'subject': s, 'sender': f, 'date': d, 'id': i} for s, f, d, i in parsed]
+        print(f"{name:<24} {elapsed * 1000:>8.1f}ms {len(messages) / elapsed:>12,.0f} "
+              f"{intact(parsed, messages):>7}/{len(messages)}")
+
+
+if __name__ == '__main__':
+    main()
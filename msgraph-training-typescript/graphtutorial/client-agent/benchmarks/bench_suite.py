@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite over a synthetic mailbox
+Generates a SyntheticMailbox (no Outlook needed) and times the Python side of
+the hot paths one operation at a time: frame parsing, folder resolution, live
+subject search through OutlookManager, indexed subject search (exact, contains
+and fuzzy), Message-ID
+lookup and result formatting. The accounts case times worst-case (no match)
+searches over every account's Inbox with Outlook's per-message scan cost
+simulated, once in a single script and once fanned out per account. Queries are drawn from the mailbox's own skewed
+subject distribution, so common threads are asked for more often than rare ones.
+
+Reports throughput and p50/p99 latency per case; --json writes the same numbers
+for comparing runs.
+
+Usage:
+    python3 benchmarks/bench_suite.py [--messages 100000] [--accounts 3] [--iterations 200]
+                                      [--case parse ...] [--json results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from applescript_templates import OUTLOOK_APP, folder_groups_arg, get_template  # noqa: E402
+from folder_registry import FolderRegistry  # noqa: E402
+from folder_snapshot import FolderSnapshot  # noqa: E402
+from mail_index import MailIndex  # noqa: E402
+from outlook_manager import OutlookManager  # noqa: E402
+from synthetic_mailbox import DEFAULT_FOLDERS, SyntheticBackend, SyntheticMailbox  # noqa: E402
+
+CASES = ['parse', 'folders', 'search', 'accounts', 'index', 'message-id', 'format']
+
+# Simulated Outlook cost per message a search walks, for the accounts case
+SCAN_SECONDS_PER_MESSAGE = 2e-6
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def measure(name: str, fn, inputs):
+    """Call fn once per input and summarize the per-call latencies."""
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    total = sum(samples)
+    return {
+        'case': name,
+        'calls': len(samples),
+        'ops_per_s': len(samples) / total if total else float('inf'),
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+    }
+
+
+def skewed_subjects(mailbox: SyntheticMailbox, count: int, rng: random.Random):
+    """Draw subjects weighted by how many messages carry them."""
+    frequencies = mailbox.subject_frequencies()
+    return rng.choices([s for s, _ in frequencies], weights=[n for _, n in frequencies], k=count)
+
+
+def run_suite(args):
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    mailbox = SyntheticMailbox(messages=args.messages, accounts=args.accounts, seed=args.seed)
+    print(f"Generated {len(mailbox):,} messages in {len(mailbox.folders)} folders "
+          f"({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    backend = SyntheticBackend(mailbox)
+
+    def run_template(name, argv):
+        return backend.call(get_template(name, OUTLOOK_APP), argv)
+
+    registry = FolderRegistry(run_template, path='')
+    manager = OutlookManager(session=backend, folders=registry, snapshot=FolderSnapshot(None, path=''))
+    folder_names = [name for name, _ in DEFAULT_FOLDERS]
+    subjects = skewed_subjects(mailbox, args.iterations, rng)
+    results = []
+
+    if 'parse' in args.cases:
+        inbox_ids = registry.resolve('Inbox')
+        windows = [run_template('planned_search', [folder_groups_arg([inbox_ids]), 'contains', s.split(' #')[0],
+                                                   '', '0', str(mailbox.now + 1), '0']) for s in subjects[:20]]
+        results.append(measure('parse planned_search window', lambda p: manager._parse_window(p, ['Inbox']),
+                               windows * max(args.iterations // len(windows), 1)))
+        inbox = run_template('export_folder', [folder_groups_arg([inbox_ids[:1]])])
+        results.append(measure('parse export_folder (Inbox, 1 account)',
+                               lambda p: manager._parse_export(p, 'Inbox'), [inbox] * 5))
+
+    if 'folders' in args.cases:
+        listing = run_template('list_folder_ids', [])
+        results.append(measure('folder listing apply', registry.apply_listing, [listing] * args.iterations))
+        names = rng.choices(folder_names, k=args.iterations * 10)
+        results.append(measure('folder resolve (warm)', registry.resolve, names))
+
+    if 'search' in args.cases:
+        results.append(measure('live subject search (exact, limit 20)',
+                               lambda s: manager.search_emails_by_subject(s, 'Inbox', exact=True, limit=20),
+                               subjects))
+        results.append(measure('live subject search (contains, limit 20)',
+                               lambda s: manager.search_emails_by_subject(s.split(' #')[0], 'Archive', limit=20),
+                               subjects[:max(args.iterations // 4, 1)]))
+
+    if 'accounts' in args.cases:
+        misses = [f"{subject} (missing)" for subject in subjects[:max(args.iterations // 10, 5)]]
+        for parallel in (1, args.accounts):
+            scanning = OutlookManager(session=SyntheticBackend(mailbox, scan_latency=SCAN_SECONDS_PER_MESSAGE),
+                                      folders=registry, snapshot=manager.snapshot, parallel_accounts=parallel)
+            label = 'one script' if parallel == 1 else f'{parallel} workers'
+            results.append(measure(f'no-match search, all Inboxes ({label})',
+                                   lambda s: scanning.search_and_open_in_folders(s, ['Inbox']), misses))
+            scanning.close()
+
+    index = None
+    if {'index', 'message-id', 'format'} & set(args.cases):
+        started = time.perf_counter()
+        index = MailIndex(':memory:')
+        manager.index = index
+        counts = manager.build_index(folder_names)
+        print(f"Indexed {sum(counts.values()):,} messages ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    if 'index' in args.cases:
+        results.append(measure('indexed subject search (exact)',
+                               lambda s: index.search_subject(s, 'Inbox', exact=True, limit=20), subjects))
+        results.append(measure('indexed subject search (contains)',
+                               lambda s: index.search_subject(s.split(' #')[0], None, exact=False, limit=20),
+                               subjects))
+        results.append(measure('indexed subject search (contains, messy)',
+                               lambda s: index.search_subject(f"RE:  FW: {s.upper()} ", None, exact=False, limit=20),
+                               subjects))
+        results.append(measure('indexed subject search (fuzzy)',
+                               lambda s: index.search_subject(s[:-1] + 'x', None, exact=False, limit=20, fuzzy=True),
+                               subjects))
+
+    if 'message-id' in args.cases:
+        message_ids = [mailbox.message_id(rng.randint(1, len(mailbox))) for _ in range(args.iterations * 10)]
+        results.append(measure('Message-ID lookup (index)', index.lookup_message_id, message_ids))
+        results.append(measure('Message-ID lookup (miss)', index.lookup_message_id,
+                               [f"<missing{n}@synthetic.example>" for n in range(args.iterations * 10)]))
+
+    if 'format' in args.cases:
+        found = [index.search_subject(s, None, exact=True, limit=20) for s in subjects]
+
+        def format_results(records):
+            emails = [manager._index_record_to_email(record) for record in records]
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.display_search_results(emails, 'Inbox')
+            return json.dumps(emails)
+
+        results.append(measure('format 20 results (text + JSON)', format_results, found))
+
+    if index is not None:
+        index.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Outlook agent against a synthetic mailbox')
+    parser.add_argument('--messages', type=int, default=100000, help='Messages in the mailbox (default: 100000)')
+    parser.add_argument('--accounts', type=int, default=3, help='Accounts in the mailbox (default: 3)')
+    parser.add_argument('--iterations', type=int, default=200, help='Queries per case (default: 200)')
+    parser.add_argument('--seed', type=int, default=0, help='Mailbox and query seed (default: 0)')
+    parser.add_argument('--case', action='append', dest='cases', choices=CASES,
+                        help='Case to run; repeat for several (default: all)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+    args.cases = args.cases or CASES
+
+    results = run_suite(args)
+
+    print(f"{'Case':<44} {'calls':>7} {'ops/s':>12} {'p50':>10} {'p99':>10}")
+    for result in results:
+        print(f"{result['case']:<44} {result['calls']:>7} {result['ops_per_s']:>12,.0f} "
+              f"{result['p50_ms']:>8.3f}ms {result['p99_ms']:>8.3f}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'messages': args.messages, 'accounts': args.accounts, 'seed': args.seed,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: source execution vs precompiled template calls
+Runs every registered template both ways through one AppleScriptSession and
+reports per-call latency. Each template gets `return "ok"` as the first line of
+its run handler, so both paths pay the real compile cost of the full source but
+never touch Outlook.
+
+Usage:
+    python3 benchmarks/bench_templates.py [--iterations 20] [--template NAME ...]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from applescript_session import AppleScriptSession  # noqa: E402
+from applescript_templates import ScriptTemplate, get_template, template_names  # noqa: E402
+
+
+def trivial_variant(template: ScriptTemplate) -> ScriptTemplate:
+    """Return a copy of the template whose run handler returns immediately."""
+    source = template.source.replace("on run argv\n", "on run argv\n    return \"ok\"\n", 1)
+    return ScriptTemplate(f"{template.name}-bench", source)
+
+
+def time_calls(fn, iterations: int):
+    """Return (first call ms, median ms of the remaining calls)."""
+    samples = []
+    for _ in range(iterations + 1):
+        start = time.perf_counter()
+        if fn() is None:
+            raise RuntimeError("script failed")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples[0], statistics.median(samples[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare exec-with-source against cached template calls')
+    parser.add_argument('--iterations', type=int, default=20, help='Warm calls per template (default: 20)')
+    parser.add_argument('--template', action='append', dest='templates', metavar='NAME',
+                        help='Template to measure (repeatable, default: all)')
+    args = parser.parse_args()
+
+    names = args.templates or template_names()
+    print(f"{'Template':<26} {'exec first':>11} {'exec warm':>10} {'call first':>11} {'call warm':>10} {'speedup':>8}")
+
+    with AppleScriptSession(timeout=60) as session:
+        for name in names:
+            template = trivial_variant(get_template(name))
+            exec_first, exec_warm = time_calls(lambda: session.run(template.source), args.iterations)
+            call_first, call_warm = time_calls(lambda: session.call(template, ['0']), args.iterations)
+            speedup = exec_warm / call_warm if call_warm else float('inf')
+            print(f"{name:<26} {exec_first:>9.2f}ms {exec_warm:>8.2f}ms "
+                  f"{call_first:>9.2f}ms {call_warm:>8.2f}ms {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Timing spans for the Outlook bridge
+Every bridge call is split into phases so slow operations can be attributed:
+
+    spawn     starting a worker process until it answers
+    compile   osacompile of a template and loading it into a worker
+    execute   running a script in Outlook (reply round trip)
+    precheck  the is_outlook_running call made before searches
+    parse     turning script output into records
+
+Spans are tagged with the operation (template name) and the folder names
+involved, aggregated into histograms, and exported as Prometheus text
+(textfile collector format) or a JSON summary. Recording is off until
+enable() is called, and a disabled span costs one attribute check.
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PHASES = ('spawn', 'compile', 'execute', 'precheck', 'parse')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_NAME = "outlook_bridge_phase_seconds"
+
+# Folder names the calls in the current context are made for, and the phase
+# script execution is recorded as
+_folder = contextvars.ContextVar('bridge_folder', default='')
+_execute_phase = contextvars.ContextVar('bridge_execute_phase', default='execute')
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    __slots__ = ('counts', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+class _Span:
+    __slots__ = ('metrics', 'phase', 'operation', 'folder', 'start')
+
+    def __init__(self, metrics: 'BridgeMetrics', phase: str, operation: str, folder: Optional[str]):
+        self.metrics = metrics
+        self.phase = phase
+        self.operation = operation
+        self.folder = folder
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.phase, time.perf_counter() - self.start, self.operation, self.folder)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _ContextScope:
+    __slots__ = ('var', 'value', 'token')
+
+    def __init__(self, var: contextvars.ContextVar, value: str):
+        self.var = var
+        self.value = value
+
+    def __enter__(self):
+        self.token = self.var.set(self.value)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.var.reset(self.token)
+
+
+class BridgeMetrics:
+    """Process-wide phase histograms keyed by (phase, operation, folder)."""
+
+    def __init__(self):
+        self.enabled = False
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled: bool = True):
+        """Start (or stop) recording spans."""
+        self.enabled = enabled
+
+    def reset(self):
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._histograms.clear()
+
+    def span(self, phase: str, operation: str = '', folder: Optional[str] = None):
+        """
+        Time a block as one observation.
+
+        Args:
+            phase: One of PHASES
+            operation: Template (or other operation) name the time is spent for
+            folder: Folder tag (default: the enclosing folders() scope)
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, phase, operation, folder)
+
+    def execute(self, operation: str):
+        """Time script execution; recorded as 'execute' or, inside precheck(), 'precheck'."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, _execute_phase.get(), operation, None)
+
+    def folders(self, names: Iterable[str]):
+        """Tag spans recorded inside the block with these folder names."""
+        return _ContextScope(_folder, ','.join(names))
+
+    def current_folders(self) -> str:
+        """Return the folder names spans are currently tagged with, comma-separated ('' outside folders())."""
+        return _folder.get()
+
+    def precheck(self):
+        """Record script execution inside the block as the 'precheck' phase."""
+        return _ContextScope(_execute_phase, 'precheck')
+
+    def observe(self, phase: str, seconds: float, operation: str = '', folder: Optional[str] = None):
+        """Add one observation directly."""
+        if not self.enabled:
+            return
+        key = (phase, operation, _folder.get() if folder is None else folder)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, str, str], Histogram]]:
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def to_prometheus(self) -> str:
+        """Render the histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent per Outlook bridge phase.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (phase, operation, folder), histogram in self._snapshot():
+            labels = f'phase="{_escape(phase)}",operation="{_escape(operation)}",folder="{_escape(folder)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{METRIC_NAME}_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{{labels}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        """
+        Return a JSON-serializable summary.
+
+        Returns:
+            {'buckets': [...], 'phases': {phase: totals}, 'series': [per (phase,
+            operation, folder) totals with p50/p99 estimates and bucket counts]}
+        """
+        series = []
+        phases: Dict[str, Dict[str, float]] = {}
+        for (phase, operation, folder), histogram in self._snapshot():
+            series.append({
+                'phase': phase,
+                'operation': operation,
+                'folder': folder,
+                'count': histogram.count,
+                'total_s': round(histogram.total, 6),
+                'p50_s': histogram.quantile(0.5),
+                'p99_s': histogram.quantile(0.99),
+                'max_s': round(histogram.maximum, 6),
+                'histogram': list(histogram.counts),
+            })
+            totals = phases.setdefault(phase, {'count': 0, 'total_s': 0.0})
+            totals['count'] += histogram.count
+            totals['total_s'] = round(totals['total_s'] + histogram.total, 6)
+        return {'buckets': list(BUCKETS), 'phases': phases, 'series': series}
+
+    def format_table(self) -> str:
+        """Return a human-readable per-series table, slowest total first."""
+        rows = sorted(self.summary()['series'], key=lambda s: s['total_s'], reverse=True)
+        lines = [f"{'phase':<9} {'operation':<24} {'folder':<20} {'calls':>6} {'total':>9} {'p50':>8} {'p99':>8}"]
+        for s in rows:
+            lines.append(f"{s['phase']:<9} {s['operation'][:24]:<24} {s['folder'][:20]:<20} {s['count']:>6} "
+                         f"{s['total_s'] * 1000:>7.1f}ms {s['p50_s'] * 1000:>6.1f}ms {s['p99_s'] * 1000:>6.1f}ms")
+        return "\n".join(lines)
+
+    def write(self, prometheus_path: Optional[str] = None, json_path: Optional[str] = None):
+        """Write the Prometheus text and/or JSON summary, each replaced atomically."""
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.summary(), indent=2))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def report(prefix: Optional[str] = None):
+    """Print the table to stderr and, given a path prefix, write <prefix>.prom and <prefix>.json."""
+    print(metrics.format_table(), file=sys.stderr)
+    if prefix:
+        metrics.write(prefix + '.prom', prefix + '.json')
+
+
+# Shared by the sessions, registry and managers of this process
+metrics = BridgeMetrics()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Record frames returned by Outlook scripts
+Scripts that return listings reply with a versioned frame instead of ad hoc
+"KEY:value|KEY:value" lines:
+
+    R1 <US> kind [<US> meta ...] { <RS> field <US> field ... }
+
+US and RS are ASCII 31 and 30, so subjects may contain '|', ':' or newlines.
+Plain status replies (ERROR:..., NOTFOUND, STALEFOLDER) are not framed.
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from applescript_templates import FIELD_SEPARATOR, RECORD_FORMAT, RECORD_SEPARATOR
+
+
+class ProtocolError(ValueError):
+    """Raised when script output is not a frame of the expected version and kind."""
+
+
+class Frame:
+    """A parsed frame: its kind, header metadata and fixed-width records."""
+
+    __slots__ = ('kind', 'meta', 'records', 'dropped')
+
+    def __init__(self, kind: str, meta: Tuple[str, ...], records: List[Tuple[str, ...]], dropped: int):
+        self.kind = kind
+        self.meta = meta
+        self.records = records
+        self.dropped = dropped
+
+    def __repr__(self):
+        return f"Frame({self.kind!r}, meta={self.meta!r}, records={len(self.records)}, dropped={self.dropped})"
+
+
+def is_frame(payload: Optional[str]) -> bool:
+    """Return True if script output starts with a frame header of this version."""
+    return bool(payload) and payload.startswith(RECORD_FORMAT + FIELD_SEPARATOR)
+
+
+def parse_frame(payload: str, width: int, kind: Optional[str] = None) -> Frame:
+    """
+    Parse a frame in one pass over its records.
+
+    Args:
+        payload: Script output
+        width: Number of fields every record must have
+        kind: Expected frame kind (default: accept any)
+
+    Returns:
+        The Frame. Records with a different field count (for example a subject
+        containing a separator character) are counted in `dropped`, not misread.
+
+    Raises:
+        ProtocolError: If the payload is not a frame of this version and kind
+    """
+    chunks = payload.split(RECORD_SEPARATOR)
+    header = chunks[0].split(FIELD_SEPARATOR)
+    if header[0] != RECORD_FORMAT or len(header) < 2:
+        raise ProtocolError(f"unsupported record format {chunks[0][:40]!r}")
+    if kind is not None and header[1] != kind:
+        raise ProtocolError(f"expected a {kind!r} frame, got {header[1]!r}")
+
+    body = chunks[1:]
+    if body == ['']:
+        body = []
+    separator = FIELD_SEPARATOR
+    rows = [tuple(chunk.split(separator)) for chunk in body]
+    records = [row for row in rows if len(row) == width]
+    return Frame(header[1], tuple(header[2:]), records, len(rows) - len(records))
+
+
+def format_frame(kind: str, records: Iterable[Sequence[object]], meta: Sequence[object] = ()) -> str:
+    """Build a frame the way the templates do (for backends that answer them without Outlook)."""
+    header = FIELD_SEPARATOR.join([RECORD_FORMAT, kind] + [str(value) for value in meta])
+    return RECORD_SEPARATOR.join([header] + [FIELD_SEPARATOR.join(str(value) for value in record)
+                                             for record in records])
+
+
+def parse_number(text: str) -> float:
+    """Parse a number formatted by AppleScript, which uses the locale's decimal comma."""
+    return float(text.replace(',', '.') or 0)
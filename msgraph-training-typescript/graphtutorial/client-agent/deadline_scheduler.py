@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Adaptive deadlines for script calls
+A fixed timeout is wrong in both directions: a call against a small folder
+that normally answers in 50 ms waits the full 15-30 s when Outlook stalls, and
+a scan of a folder with 200,000 messages is killed halfway through every time.
+The scheduler keeps the recent latencies of every template per folder set and
+gives each call a deadline of a high percentile of what that operation
+normally takes there, times a safety factor. Until enough calls have been
+seen there it allows the default, or longer if a call there already took
+longer; folders differ too much for one folder's latencies to stand in for
+another's.
+
+Only calls that completed shape the distribution, so stalls that were cut
+short do not drag every later deadline up. A call after one that ran into its
+deadline gets a multiple of that deadline, so an operation that outgrew its
+deadline (a folder that kept growing) gets longer ones instead of failing
+forever. Read-only calls are retried once with a longer deadline; calls that
+open a message are never repeated. The hedge delay (a lower percentile) tells
+callers when a call is running long enough to start a narrower second query
+alongside it (see OutlookManager.search_and_open_in_folders()); operations
+that normally finish within a few round trips are not worth hedging.
+
+Latencies are persisted in the cache directory, so one-shot command line runs
+learn from each other and from the daemon. They are written at most every
+SAVE_INTERVAL seconds and at exit, merged with what other processes have
+written since.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from applescript_session import ScriptBackend
+from applescript_templates import ScriptTemplate
+from bridge_metrics import metrics
+from mail_index import default_cache_dir
+
+
+MODEL_FILENAME = "latencies.json"
+
+# Seconds a call may take before anything has been learned about it
+DEFAULT_TIMEOUT = 30.0
+# Bounds on a learned deadline
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 300.0
+# A deadline is this percentile of the observed latencies times TIMEOUT_FACTOR
+TIMEOUT_QUANTILE = 0.99
+TIMEOUT_FACTOR = 2.0
+# A call still running at this percentile is worth hedging
+HEDGE_QUANTILE = 0.95
+# ...unless that is this soon: a hedge costs round trips of its own and cannot win
+MIN_HEDGE_DELAY = 2.0
+# Latencies needed before a distribution is trusted
+MIN_SAMPLES = 8
+# Latencies kept per operation and folder set; older ones are dropped
+MAX_SAMPLES = 128
+# A retried call gets its deadline multiplied by this
+RETRY_FACTOR = 2.0
+# Seconds between writes of the persisted latencies; flush() writes the rest
+SAVE_INTERVAL = 5.0
+
+# Templates that only read from Outlook, so running one twice is harmless
+READ_ONLY_TEMPLATES = frozenset({
+    'is_outlook_running', 'list_folders', 'list_folder_ids', 'folder_markers', 'folder_counts',
+    'export_folder', 'export_range', 'message_headers', 'recent_messages',
+})
+
+
+def default_model_path() -> str:
+    """Return the default location of the persisted latencies."""
+    return os.path.join(default_cache_dir(), MODEL_FILENAME)
+
+
+def is_safe_to_retry(name: str, argv: Optional[List[str]] = None) -> bool:
+    """
+    Return True if running the template again cannot do anything twice.
+
+    Searches are safe when they were asked not to open what they find;
+    templates that open a message, or activate Outlook, never are.
+    """
+    argv = list(argv or [])
+    if name in READ_ONLY_TEMPLATES:
+        return True
+    if name == 'search_and_open':
+        return len(argv) > 5 and argv[5] == "0"
+    if name == 'planned_search':
+        return len(argv) > 6 and argv[6] == "0"
+    if name == 'batch_resolve':
+        # Four arguments per query after the folder groups, the open flag last
+        return all(flag == "0" for flag in argv[4::4])
+    return False
+
+
+def _quantile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank quantile of unsorted samples."""
+    ordered = sorted(samples)
+    rank = max(int(fraction * len(ordered) + 0.999999) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class LatencyModel:
+    """Recent latencies of completed calls per (operation, folder set), persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = MAX_SAMPLES,
+                 save_interval: float = SAVE_INTERVAL):
+        """
+        Initialize the model. Stored latencies are loaded lazily on first use.
+
+        Args:
+            path: JSON file the latencies are persisted to, shared across processes
+                  (default: default_model_path(); an empty string keeps them in memory)
+            max_samples: Latencies kept per operation and folder set
+            save_interval: Seconds between writes of the file; what is observed in
+                           between is written by the next one, flush() or at exit
+        """
+        self.path = default_model_path() if path is None else path
+        self.max_samples = max_samples
+        self.save_interval = save_interval
+        self._samples: Optional[Dict[Tuple[str, str], Deque[float]]] = None
+        # Deadline the latest call ran into, per (operation, folder set); gone once a call completes
+        self._timeouts: Dict[Tuple[str, str], float] = {}
+        # Observed since the last write: new latencies, and the timeout state (None: cleared) they leave
+        self._unsaved: Dict[Tuple[str, str], List[float]] = {}
+        self._unsaved_timeouts: Dict[Tuple[str, str], Optional[float]] = {}
+        self._saved_at = time.monotonic()
+        self._flush_at_exit = False
+        self._lock = threading.Lock()
+
+    def observe(self, operation: str, folder: str, seconds: float):
+        """Record the latency of a completed call."""
+        key = (operation, folder)
+        with self._lock:
+            samples = self._load().setdefault(key, deque(maxlen=self.max_samples))
+            samples.append(round(seconds, 4))
+            self._timeouts.pop(key, None)
+            self._unsaved.setdefault(key, []).append(round(seconds, 4))
+            self._unsaved_timeouts[key] = None
+            self._save_soon()
+
+    def observe_timeout(self, operation: str, folder: str, deadline: float):
+        """Record that a call ran into its deadline."""
+        key = (operation, folder)
+        with self._lock:
+            self._load()
+            self._timeouts[key] = deadline
+            self._unsaved_timeouts[key] = deadline
+            self._save_soon()
+
+    def flush(self):
+        """Write what was observed since the last write."""
+        with self._lock:
+            if self._unsaved or self._unsaved_timeouts:
+                self._save()
+
+    def last_timeout(self, operation: str, folder: str) -> float:
+        """Return the deadline the latest call ran into, or 0.0 if it completed."""
+        with self._lock:
+            self._load()
+            return self._timeouts.get((operation, folder), 0.0)
+
+    def quantile(self, operation: str, folder: str, fraction: float,
+                 min_samples: int = MIN_SAMPLES) -> Optional[float]:
+        """
+        Return a latency percentile of the operation on the folder set.
+
+        Returns:
+            Seconds, or None while fewer than min_samples latencies are known
+        """
+        samples = self.samples(operation, folder)
+        return _quantile(samples, fraction) if len(samples) >= min_samples else None
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """Return the (operation, folder set) pairs with latencies or a timeout, sorted."""
+        with self._lock:
+            return sorted(set(self._load()) | set(self._timeouts))
+
+    def samples(self, operation: str, folder: str) -> List[float]:
+        """Return the latencies kept for one operation and folder set, oldest first."""
+        with self._lock:
+            return list(self._load().get((operation, folder), ()))
+
+    def clear(self):
+        """Forget every latency, including those other processes have written."""
+        with self._lock:
+            self._samples = {}
+            self._timeouts = {}
+            self._unsaved.clear()
+            self._unsaved_timeouts.clear()
+            self._write()
+
+    def _load(self) -> Dict[Tuple[str, str], Deque[float]]:
+        if self._samples is None:
+            self._samples, self._timeouts = self._read()
+        return self._samples
+
+    def _read(self) -> Tuple[Dict[Tuple[str, str], Deque[float]], Dict[Tuple[str, str], float]]:
+        samples, timeouts = {}, {}
+        if not self.path:
+            return samples, timeouts
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            for operation, folder, latencies in stored['latencies']:
+                samples[(operation, folder)] = deque((float(s) for s in latencies), maxlen=self.max_samples)
+            for operation, folder, deadline in stored.get('timeouts', []):
+                timeouts[(operation, folder)] = float(deadline)
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}, {}
+        return samples, timeouts
+
+    def _save_soon(self):
+        if not self.path:
+            self._unsaved.clear()
+            self._unsaved_timeouts.clear()
+            return
+        if not self._flush_at_exit:
+            atexit.register(self.flush)
+            self._flush_at_exit = True
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self._save()
+
+    def _save(self):
+        """Write the unsaved observations on top of what the file holds now."""
+        if not self.path:
+            return
+        # Other processes may have written since this one loaded; their latencies are kept
+        samples, timeouts = self._read()
+        for key, latencies in self._unsaved.items():
+            samples.setdefault(key, deque(maxlen=self.max_samples)).extend(latencies)
+        for key, deadline in self._unsaved_timeouts.items():
+            if deadline is None:
+                timeouts.pop(key, None)
+            else:
+                timeouts[key] = deadline
+        self._samples, self._timeouts = samples, timeouts
+        self._unsaved.clear()
+        self._unsaved_timeouts.clear()
+        self._write()
+
+    def _write(self):
+        self._saved_at = time.monotonic()
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'latencies': [[operation, folder, list(latencies)]
+                                     for (operation, folder), latencies in self._samples.items()],
+                       'timeouts': [[operation, folder, deadline]
+                                    for (operation, folder), deadline in self._timeouts.items()]}, f)
+        os.replace(tmp_path, self.path)
+
+
+class DeadlineScheduler:
+    """Picks per-call deadlines and hedge delays from a LatencyModel."""
+
+    def __init__(self, model: Optional[LatencyModel] = None, default_timeout: float = DEFAULT_TIMEOUT,
+                 min_timeout: float = MIN_TIMEOUT, max_timeout: float = MAX_TIMEOUT,
+                 factor: float = TIMEOUT_FACTOR, min_hedge_delay: float = MIN_HEDGE_DELAY):
+        """
+        Args:
+            model: Latencies to learn from and record into (default: the persisted one)
+            default_timeout: Deadline of an operation nothing is known about
+            min_timeout: Shortest deadline ever given
+            max_timeout: Longest deadline ever given, retries included
+            factor: Multiple of the TIMEOUT_QUANTILE latency a call is allowed
+            min_hedge_delay: Operations whose HEDGE_QUANTILE latency is shorter are not hedged
+        """
+        self.model = model or LatencyModel()
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.factor = factor
+        self.min_hedge_delay = min_hedge_delay
+        self.timeouts = 0
+        self.retries = 0
+
+    def timeout_for(self, operation: str, folder: str = '') -> float:
+        """Return the deadline in seconds for a call of the operation on the folder set."""
+        observed = self.model.quantile(operation, folder, TIMEOUT_QUANTILE)
+        if observed is not None:
+            deadline = max(observed * self.factor, self.min_timeout)
+        else:
+            # Too few calls to trust, but one that took longer than the default says it is not enough
+            deadline = max(max(self.model.samples(operation, folder), default=0.0) * self.factor,
+                           self.default_timeout)
+        # The latest call ran into its deadline: allow this one longer
+        deadline = max(deadline, self.model.last_timeout(operation, folder) * self.factor)
+        return min(deadline, self.max_timeout)
+
+    def hedge_delay(self, operation: str, folder: str = '') -> Optional[float]:
+        """
+        Return after how many seconds a call is running long and worth hedging,
+        or None while too little is known to tell or if the operation is fast
+        enough there that a hedge would only add load.
+        """
+        delay = self.model.quantile(operation, folder, HEDGE_QUANTILE)
+        return delay if delay is not None and delay >= self.min_hedge_delay else None
+
+    def observe(self, operation: str, folder: str, seconds: float, timed_out: bool = False):
+        """Record a finished call: its latency, or for one that timed out, the deadline it ran into."""
+        if timed_out:
+            self.timeouts += 1
+            self.model.observe_timeout(operation, folder, seconds)
+        else:
+            self.model.observe(operation, folder, seconds)
+
+    def describe(self) -> List[Dict[str, object]]:
+        """Return what has been learned: samples, percentiles and deadline per operation and folder set."""
+        rows = []
+        for operation, folder in self.model.keys():
+            samples = self.model.samples(operation, folder)
+            learned = len(samples) >= MIN_SAMPLES or self.model.last_timeout(operation, folder) > 0
+            rows.append({
+                'operation': operation,
+                'folder': folder,
+                'samples': len(samples),
+                'p50': _quantile(samples, 0.5) if samples else None,
+                'p95': _quantile(samples, HEDGE_QUANTILE) if samples else None,
+                'p99': _quantile(samples, TIMEOUT_QUANTILE) if samples else None,
+                'timeout': self.timeout_for(operation, folder) if learned else None,
+            })
+        return rows
+
+
+class ScheduledBackend(ScriptBackend):
+    """
+    Runs template calls through another backend with deadlines from a DeadlineScheduler.
+
+    A call given no timeout gets the scheduler's deadline for its template and
+    the folders tagged with metrics.folders(); its latency is recorded either
+    way. A call that times out is retried once with a longer deadline when
+    is_safe_to_retry() allows it.
+    """
+
+    def __init__(self, backend: ScriptBackend, scheduler: Optional[DeadlineScheduler] = None):
+        """
+        Args:
+            backend: The backend that runs the scripts
+            scheduler: Source of the deadlines (default: one over the persisted latencies)
+        """
+        self.backend = backend
+        self.scheduler = scheduler or DeadlineScheduler()
+        self._cancelled = False
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Execute free-form AppleScript; there is no operation to learn a deadline for."""
+        return self.backend.run(script, self.scheduler.default_timeout if timeout is None else timeout)
+
+    def call(self, template: ScriptTemplate, argv: Optional[List[str]] = None,
+             timeout: Optional[float] = None) -> Optional[str]:
+        """Run a template with a learned deadline, retrying a timed-out read once."""
+        folder = metrics.current_folders()
+        budget = self.scheduler.timeout_for(template.name, folder) if timeout is None else timeout
+        self._cancelled = False
+        for attempt in range(2):
+            started = time.monotonic()
+            result = self.backend.call(template, argv, budget)
+            elapsed = time.monotonic() - started
+            # Backends report a timeout like any other failure; it is told apart by the time it took
+            timed_out = result is None and not self._cancelled and elapsed >= budget * 0.98
+            if result is not None or timed_out:
+                self.scheduler.observe(template.name, folder, budget if timed_out else elapsed, timed_out)
+            if not timed_out or attempt or timeout is not None or budget >= self.scheduler.max_timeout:
+                return result
+            if not is_safe_to_retry(template.name, argv):
+                return result
+            self.scheduler.retries += 1
+            budget = min(budget * RETRY_FACTOR, self.scheduler.max_timeout)
+        return None
+
+    def fork(self) -> Optional['ScheduledBackend']:
+        """Return a scheduled fork of the backend, sharing this one's scheduler."""
+        forked = self.backend.fork()
+        return None if forked is None else ScheduledBackend(forked, self.scheduler)
+
+    def cancel(self):
+        """Abort the call in progress; it is neither recorded as a timeout nor retried."""
+        self._cancelled = True
+        self.backend.cancel()
+
+    def close(self):
+        self.backend.close()
+        self.scheduler.model.flush()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Folder resolution cache for Outlook
+Maps mail folder names (including names shared by several accounts) to stable
+folder ids so scripts can address folders directly instead of walking the tree.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from bridge_metrics import metrics
+from bridge_records import ProtocolError, parse_frame
+from mail_index import default_cache_dir
+
+
+FOLDERS_FILENAME = "folders.json"
+
+
+def default_registry_path() -> str:
+    """Return the default location of the persisted folder registry."""
+    return os.path.join(default_cache_dir(), FOLDERS_FILENAME)
+
+
+class FolderRegistry:
+    """Cached name -> folder id mapping with a TTL and explicit invalidation."""
+
+    def __init__(self, run_template: Optional[Callable[[str, List[str]], Optional[str]]],
+                 path: Optional[str] = None, ttl: float = 300.0,
+                 miss_refresh_interval: float = 30.0):
+        """
+        Initialize the registry. The folder tree is loaded lazily on first lookup.
+
+        Args:
+            run_template: Callable running a named script template with arguments
+                          and returning its output; None if the owner refreshes the
+                          registry itself through apply_listing()
+            path: JSON file the snapshot is persisted to, shared across processes
+                  (default: default_registry_path(); an empty string disables persistence)
+            ttl: Seconds a snapshot is trusted before it is re-read from Outlook
+            miss_refresh_interval: Minimum snapshot age before an unknown name forces a refresh
+        """
+        self.run_template = run_template
+        self.path = default_registry_path() if path is None else path
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._folders: Optional[List[Dict[str, object]]] = None
+        self._fetched_at = 0.0
+
+    def folders(self, refresh: bool = False) -> List[Dict[str, object]]:
+        """
+        Return every mail folder as {'id', 'name', 'account'} in Outlook's order.
+
+        Args:
+            refresh: Re-read the folder tree from Outlook even if the snapshot is fresh
+        """
+        if refresh or self.is_stale():
+            self._refresh()
+        return self._folders or []
+
+    def resolve(self, name: str, refresh: bool = False) -> List[int]:
+        """
+        Resolve a folder name to the ids of every folder with that name.
+
+        Args:
+            name: Folder name, compared case-insensitively like AppleScript does
+            refresh: Re-read the folder tree before resolving
+
+        Returns:
+            Folder ids in Outlook's order (empty if no folder has that name)
+        """
+        self.folders(refresh)
+        folder_ids = [f['id'] for f in self.lookup(name)]
+        if not folder_ids and not refresh and self.refresh_on_miss():
+            # The folder may have been created since the snapshot was taken
+            return self.resolve(name, refresh=True)
+        return folder_ids
+
+    def lookup(self, name: str) -> List[Dict[str, object]]:
+        """Return the snapshot's folders named name, without contacting Outlook."""
+        wanted = name.casefold()
+        return [f for f in self._folders or [] if str(f['name']).casefold() == wanted]
+
+    def is_stale(self) -> bool:
+        """Return True if there is no snapshot (on disk or in memory) younger than the TTL."""
+        if self._folders is None:
+            self._load()
+        return self._folders is None or self._age() > self.ttl
+
+    def refresh_on_miss(self) -> bool:
+        """Return True if an unknown name should force a refresh of the snapshot."""
+        return self._age() > self.miss_refresh_interval
+
+    def invalidate(self):
+        """Forget the snapshot so the next lookup re-reads the folder tree."""
+        self._folders = None
+        self._fetched_at = 0.0
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def apply_listing(self, result: Optional[str]):
+        """
+        Replace the snapshot with the output of the list_folder_ids template.
+
+        Output that is missing or not a folder listing leaves the snapshot as it was.
+        """
+        if result is None:
+            return
+
+        if result.startswith("ERROR:"):
+            print(f"Error listing folders: {result[6:]}", file=sys.stderr)
+            return
+
+        with metrics.span('parse', 'list_folder_ids'):
+            try:
+                frame = parse_frame(result, 3, 'folder_ids')
+            except ProtocolError as e:
+                print(f"Error listing folders: {e}", file=sys.stderr)
+                return
+
+            folders = []
+            for folder_id, name, account in frame.records:
+                try:
+                    folders.append({'id': int(folder_id), 'name': name, 'account': account})
+                except ValueError:
+                    continue
+
+        self._folders = folders
+        self._fetched_at = time.time()
+        self._save()
+
+    def _age(self) -> float:
+        return time.time() - self._fetched_at
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._folders = snapshot['folders']
+            self._fetched_at = float(snapshot['fetched_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._folders = None
+            self._fetched_at = 0.0
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self._fetched_at, 'folders': self._folders}, f)
+        os.replace(tmp_path, self.path)
+
+    def _refresh(self):
+        if self.run_template is not None:
+            self.apply_listing(self.run_template('list_folder_ids', []))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Incremental folder-tree snapshot for Outlook
+Counting the messages of every folder takes seconds on large multi-account
+profiles. The snapshot keeps each folder's message count together with the
+marker it was counted under (its name and unread count, which Outlook returns
+for all folders in three bulk reads). A refresh re-reads the markers and
+recounts only the folders that are new, whose marker changed, or whose count
+is older than the recount interval; the rest keep their stored counts.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from applescript_templates import STALE_FOLDER, folder_groups_arg
+from bridge_metrics import metrics
+from bridge_records import ProtocolError, parse_frame
+from lookup_cache import parse_folder_counts
+from mail_index import default_cache_dir
+
+
+SNAPSHOT_FILENAME = "folder_snapshot.json"
+
+# Seconds a count is trusted while its folder's marker is unchanged; bounds
+# how long changes the marker misses (mail filed as read, deletions of read
+# mail) go unnoticed
+RECOUNT_INTERVAL = 900.0
+
+
+def default_snapshot_path() -> str:
+    """Return the default location of the persisted folder snapshot."""
+    return os.path.join(default_cache_dir(), SNAPSHOT_FILENAME)
+
+
+def diff_folders(old: List[Dict[str, object]], new: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    """
+    Compare two folder listings.
+
+    Returns:
+        One {'change', 'id', 'name', 'count', 'previous'} per difference, in the
+        new listing's order followed by removed folders. 'change' is 'added',
+        'removed', 'renamed' ('previous' is the old name) or 'count' ('previous'
+        is the old count).
+    """
+    before = {folder['id']: folder for folder in old}
+    after = {folder['id'] for folder in new}
+    changes = []
+    for folder in new:
+        previous = before.get(folder['id'])
+        if previous is None:
+            changes.append(_change('added', folder))
+            continue
+        if previous['name'] != folder['name']:
+            changes.append(_change('renamed', folder, previous['name']))
+        if previous['count'] != folder['count']:
+            changes.append(_change('count', folder, previous['count']))
+    for folder in old:
+        if folder['id'] not in after:
+            changes.append(_change('removed', folder))
+    return changes
+
+
+def _change(kind: str, folder: Dict[str, object], previous: object = None) -> Dict[str, object]:
+    return {'change': kind, 'id': folder['id'], 'name': folder['name'], 'count': folder['count'],
+            'previous': previous}
+
+
+def format_change(change: Dict[str, object]) -> str:
+    """Render one diff_folders() entry as a line of text."""
+    name = change['name']
+    if change['change'] == 'added':
+        return f"+ {name:<48} {change['count']:>10,}  (new folder)"
+    if change['change'] == 'removed':
+        return f"- {name:<48} {change['count']:>10,}  (removed)"
+    if change['change'] == 'renamed':
+        return f"> {name:<48} {'':>10}  (renamed from {change['previous']})"
+    delta = change['count'] - change['previous']
+    return f"~ {name:<48} {change['count']:>10,}  ({delta:+,})"
+
+
+class FolderSnapshot:
+    """Persisted per-folder message counts, refreshed by recounting only changed folders."""
+
+    def __init__(self, run_template: Callable[[str, List[str]], Optional[str]],
+                 path: Optional[str] = None, recount_interval: float = RECOUNT_INTERVAL):
+        """
+        Initialize the snapshot. It is loaded lazily on first use.
+
+        Args:
+            run_template: Callable running a named script template with arguments
+                          and returning its output
+            path: JSON file the snapshot is persisted to, shared across processes
+                  (default: default_snapshot_path(); an empty string disables persistence)
+            recount_interval: Seconds a count is trusted while its folder's marker is unchanged
+        """
+        self.run_template = run_template
+        self.path = default_snapshot_path() if path is None else path
+        self.recount_interval = recount_interval
+        self._folders: Optional[List[Dict[str, object]]] = None
+        self._refreshed_at = 0.0
+
+    def listing(self) -> List[Dict[str, object]]:
+        """
+        Return the snapshot as {'id', 'name', 'count', 'unread'} per folder in
+        Outlook's order, without contacting Outlook (empty if there is none).
+        """
+        self._load()
+        return [{'id': f['id'], 'name': f['name'], 'count': f['count'], 'unread': f['unread']}
+                for f in self._folders or []]
+
+    def age(self) -> float:
+        """Return the seconds since the last refresh (infinity if there is no snapshot)."""
+        self._load()
+        if self._folders is None:
+            return float('inf')
+        return time.time() - self._refreshed_at
+
+    def refresh(self) -> Optional[List[Dict[str, object]]]:
+        """
+        Bring the snapshot up to date, recounting only the folders that need it.
+
+        Returns:
+            The changes since the previous snapshot (see diff_folders()), or None
+            if Outlook could not be read; the snapshot is then left as it was.
+        """
+        self._load()
+        previous = {folder['id']: folder for folder in self._folders or []}
+
+        for attempt in range(2):
+            markers = self._read_markers()
+            if markers is None:
+                return None
+
+            now = time.time()
+            recount = [marker['id'] for marker in markers if self._needs_count(previous.get(marker['id']), marker, now)]
+            counts: Dict[str, int] = {}
+            if recount:
+                result = self.run_template('folder_counts', [folder_groups_arg([recount])])
+                if result == STALE_FOLDER:
+                    # A folder was deleted between the two reads; start over
+                    continue
+                with metrics.span('parse', 'folder_counts'):
+                    counts = parse_folder_counts(result)
+                if counts is None:
+                    return None
+            break
+        else:
+            return None
+
+        folders = []
+        for marker in markers:
+            folder = dict(marker)
+            if str(marker['id']) in counts:
+                folder['count'] = counts[str(marker['id'])]
+                folder['counted_at'] = now
+            else:
+                folder['count'] = previous[marker['id']]['count']
+                folder['counted_at'] = previous[marker['id']]['counted_at']
+            folders.append(folder)
+
+        changes = diff_folders(self._folders or [], folders)
+        self._folders = folders
+        self._refreshed_at = now
+        self._save()
+        return changes
+
+    def _needs_count(self, previous: Optional[Dict[str, object]], marker: Dict[str, object], now: float) -> bool:
+        return (previous is None
+                or previous['unread'] != marker['unread']
+                or now - previous['counted_at'] > self.recount_interval)
+
+    def _read_markers(self) -> Optional[List[Dict[str, object]]]:
+        result = self.run_template('folder_markers', [])
+        if result is None:
+            return None
+
+        if result.startswith("ERROR:"):
+            print(f"Error listing folders: {result[6:]}", file=sys.stderr)
+            return None
+
+        with metrics.span('parse', 'folder_markers'):
+            try:
+                frame = parse_frame(result, 3, 'markers')
+            except ProtocolError as e:
+                print(f"Error listing folders: {e}", file=sys.stderr)
+                return None
+
+            markers = []
+            for folder_id, name, unread in frame.records:
+                try:
+                    markers.append({'id': int(folder_id), 'name': name, 'unread': int(unread)})
+                except ValueError:
+                    continue
+            return markers
+
+    def _load(self):
+        if self._folders is not None or not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._folders = snapshot['folders']
+            self._refreshed_at = float(snapshot['refreshed_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._folders = None
+            self._refreshed_at = 0.0
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'refreshed_at': self._refreshed_at, 'folders': self._folders}, f)
+        os.replace(tmp_path, self.path)
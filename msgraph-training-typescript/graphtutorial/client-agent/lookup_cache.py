@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Recent-hit and not-found cache for open-email lookups
+Remembers what a search/open query resolved to (a message, or nothing) so a
+repeated request, a double click or a redelivered webhook, does not rescan
+the folders. Every entry stores the message counts of the folders it was
+resolved against; it is only trusted while those counts are unchanged, which
+one small folder_counts script run checks, and for at most its TTL. Misses get
+a shorter TTL than hits. The least recently used entries are evicted first.
+
+Reads only update recency in memory; the file is written when entries are
+stored or dropped, merged with what other processes have written since, so
+concurrent runs keep each other's entries.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from bridge_records import ProtocolError, is_frame, parse_frame
+from mail_index import default_cache_dir
+
+
+CACHE_FILENAME = "lookups.json"
+
+
+def default_cache_path() -> str:
+    """Return the default location of the persisted lookup cache."""
+    return os.path.join(default_cache_dir(), CACHE_FILENAME)
+
+
+def lookup_key(kind: str, *parts: object) -> str:
+    """Build a cache key from the parts that decide a lookup's answer."""
+    return json.dumps([kind] + list(parts), separators=(',', ':'))
+
+
+def parse_folder_counts(result: Optional[str]) -> Optional[Dict[str, int]]:
+    """Parse folder_counts output into {folder id: message count}, or None if it failed."""
+    if not is_frame(result):
+        return None
+    try:
+        frame = parse_frame(result, 2, 'counts')
+    except ProtocolError as e:
+        print(f"Error counting folder messages: {e}", file=sys.stderr)
+        return None
+    counts = {}
+    for folder_id, count in frame.records:
+        try:
+            counts[folder_id] = int(count)
+        except ValueError:
+            return None
+    return counts
+
+
+class LookupCache:
+    """Persistent LRU map of lookup key -> resolved message (or not found)."""
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 500,
+                 hit_ttl: float = 3600.0, miss_ttl: float = 120.0):
+        """
+        Initialize the cache. Entries are loaded lazily on first use.
+
+        Args:
+            path: JSON file the cache is persisted to, shared across processes
+                  (default: default_cache_path(); an empty string keeps it in memory)
+            capacity: Maximum number of entries; the least recently used go first
+            hit_ttl: Seconds a resolved message is trusted
+            miss_ttl: Seconds a not-found answer is trusted
+        """
+        self.path = default_cache_path() if path is None else path
+        self.capacity = capacity
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self._entries: Optional[OrderedDict] = None
+        # Changes not yet written: keys used since, entries stored, and keys dropped (with the entry's stored_at)
+        self._used = set()
+        self._stored = {}
+        self._forgotten = {}
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        """
+        Return the live entry for a key, marking it recently used.
+
+        Returns:
+            {'message': dict or None for not found, 'counts': {folder id: count},
+            'stored_at': timestamp}, or None if absent or expired. The caller
+            still has to compare 'counts' with the folders' current counts
+            (see is_current()).
+        """
+        entries = self._load()
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            # Dropped from the file by the next write
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        self._used.add(key)
+        return entry
+
+    @staticmethod
+    def is_current(entry: Dict[str, object], counts: Optional[Dict[str, int]]) -> bool:
+        """Return True if the folders still hold as many messages as when the entry was stored."""
+        return counts is not None and entry['counts'] == counts
+
+    def put(self, key: str, message: Optional[Dict[str, object]], counts: Dict[str, int]):
+        """
+        Store what a lookup resolved to.
+
+        Args:
+            key: Key from lookup_key()
+            message: JSON-serializable description of the message found, or None for not found
+            counts: Message counts of the searched folders, taken before the search
+        """
+        entries = self._load()
+        entries[key] = {'message': message, 'counts': counts, 'stored_at': time.time()}
+        entries.move_to_end(key)
+        self._stored[key] = entries[key]
+        self._forgotten.pop(key, None)
+        self._save()
+
+    def forget(self, key: str):
+        """Drop one entry, e.g. after its message could not be opened."""
+        entry = self._load().pop(key, None)
+        if entry is not None:
+            self._stored.pop(key, None)
+            self._forgotten[key] = entry['stored_at']
+            self._save()
+
+    def clear(self):
+        """Drop every entry, including those other processes have stored."""
+        self._entries = OrderedDict()
+        self._used.clear()
+        self._stored.clear()
+        self._forgotten.clear()
+        self._write()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def _expired(self, entry: Dict[str, object]) -> bool:
+        ttl = self.hit_ttl if entry['message'] is not None else self.miss_ttl
+        return time.time() - entry['stored_at'] > ttl
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _read(self) -> OrderedDict:
+        entries = OrderedDict()
+        if not self.path:
+            return entries
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            for key, entry in stored['entries']:
+                entries[key] = entry
+        except (OSError, ValueError, KeyError, TypeError):
+            return OrderedDict()
+        return entries
+
+    def _save(self):
+        """Write this process's changes on top of what the file holds now."""
+        if self.path:
+            # Other processes may have written since this one loaded; their entries are kept
+            entries = self._read()
+            for key, stored_at in self._forgotten.items():
+                if key in entries and entries[key]['stored_at'] <= stored_at:
+                    del entries[key]
+            for key, entry in self._stored.items():
+                if key not in entries or entries[key]['stored_at'] <= entry['stored_at']:
+                    entries[key] = entry
+            # Recency as this process saw it: what it used last is most recent
+            for key in self._entries:
+                if key in entries and (key in self._used or key in self._stored):
+                    entries.move_to_end(key)
+            for key in [key for key, entry in entries.items() if self._expired(entry)]:
+                del entries[key]
+            self._entries = entries
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        self._used.clear()
+        self._stored.clear()
+        self._forgotten.clear()
+        self._write()
+
+    def _write(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Stored oldest first, so the file order is the LRU order
+            json.dump({'entries': list(self._entries.items())}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Chunked metadata export of Outlook folders
+Writes the id, subject, sender, received time and Message-ID of every message
+in a set of folders to NDJSON or Parquet. Folders are read a fixed number of
+messages at a time (OutlookManager.iter_folder_chunks()) and each chunk is
+written out before the next one is fetched, so memory use stays flat however
+large the folders are. A checkpoint next to the output records how far the
+export got, and an interrupted export picks up after its last durable chunk.
+
+Parquet output is a directory of part files and needs pyarrow
+(pip install pyarrow); NDJSON needs nothing beyond the standard library.
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EXPORT_FORMATS = ('ndjson', 'parquet')
+
+# Messages read from Outlook per script run
+EXPORT_CHUNK_SIZE = 500
+
+# Rows per Parquet part file; a part becomes durable once it is closed
+PARQUET_ROWS_PER_PART = 100000
+
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+
+# Columns of every exported row, in order
+EXPORT_FIELDS = ('id', 'subject', 'sender', 'received', 'message_id', 'folder', 'account')
+
+
+def checkpoint_path(output: str) -> str:
+    """Return where the checkpoint of an export to output is kept."""
+    return os.path.abspath(output).rstrip(os.sep) + CHECKPOINT_SUFFIX
+
+
+def export_format(output: str, requested: Optional[str] = None) -> str:
+    """Pick the export format: the requested one, else 'parquet' for a .parquet output, else 'ndjson'."""
+    if requested:
+        return requested
+    return 'parquet' if output.rstrip(os.sep).endswith('.parquet') else 'ndjson'
+
+
+def plan_folders(registry, names: List[str]) -> List[Dict[str, object]]:
+    """
+    Resolve folder names to the folders an export walks.
+
+    Args:
+        registry: FolderRegistry used to resolve the names
+        names: Folder names, in export order
+
+    Returns:
+        One {'id', 'name', 'account'} per folder, every folder with a matching
+        name in Outlook's order, each folder once
+    """
+    planned = []
+    seen = set()
+    for name in names:
+        registry.resolve(name)
+        for entry in registry.lookup(name):
+            if entry['id'] in seen:
+                continue
+            seen.add(entry['id'])
+            planned.append({'id': entry['id'], 'name': entry['name'], 'account': entry.get('account', '')})
+    return planned
+
+
+class NDJSONSink:
+    """Appends rows to an NDJSON file; every chunk is durable once written."""
+
+    def __init__(self, path: str, offset: int = 0):
+        """
+        Args:
+            path: File to write
+            offset: Bytes of a previous run to keep; anything after them (a chunk
+                    written after the last checkpoint) is cut off
+        """
+        self.path = path
+        if offset and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        else:
+            self._file = open(path, 'wb')
+
+    def write(self, rows: List[Dict[str, object]]) -> bool:
+        """Write a chunk of rows and flush it to disk; returns True (always durable)."""
+        self._file.write(b''.join(json.dumps(row, ensure_ascii=False).encode('utf-8') + b'\n' for row in rows))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return True
+
+    def finish(self) -> bool:
+        """Complete the output; returns True."""
+        self.close()
+        return True
+
+    def state(self) -> Dict[str, object]:
+        """Return what a resumed run needs to continue this file."""
+        return {'offset': self._file.tell()}
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetSink:
+    """Writes rows as Parquet part files of up to rows_per_part rows each, one row group per chunk."""
+
+    def __init__(self, directory: str, parts: int = 0, rows_per_part: int = PARQUET_ROWS_PER_PART):
+        """
+        Args:
+            directory: Directory receiving part-NNNNN.parquet files
+            parts: Part files of a previous run to keep; later or unfinished parts are removed
+            rows_per_part: Rows after which a part file is closed
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self.directory = directory
+        self.parts = parts
+        self.rows_per_part = rows_per_part
+        self._schema = pa.schema([('id', pa.int64()), ('subject', pa.string()), ('sender', pa.string()),
+                                  ('received', pa.float64()), ('message_id', pa.string()),
+                                  ('folder', pa.string()), ('account', pa.string())])
+        self._writer = None
+        self._rows = 0
+
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, 'part-*.parquet*')):
+            name = os.path.basename(path)
+            if name.endswith('.tmp') or int(name[5:10]) >= parts:
+                os.remove(path)
+
+    def _part_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"part-{index:05d}.parquet")
+
+    def write(self, rows: List[Dict[str, object]]) -> bool:
+        """Write a chunk of rows; returns True if this closed a part, making everything so far durable."""
+        if not rows:
+            return False
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._part_path(self.parts) + '.tmp', self._schema)
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+        self._rows += len(rows)
+        if self._rows < self.rows_per_part:
+            return False
+        self._close_part()
+        return True
+
+    def finish(self) -> bool:
+        """Close the last part; returns True."""
+        self._close_part()
+        return True
+
+    def _close_part(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._part_path(self.parts) + '.tmp', self._part_path(self.parts))
+        self._writer = None
+        self._rows = 0
+        self.parts += 1
+
+    def state(self) -> Dict[str, object]:
+        """Return what a resumed run needs to continue this directory."""
+        return {'parts': self.parts}
+
+    def close(self):
+        """Drop an unfinished part; the rows in it are exported again on resume."""
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._part_path(self.parts) + '.tmp')
+            self._writer = None
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, object]):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _open_sink(fmt: str, output: str, state: Dict[str, object]):
+    if fmt == 'parquet':
+        return ParquetSink(output, parts=int(state.get('parts', 0)))
+    return NDJSONSink(output, offset=int(state.get('offset', 0)))
+
+
+def _rows(chunks: Iterator[Tuple[int, int, List[Dict[str, object]]]],
+          folder: Dict[str, object]) -> Iterator[Tuple[int, int, List[Dict[str, object]]]]:
+    """Turn a folder's chunks of message dictionaries into chunks of export rows."""
+    for position, total, records in chunks:
+        yield position, total, [{'id': record['id'], 'subject': record['subject'], 'sender': record['sender'],
+                                 'received': record['received'], 'message_id': record['message_id'],
+                                 'folder': folder['name'], 'account': folder['account']}
+                                for record in records]
+
+
+def export_folders(manager, folders: List[str], output: str, fmt: Optional[str] = None,
+                   chunk_size: int = EXPORT_CHUNK_SIZE, resume: bool = False) -> Optional[Dict[str, object]]:
+    """
+    Export the metadata of every message in the named folders.
+
+    Args:
+        manager: OutlookManager to read the folders through
+        folders: Folder names; every folder with one of the names is exported
+        output: NDJSON file, or directory of Parquet part files
+        fmt: 'ndjson' or 'parquet' (default: chosen by export_format())
+        chunk_size: Messages read per script run
+        resume: Continue the interrupted export to output from its checkpoint
+
+    Returns:
+        {'rows', 'folders', 'output', 'format'} once the export is complete, or
+        None if it failed or was interrupted. The checkpoint is then kept, and
+        running again with resume=True continues after the last durable chunk.
+    """
+    fmt = export_format(output, fmt)
+    if fmt not in EXPORT_FORMATS:
+        print(f"Error: unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})", file=sys.stderr)
+        return None
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            print("Error: Parquet export needs pyarrow (pip install pyarrow), or use --format ndjson",
+                  file=sys.stderr)
+            return None
+
+    checkpoint_file = checkpoint_path(output)
+    checkpoint = _load_checkpoint(checkpoint_file) if resume else None
+    if checkpoint is not None and (checkpoint.get('format') != fmt or checkpoint.get('names') != folders):
+        print(f"Error: {checkpoint_file} belongs to an export of {', '.join(checkpoint.get('names') or [])} "
+              f"as {checkpoint.get('format')}; remove it or export the same folders", file=sys.stderr)
+        return None
+    if checkpoint is None:
+        if resume:
+            print(f"No interrupted export to {output}; starting from the beginning", file=sys.stderr)
+        planned = plan_folders(manager.folders, folders)
+        if not planned:
+            print(f"Error: no folder named {', '.join(folders)}", file=sys.stderr)
+            return None
+        checkpoint = {'format': fmt, 'names': folders, 'folders': planned,
+                      'folder_index': 0, 'position': 0, 'total': None, 'rows': 0, 'sink': {}}
+
+    sink = _open_sink(fmt, output, checkpoint['sink'])
+    rows = checkpoint['rows']
+    try:
+        for folder_index in range(checkpoint['folder_index'], len(checkpoint['folders'])):
+            folder = checkpoint['folders'][folder_index]
+            resuming = folder_index == checkpoint['folder_index']
+            start = checkpoint['position'] if resuming else 0
+            position, total = start, None
+
+            for position, total, chunk in _rows(manager.iter_folder_chunks(folder['id'], start, chunk_size), folder):
+                if resuming and checkpoint['total'] is not None and total != checkpoint['total']:
+                    print(f"Warning: {folder['account']}/{folder['name']} changed since the export was interrupted "
+                          f"({checkpoint['total']} -> {total} messages); some may be missing or repeated",
+                          file=sys.stderr)
+                resuming = False
+                rows += len(chunk)
+                if sink.write(chunk):
+                    checkpoint.update(folder_index=folder_index, position=position, total=total,
+                                      rows=rows, sink=sink.state())
+                    _save_checkpoint(checkpoint_file, checkpoint)
+
+            if total is None or position < total:
+                print(f"Error: export of {folder['account']}/{folder['name']} stopped after {position} messages; "
+                      f"run again with resume to continue", file=sys.stderr)
+                sink.close()
+                return None
+            print(f"Exported {folder['account']}/{folder['name']}: {total:,} messages", file=sys.stderr)
+    except KeyboardInterrupt:
+        sink.close()
+        print(f"\nExport interrupted; run again with resume to continue from {checkpoint['rows']:,} rows",
+              file=sys.stderr)
+        return None
+
+    sink.finish()
+    try:
+        os.remove(checkpoint_file)
+    except FileNotFoundError:
+        pass
+    return {'rows': rows, 'folders': len(checkpoint['folders']), 'output': output, 'format': fmt}
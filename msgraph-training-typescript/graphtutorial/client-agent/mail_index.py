@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Local mailbox metadata index
+Stores per-message metadata exported from Outlook in SQLite so subject and
+Message-ID lookups can be answered without walking folders in AppleScript.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+from subject_index import SubjectIndex
+
+
+CACHE_DIR_ENV = "OUTLOOK_AGENT_CACHE_DIR"
+INDEX_FILENAME = "outlook_index.sqlite3"
+
+
+def default_cache_dir() -> str:
+    """Return the directory holding the agent's on-disk caches."""
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        os.path.expanduser("~"), ".cache", "ai-power-toys")
+
+
+def default_index_path() -> str:
+    """Return the default location of the metadata index."""
+    return os.path.join(default_cache_dir(), INDEX_FILENAME)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    received REAL NOT NULL,
+    folder TEXT NOT NULL COLLATE NOCASE,
+    message_id TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_folder ON messages (folder, received);
+CREATE INDEX IF NOT EXISTS messages_subject ON messages (subject COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);
+CREATE TABLE IF NOT EXISTS folders (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    message_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS message_id_map (
+    message_id TEXT PRIMARY KEY,
+    outlook_id INTEGER NOT NULL,
+    seen_at REAL NOT NULL
+);
+'''
+
+
+def normalize_message_id(message_id: Optional[str]) -> Optional[str]:
+    """Strip whitespace and angle brackets from an Internet Message-ID."""
+    if not message_id:
+        return None
+    return message_id.strip().strip('<>').strip() or None
+
+
+class MailIndex:
+    """SQLite-backed metadata index of Outlook mail folders."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) the index database.
+
+        Args:
+            path: Database file path (default: default_index_path()); ':memory:' is allowed
+        """
+        self.path = path or default_index_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        # Trigram index of the subjects for substring and fuzzy queries, built on first use
+        self._subjects: Optional[SubjectIndex] = None
+        self._subjects_built: Dict[str, float] = {}
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def replace_folder(self, folder: str, records: Iterable[Dict[str, object]]) -> int:
+        """
+        Replace all indexed messages of a folder with a fresh export.
+
+        Args:
+            folder: The folder name the records were exported from
+            records: Dictionaries with id, subject, sender, received and message_id keys
+
+        Returns:
+            Number of messages stored for the folder
+        """
+        rows = [
+            (int(r['id']), r.get('subject') or '', r.get('sender') or '',
+             float(r.get('received') or 0), folder, normalize_message_id(r.get('message_id')))
+            for r in records
+        ]
+        with self.conn:
+            self.conn.execute("DELETE FROM messages WHERE folder = ?", (folder,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages (id, subject, sender, received, folder, message_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            indexed_at = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO folders (name, message_count, indexed_at) VALUES (?, ?, ?)",
+                (folder, len(rows), indexed_at)
+            )
+        if self._subjects is not None:
+            self._subjects.replace_folder(folder, ({'id': row[0], 'subject': row[1], 'received': row[3]}
+                                                   for row in rows))
+            self._subjects_built[folder.casefold()] = indexed_at
+        return len(rows)
+
+    def remove_message(self, message_id: int):
+        """Drop a message that no longer exists in Outlook."""
+        with self.conn:
+            self.conn.execute("DELETE FROM messages WHERE id = ?", (int(message_id),))
+        if self._subjects is not None:
+            self._subjects.remove(int(message_id))
+
+    def indexed_folders(self) -> List[Dict[str, object]]:
+        """Return the folders present in the index with their counts and build times."""
+        rows = self.conn.execute(
+            "SELECT name, message_count, indexed_at FROM folders ORDER BY name").fetchall()
+        return [dict(row) for row in rows]
+
+    def search_subject(self, subject: str, folder: Optional[str] = None, exact: bool = True,
+                       limit: int = 20, fuzzy: bool = False) -> List[Dict[str, object]]:
+        """
+        Look up messages by subject.
+
+        Substring and fuzzy queries compare subjects normalised by
+        subject_index.normalize_subject(), so "RE:  budget Review" finds
+        "Budget review" and "FW: Budget review (v2)".
+
+        Args:
+            subject: Subject text (case-insensitive)
+            folder: Restrict to this folder name (default: all indexed folders)
+            exact: If True, match the whole subject, newest first; if False, match
+                   a substring, an equal subject first, then one starting with the
+                   text, newest first within each
+            limit: Maximum number of results (0 for all)
+            fuzzy: Match similar subjects, most similar first (implies not exact)
+
+        Returns:
+            List of message dictionaries (id, subject, sender, received, folder,
+            message_id); substring and fuzzy matches also carry a 'score' from 0 to 1
+        """
+        if exact and not fuzzy:
+            return self._select("subject = ? COLLATE NOCASE", [subject], folder, limit)
+
+        ranked = self.subject_index().search(subject, folder, limit, fuzzy=fuzzy)
+        if not ranked:
+            return []
+        rows = {}
+        ids = [match['id'] for match in ranked]
+        # In pieces that stay below SQLite's limit on bound parameters
+        for start in range(0, len(ids), 500):
+            piece = ids[start:start + 500]
+            rows.update((row['id'], row) for row in self._select(
+                f"id IN ({','.join('?' * len(piece))})", piece, None, len(piece)))
+        results = []
+        for match in ranked:
+            row = rows.get(match['id'])
+            if row is None:
+                # Deleted by another process since the subjects were loaded
+                self._subjects.remove(match['id'])
+                continue
+            row['score'] = match['score']
+            results.append(row)
+        return results
+
+    def subject_index(self) -> SubjectIndex:
+        """
+        Return the trigram index of the indexed subjects, up to date with the database.
+
+        It is loaded on first use. After that, only folders rebuilt since (by
+        this or another process) are reloaded, and only their changed messages
+        are touched.
+        """
+        if self._subjects is None:
+            self._subjects = SubjectIndex()
+        current = {row['name'].casefold(): row for row in self.indexed_folders()}
+        for key, folder in current.items():
+            if self._subjects_built.get(key) == folder['indexed_at']:
+                continue
+            rows = self.conn.execute("SELECT id, subject, received FROM messages WHERE folder = ?", (folder['name'],))
+            self._subjects.replace_folder(folder['name'], (dict(row) for row in rows))
+            self._subjects_built[key] = folder['indexed_at']
+        for key in set(self._subjects_built) - set(current):
+            self._subjects.replace_folder(key, [])
+            del self._subjects_built[key]
+        return self._subjects
+
+    def find_by_message_id(self, message_id: str) -> Optional[Dict[str, object]]:
+        """Return the indexed message with this Internet Message-ID, if any."""
+        normalized = normalize_message_id(message_id)
+        if not normalized:
+            return None
+        row = self.conn.execute(
+            "SELECT id, subject, sender, received, folder, message_id FROM messages "
+            "WHERE message_id = ? ORDER BY received DESC LIMIT 1",
+            (normalized,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def remember_message_id(self, message_id: str, outlook_id: int):
+        """
+        Record that an Internet Message-ID resolved to an Outlook message id.
+
+        Args:
+            message_id: Internet Message-ID (angle brackets optional)
+            outlook_id: Native Outlook message id
+        """
+        normalized = normalize_message_id(message_id)
+        if not normalized:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO message_id_map (message_id, outlook_id, seen_at) VALUES (?, ?, ?)",
+                (normalized, int(outlook_id), time.time())
+            )
+
+    def lookup_message_id(self, message_id: str) -> Optional[int]:
+        """
+        Resolve an Internet Message-ID to an Outlook message id without contacting Outlook.
+
+        The mapping may be stale; callers verify it when opening and call
+        forget_message_id() if the message is gone or changed.
+
+        Returns:
+            The Outlook message id, or None if the Message-ID has not been seen
+        """
+        normalized = normalize_message_id(message_id)
+        if not normalized:
+            return None
+        row = self.conn.execute(
+            "SELECT outlook_id FROM message_id_map WHERE message_id = ?", (normalized,)).fetchone()
+        if row:
+            return row['outlook_id']
+        indexed = self.find_by_message_id(normalized)
+        return indexed['id'] if indexed else None
+
+    def forget_message_id(self, message_id: str):
+        """Drop a stale Message-ID mapping and the indexed message it pointed at."""
+        normalized = normalize_message_id(message_id)
+        if not normalized:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM message_id_map WHERE message_id = ?", (normalized,))
+            if self._subjects is not None:
+                for row in self.conn.execute("SELECT id FROM messages WHERE message_id = ?", (normalized,)):
+                    self._subjects.remove(row['id'])
+            self.conn.execute("DELETE FROM messages WHERE message_id = ?", (normalized,))
+
+    def _select(self, condition: str, params: List[object], folder: Optional[str],
+                limit: int) -> List[Dict[str, object]]:
+        if folder:
+            condition += " AND folder = ?"
+            params = params + [folder]
+        rows = self.conn.execute(
+            "SELECT id, subject, sender, received, folder, message_id FROM messages "
+            f"WHERE {condition} ORDER BY received DESC LIMIT ?",
+            # SQLite reads a negative LIMIT as none
+            params + [limit if limit and limit > 0 else -1]
+        ).fetchall()
+        return [dict(row) for row in rows]
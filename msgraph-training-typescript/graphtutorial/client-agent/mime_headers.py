@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Streaming MIME header parsing
+Reads the header block of a message (a saved .eml, or the `headers` text
+Outlook returns) line by line and stops at the first blank line, so the body
+and attachments of a multi-megabyte message are never read. Message-IDs are
+then compared exactly instead of searching the raw source for a substring,
+which also matched ids quoted in bodies or in other fields.
+"""
+
+import io
+import sys
+from collections import OrderedDict
+from email.header import decode_header, make_header
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from mail_index import normalize_message_id
+
+
+# Longest header line read in one piece; longer lines are split, not buffered whole
+MAX_LINE_BYTES = 64 * 1024
+
+
+class HeaderBlock:
+    """The fields of one header block in order; names compare case-insensitively."""
+
+    __slots__ = ('fields', '_by_name')
+
+    def __init__(self, fields: List[Tuple[str, str]]):
+        self.fields = fields
+        self._by_name: Dict[str, List[str]] = {}
+        for name, value in fields:
+            self._by_name.setdefault(name.lower(), []).append(value)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the first value of a field, or default if the block has none."""
+        values = self._by_name.get(name.lower())
+        return values[0] if values else default
+
+    def get_all(self, name: str) -> List[str]:
+        """Return every value of a field, in order."""
+        return list(self._by_name.get(name.lower(), []))
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._by_name
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __repr__(self):
+        return f"HeaderBlock({len(self.fields)} fields)"
+
+
+def iter_header_fields(lines: Iterable[Union[bytes, str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the (name, value) fields of a header block from its lines.
+
+    Continuation lines (starting with a space or tab) are unfolded into the
+    field they continue. Iteration stops at the first blank line, so callers
+    passing a file or stream only read up to the end of the headers. Lines
+    without a colon, such as an mbox "From " line, are skipped.
+    """
+    name = None
+    parts: List[str] = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+        if not line:
+            break
+        if line[0] in ' \t':
+            if name is not None:
+                parts.append(line.strip())
+            continue
+        if name is not None:
+            yield name, ' '.join(part for part in parts if part)
+        field, separator, value = line.partition(':')
+        if separator and field and ' ' not in field.strip():
+            name, parts = field.strip(), [value.strip()]
+        else:
+            name, parts = None, []
+    if name is not None:
+        yield name, ' '.join(part for part in parts if part)
+
+
+def _lines(source: Union[bytes, str, BinaryIO]) -> Iterator[Union[bytes, str]]:
+    """Iterate the lines of a header source lazily, whatever its type."""
+    if isinstance(source, str):
+        stream = io.StringIO(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        stream = io.BytesIO(source)
+    else:
+        stream = source
+    while True:
+        line = stream.readline(MAX_LINE_BYTES)
+        if not line:
+            return
+        yield line
+
+
+def parse_headers(source: Union[bytes, str, BinaryIO]) -> HeaderBlock:
+    """
+    Parse the header block at the start of a message.
+
+    Args:
+        source: The message (or just its headers) as bytes, text, or a binary
+                stream positioned at its start; only the header block is read
+
+    Returns:
+        The parsed HeaderBlock (empty if the source has no header fields)
+    """
+    return HeaderBlock(list(iter_header_fields(_lines(source))))
+
+
+def read_header_block(path: str) -> HeaderBlock:
+    """Parse the headers of a saved message (.eml) without reading its body."""
+    with open(path, 'rb') as f:
+        return parse_headers(f)
+
+
+def message_id_of(headers: HeaderBlock) -> Optional[str]:
+    """Return the normalized Message-ID of a header block (no angle brackets), or None."""
+    value = headers.get('Message-ID')
+    if not value:
+        return None
+    # Keep only the bracketed id if a comment or stray text surrounds it
+    start = value.find('<')
+    end = value.find('>', start + 1)
+    if start != -1 and end != -1:
+        value = value[start:end + 1]
+    return normalize_message_id(value)
+
+
+def decode_value(value: Optional[str]) -> Optional[str]:
+    """Decode RFC 2047 encoded words (=?utf-8?...?=) in a header value."""
+    if value is None:
+        return None
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, UnicodeError, ValueError) as e:
+        print(f"Warning: could not decode header value {value[:60]!r}: {e}", file=sys.stderr)
+        return value
+
+
+class HeaderCache:
+    """Parsed header blocks by Outlook message id, least recently used evicted first."""
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Args:
+            capacity: Maximum number of header blocks kept
+        """
+        self.capacity = capacity
+        self._entries: 'OrderedDict[int, HeaderBlock]' = OrderedDict()
+
+    def get(self, outlook_id: int) -> Optional[HeaderBlock]:
+        """Return the cached headers of a message, marking them recently used."""
+        headers = self._entries.get(outlook_id)
+        if headers is not None:
+            self._entries.move_to_end(outlook_id)
+        return headers
+
+    def put(self, outlook_id: int, headers: HeaderBlock):
+        """Cache the headers of a message."""
+        self._entries[outlook_id] = headers
+        self._entries.move_to_end(outlook_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def discard(self, outlook_id: int):
+        """Drop a message's headers, e.g. once it no longer exists."""
+        self._entries.pop(outlook_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,38 +2,87 @@
 """
 Outlook Manager for macOS - Open emails silently
 """
-import subprocess
 import sys
 import json
 from typing import Optional, Dict
 
+from applescript_session import AppleScriptSession, ScriptBackend
+from applescript_templates import FIELD_SEPARATOR, STALE_FOLDER, folder_groups_arg, get_template
+from bridge_metrics import metrics, report
+from bridge_records import ProtocolError, is_frame, parse_frame
+from deadline_scheduler import DeadlineScheduler, ScheduledBackend
+from folder_registry import FolderRegistry
+from folder_snapshot import FolderSnapshot
+from lookup_cache import LookupCache, lookup_key, parse_folder_counts
+from mail_index import MailIndex, normalize_message_id
+from query_planner import SearchQuery, plan_search
+
 
 class OutlookManager:
     """Manages Outlook operations using AppleScript on macOS."""
 
-    def __init__(self):
+    def __init__(self, session: Optional[ScriptBackend] = None, index: Optional[MailIndex] = None,
+                 cache: Optional[LookupCache] = None, snapshot: Optional[FolderSnapshot] = None):
         self.app_name = "Microsoft Outlook"
+        # Deadlines follow the latencies learned per operation and folders; 15 s until there are some
+        self.session = session or ScheduledBackend(AppleScriptSession(), DeadlineScheduler(default_timeout=15.0))
+        self.index = index
+        self.cache = cache
+        self.folders = FolderRegistry(self._call)
+        # Counts of every folder, recounting only those whose marker changed
+        self.snapshot = snapshot or FolderSnapshot(self._call)
 
     def _run_applescript(self, script: str) -> Optional[str]:
-        """Execute an AppleScript command."""
-        try:
-            result = subprocess.run(
-                ['osascript', '-e', script],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                print(f"AppleScript error: {result.stderr}", file=sys.stderr)
-                return None
-        except subprocess.TimeoutExpired:
-            print("AppleScript timeout", file=sys.stderr)
+        """Execute an AppleScript command in the persistent session."""
+        return self.session.run(script)
+
+    def _call(self, name: str, argv: Optional[list] = None) -> Optional[str]:
+        """Run a registered AppleScript template in the persistent session."""
+        return self.session.call(get_template(name, self.app_name), argv)
+
+    def _call_in_folders(self, name: str, folders: list, argv: list) -> Optional[str]:
+        """Run a template against the ids of all named folders, retrying once on a stale id."""
+        result = "NOTFOUND"
+        # A stale folder id invalidates the registry and the lookup runs once more
+        with metrics.folders(folders):
+            for attempt in range(2):
+                folder_ids = []
+                for folder in folders:
+                    for folder_id in self.folders.resolve(folder):
+                        if folder_id not in folder_ids:
+                            folder_ids.append(folder_id)
+                if not folder_ids:
+                    return "NOTFOUND"
+                result = self._call(name, [folder_groups_arg([folder_ids])] + argv)
+                if result != STALE_FOLDER:
+                    return result
+                self.folders.invalidate()
+        return "NOTFOUND"
+
+    def _folder_counts(self, folders: list) -> Optional[Dict[str, int]]:
+        """Return {folder id: message count} of the named folders, or None if counting failed."""
+        return parse_folder_counts(self._call_in_folders('folder_counts', folders, []))
+
+    def _snapshot_counts(self) -> Optional[Dict[str, int]]:
+        """Return {folder id: message count} of every folder from the refreshed snapshot, or None."""
+        if self.snapshot.refresh() is None:
             return None
-        except Exception as e:
-            print(f"Error: {e}", file=sys.stderr)
+        return {str(folder['id']): folder['count'] for folder in self.snapshot.listing()}
+
+    def _open_cached(self, key: str, counts: Optional[Dict[str, int]]) -> Optional[bool]:
+        """Answer from the lookup cache: True opened, False known miss, None run the search."""
+        entry = self.cache.get(key)
+        if entry is None:
             return None
+        if not self.cache.is_current(entry, counts):
+            self.cache.forget(key)
+            return None
+        if entry['message'] is None:
+            return False
+        if self._call('open_message', [str(entry['message']['id'])]) == "SUCCESS":
+            return True
+        self.cache.forget(key)
+        return None
 
     def search_and_open_by_subject(self, subject: str, folders: list = None) -> bool:
         """
@@ -49,62 +98,40 @@ class OutlookManager:
         if folders is None:
             folders = ["Inbox", "Sent Items", "Sent"]
 
-        # Escape quotes in subject
-        escaped_subject = subject.replace('"', '\\"').replace('\\', '\\\\')
-
-        # Build folder search list
-        folder_list = '", "'.join(folders)
-
-        script = f'''
-        tell application "{self.app_name}"
-            try
-                set targetFolders to {{"{folder_list}"}}
-                set foundMessage to missing value
-                set mostRecentDate to missing value
-
-                -- Search through specified folders
-                repeat with folderName in targetFolders
-                    try
-                        repeat with aFolder in (get every mail folder)
-                            if name of aFolder is folderName then
-                                -- Get messages whose subject contains search term
-                                set matchingMessages to (messages of aFolder whose subject contains "{escaped_subject}")
-
-                                if (count of matchingMessages) > 0 then
-                                    -- Find the most recent message
-                                    repeat with aMessage in matchingMessages
-                                        set msgDate to time received of aMessage
-                                        if mostRecentDate is missing value or msgDate > mostRecentDate then
-                                            set mostRecentDate to msgDate
-                                            set foundMessage to aMessage
-                                        end if
-                                    end repeat
-                                end if
-                            end if
-                        end repeat
-                    end try
-                end repeat
-
-                -- Open the message if found
-                if foundMessage is not missing value then
-                    open foundMessage
-                    activate
-                    return "SUCCESS"
-                else
-                    return "NOTFOUND"
-                end if
-
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
-
-        if result == "SUCCESS":
-            return True
-        elif result == "NOTFOUND":
+        cache_key = counts = None
+        if self.cache is not None:
+            cache_key = lookup_key('open-newest', subject, folders)
+            counts = self._folder_counts(folders)
+            cached = self._open_cached(cache_key, counts)
+            if cached is not None:
+                if not cached:
+                    print(f"Email not found: {subject}", file=sys.stderr)
+                return cached
+
+        # Scan newest-first time windows; the first window with a match holds the newest one
+        plan = plan_search(SearchQuery(subject, exact=False, limit=1))
+        windows = plan.windows()
+        result = "NOTFOUND"
+        for window in windows:
+            result = self._call_in_folders('planned_search', folders, plan.template_args(window, open_newest=True))
+            if not is_frame(result):
+                break
+            try:
+                with metrics.span('parse', 'planned_search', ','.join(folders)):
+                    opened = parse_frame(result, 5, 'results').meta
+            except ProtocolError:
+                return False
+            if opened and opened[0]:
+                self._remember_opened(FIELD_SEPARATOR.join(("SUCCESS",) + opened))
+                if counts is not None:
+                    self.cache.put(cache_key, {'id': int(opened[0])}, counts)
+                return True
+            windows.record(0)
+            result = "NOTFOUND"
+
+        if result == "NOTFOUND":
+            if counts is not None:
+                self.cache.put(cache_key, None, counts)
             print(f"Email not found: {subject}", file=sys.stderr)
             return False
         elif result and result.startswith("ERROR:"):
@@ -123,54 +150,81 @@ class OutlookManager:
         Returns:
             True if found and opened, False otherwise
         """
-        # Escape special characters
-        escaped_id = message_id.replace('"', '\\"').replace('\\', '\\\\')
-
-        script = f'''
-        tell application "{self.app_name}"
-            try
-                set foundMessage to missing value
-
-                -- Search through all messages
-                repeat with aMessage in (every message)
-                    try
-                        set msgHeaders to source of aMessage
-                        if msgHeaders contains "{escaped_id}" then
-                            set foundMessage to aMessage
-                            exit repeat
-                        end if
-                    end try
-                end repeat
-
-                -- Open if found
-                if foundMessage is not missing value then
-                    open foundMessage
-                    activate
-                    return "SUCCESS"
-                else
-                    return "NOTFOUND"
-                end if
-
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
-
-        if result == "SUCCESS":
+        # A previously seen Message-ID opens directly by native id, no scan
+        if self.index is not None:
+            outlook_id = self.index.lookup_message_id(message_id)
+            if outlook_id is not None:
+                if self.open_verified_message(outlook_id, message_id):
+                    return True
+                self.index.forget_message_id(message_id)
+
+        cache_key = counts = None
+        if self.cache is not None:
+            cache_key = lookup_key('message-id', normalize_message_id(message_id) or message_id)
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry['message'] is not None:
+                # A hit names its message: it only has to still carry the Message-ID, no folder is counted
+                if self.open_verified_message(entry['message']['id'], message_id):
+                    return True
+                self.cache.forget(cache_key)
+                entry = None
+            # A miss covers every folder; the snapshot recounts only those whose marker changed
+            counts = self._snapshot_counts()
+            if entry is not None:
+                if self.cache.is_current(entry, counts):
+                    print(f"Email not found with Message-ID: {message_id}", file=sys.stderr)
+                    return False
+                self.cache.forget(cache_key)
+
+        result = self._call('open_by_message_id_scan', [normalize_message_id(message_id) or message_id])
+
+        if result and result.startswith("SUCCESS"):
+            self._remember_opened(result + FIELD_SEPARATOR + message_id)
+            if self.cache is not None:
+                try:
+                    self.cache.put(cache_key, {'id': int(result.split(FIELD_SEPARATOR)[1])}, {})
+                except (IndexError, ValueError):
+                    pass
             return True
         elif result == "NOTFOUND":
+            if counts is not None:
+                self.cache.put(cache_key, None, counts)
             print(f"Email not found with Message-ID: {message_id}", file=sys.stderr)
             return False
         else:
             return False
 
+    def open_verified_message(self, outlook_id: int, message_id: str) -> bool:
+        """
+        Open a message by native id after checking it still carries the expected Message-ID.
+
+        Args:
+            outlook_id: Native Outlook message id from the lookup table
+            message_id: Internet Message-ID the id was recorded for
+
+        Returns:
+            True if the message exists, matches and was opened; False if the mapping is stale
+        """
+        result = self._call('open_verified_message', [str(int(outlook_id)), normalize_message_id(message_id)])
+        return result == "SUCCESS"
+
+    def _remember_opened(self, result: str):
+        """Record the Message-ID to id mapping reported by a successful open."""
+        if self.index is None:
+            return
+        fields = result.split(FIELD_SEPARATOR)
+        if len(fields) < 3 or not fields[2].strip():
+            return
+        try:
+            self.index.remember_message_id(fields[2], int(fields[1]))
+        except ValueError:
+            pass
+
 
 def main():
     """Main function."""
     import argparse
+    import atexit
 
     parser = argparse.ArgumentParser(description="Open email in Outlook for Mac")
     parser.add_argument('--subject', type=str, help='Email subject to search for')
@@ -179,6 +233,16 @@ def main():
                        default=["Inbox", "Sent Items", "Sent"],
                        help='Folders to search in')
     parser.add_argument('--json', action='store_true', help='Output JSON result')
+    parser.add_argument('--index', type=str, dest='index_path', default=None,
+                       help='Path of the local metadata index')
+    parser.add_argument('--no-index', action='store_true',
+                       help='Skip the Message-ID lookup table and always scan')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Skip the recent-hit / not-found cache and always search')
+    parser.add_argument('--profile', action='store_true',
+                       help='Time every bridge call by phase and print a summary to stderr on exit')
+    parser.add_argument('--profile-out', type=str, default=None, metavar='PREFIX',
+                       help='With --profile, also write PREFIX.prom (Prometheus text) and PREFIX.json')
 
     args = parser.parse_args()
 
@@ -186,7 +250,12 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    manager = OutlookManager()
+    if args.profile or args.profile_out:
+        metrics.enable()
+        atexit.register(report, args.profile_out)
+
+    manager = OutlookManager(index=None if args.no_index else MailIndex(args.index_path),
+                             cache=None if args.no_cache else LookupCache())
     success = False
 
     if args.message_id:
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Client for the resident Outlook Manager daemon
+Sends one request over the daemon's Unix socket and prints the reply, e.g.
+
+    python3 outlook_client.py search '{"subject": "Report", "folders": ["Inbox", "Sent Items"]}'
+    python3 outlook_client.py ping
+
+Start the daemon with `python3 outlook_manager.py serve`.
+"""
+
+import json
+import socket
+import sys
+from typing import Dict, Optional
+
+from outlook_daemon import default_socket_path
+
+
+class DaemonUnavailable(ConnectionError):
+    """Raised when no daemon is listening on the socket."""
+
+
+def request(op: str, args: Optional[Dict[str, object]] = None, socket_path: Optional[str] = None,
+            timeout: Optional[float] = 120.0) -> Dict[str, object]:
+    """
+    Send one request to the daemon and wait for its reply.
+
+    Args:
+        op: Operation name (see outlook_daemon.handle_request())
+        args: Operation arguments
+        socket_path: Daemon socket (default: outlook_daemon.default_socket_path())
+        timeout: Seconds to wait for the reply
+
+    Returns:
+        The reply: {'id', 'ok', 'result'} or {'id', 'ok': False, 'error'}
+
+    Raises:
+        DaemonUnavailable: If no daemon is listening
+    """
+    path = socket_path or default_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        try:
+            conn.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(f"no Outlook daemon at {path}: {e}")
+        conn.sendall(json.dumps({'id': 1, 'op': op, 'args': args or {}}).encode('utf-8') + b'\n')
+        with conn.makefile('rb') as replies:
+            line = replies.readline()
+    if not line:
+        raise DaemonUnavailable(f"Outlook daemon at {path} closed the connection")
+    return json.loads(line)
+
+
+def main():
+    """Send the request given on the command line and print the reply as JSON."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send a request to the resident Outlook Manager daemon")
+    parser.add_argument('op', type=str,
+                        help='Operation: ping, stats, search, find, list_folders, open, headers, batch, prefetch, '
+                             'shutdown')
+    parser.add_argument('args', type=str, nargs='?', default='{}', help='Operation arguments as a JSON object')
+    parser.add_argument('--socket', type=str, default=None, help='Daemon socket path')
+    args = parser.parse_args()
+
+    try:
+        reply = request(args.op, json.loads(args.args), socket_path=args.socket)
+    except DaemonUnavailable as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(json.dumps(reply.get('result') if reply.get('ok') else reply))
+    result = reply.get('result')
+    succeeded = reply.get('ok') and not (isinstance(result, dict) and result.get('success') is False)
+    sys.exit(0 if succeeded else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Resident Outlook Manager daemon
+Keeps one OutlookManager (and its AppleScript worker, folder registry, index
+and caches) alive behind a Unix domain socket, so callers such as the Electron
+agent pay for an Outlook round trip instead of a Python start per request.
+
+Protocol: newline-delimited JSON in both directions. A request is
+
+    {"id": <any>, "op": "search", "args": {...}}
+
+and its reply {"id": <same>, "ok": true, "result": ...} or {"id": ..., "ok":
+false, "error": "..."}. Ops: search, find, list_folders, open, headers,
+batch, prefetch (see handle_request()), plus ping, stats and shutdown, which
+the daemon answers itself without queueing. Clients may keep a connection open
+and send several requests; any number of clients can be connected at once.
+Outlook work runs on one thread in arrival order, as Outlook serves one
+script at a time anyway. A request identical to one still queued or running
+(same op and normalized arguments, see request_key()) shares that run and
+its reply instead of repeating it; the stats op reports how many were
+coalesced, and the warm cache's hit rate once something was prefetched. A
+daemon started with a warmup (`serve --prefetch`) runs it as its first
+request, right after it starts listening. The daemon exits on SIGINT/SIGTERM, on a shutdown request, or
+after idle_timeout seconds without clients; requests already running are
+answered first.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from lookup_cache import lookup_key
+from mail_index import default_cache_dir, normalize_message_id
+from mime_headers import message_id_of
+from query_planner import SearchQuery
+from single_flight import SingleFlight
+from warm_cache import PREFETCH_FOLDERS
+
+
+SOCKET_FILENAME = "outlook_manager.sock"
+
+# Seconds without clients or requests after which the daemon exits (0: never)
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+# Seconds requests in progress get to finish when the daemon is stopped
+SHUTDOWN_GRACE = 30.0
+
+
+def default_socket_path() -> str:
+    """Return the default path of the daemon's socket."""
+    return os.path.join(default_cache_dir(), SOCKET_FILENAME)
+
+
+class RequestError(ValueError):
+    """Raised for requests the daemon cannot run (unknown op, bad arguments)."""
+
+
+def _folders(args: Dict[str, object]) -> list:
+    folders = args.get('folders') or ['Inbox']
+    if not isinstance(folders, list) or not all(isinstance(f, str) for f in folders):
+        raise RequestError("'folders' must be a list of folder names")
+    return folders
+
+
+def handle_request(manager, request: Dict[str, object]) -> object:
+    """
+    Run one request against a manager and return its result.
+
+    Ops and their args (results match the CLI's --json output):
+        search  subject, folders, exact, message_id, policy   -> search result dict
+        find    subject, folders, exact, sender, since, until, limit, offset -> [message]
+        list_folders max_age                                  -> [{'id', 'name', 'count', 'unread'}]
+        open    id                                            -> bool
+        headers id                    -> {'message_id', 'fields'} or None
+        batch   queries                                       -> [batch result]
+        prefetch folders                    -> {folder: messages kept} or None
+
+    Raises:
+        RequestError: For unknown ops or invalid arguments
+    """
+    op = request.get('op')
+    args = request.get('args') or {}
+    if not isinstance(args, dict):
+        raise RequestError("'args' must be an object")
+
+    if op == 'search':
+        if not args.get('subject'):
+            raise RequestError("search needs a 'subject'")
+        return manager.search_and_open_in_folders(
+            str(args['subject']),
+            _folders(args),
+            exact_match=bool(args.get('exact', True)),
+            internet_message_id=args.get('message_id'),
+            policy=str(args.get('policy', 'first')),
+        )
+
+    if op == 'find':
+        query = SearchQuery(args.get('subject'), exact=bool(args.get('exact', False)), sender=args.get('sender'),
+                            since=args.get('since'), until=args.get('until'), limit=args.get('limit', 20))
+        if not manager.is_outlook_running():
+            raise RequestError(f"{manager.app_name} is not running. Please start Outlook first.")
+        return list(manager.iter_messages(query, _folders(args), offset=int(args.get('offset', 0))))
+
+    if op == 'list_folders':
+        max_age = args.get('max_age')
+        return manager.list_folders(max_age=None if max_age is None else float(max_age))
+
+    if op == 'open':
+        if 'id' not in args:
+            raise RequestError("open needs an 'id'")
+        return manager.open_email(str(args['id']))
+
+    if op == 'headers':
+        if 'id' not in args:
+            raise RequestError("headers needs an 'id'")
+        headers = manager.message_headers(int(args['id']))
+        if headers is None:
+            return None
+        return {'message_id': message_id_of(headers), 'fields': headers.fields}
+
+    if op == 'batch':
+        queries = args.get('queries')
+        if not isinstance(queries, list):
+            raise RequestError("batch needs a 'queries' list")
+        return list(manager.batch_resolve(queries))
+
+    if op == 'prefetch':
+        folders = _folders({'folders': args.get('folders') or PREFETCH_FOLDERS})
+        if not manager.is_outlook_running():
+            raise RequestError(f"{manager.app_name} is not running. Please start Outlook first.")
+        return manager.prefetch(folders)
+
+    raise RequestError(f"Unknown op: {op!r}")
+
+
+def request_key(request: Dict[str, object]) -> Optional[str]:
+    """
+    Return the key identical requests share a run under, or None for requests
+    that must always run on their own (batches, malformed requests).
+
+    Search subjects and folder names are compared case-insensitively, like
+    Outlook compares them, and Message-IDs after normalization.
+    """
+    op = request.get('op')
+    args = request.get('args') or {}
+    if not isinstance(args, dict):
+        return None
+    try:
+        if op == 'search':
+            return lookup_key('search', str(args.get('subject') or '').strip().casefold(),
+                              [folder.casefold() for folder in _folders(args)], bool(args.get('exact', True)),
+                              normalize_message_id(args.get('message_id')) or '', str(args.get('policy', 'first')))
+        if op in ('open', 'headers'):
+            return lookup_key(op, str(args.get('id')))
+        if op in ('find', 'list_folders', 'prefetch'):
+            return lookup_key(op, json.dumps(args, sort_keys=True))
+    except (RequestError, AttributeError, TypeError, ValueError):
+        return None
+    return None
+
+
+class OutlookDaemon:
+    """Serves handle_request() over a Unix domain socket."""
+
+    def __init__(self, manager_factory: Callable[[], object], socket_path: Optional[str] = None,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, warmup: Optional[Dict[str, object]] = None):
+        """
+        Args:
+            manager_factory: Builds the OutlookManager; called once, on the thread
+                             that runs every request (SQLite objects stay on it)
+            socket_path: Socket to listen on (default: default_socket_path())
+            idle_timeout: Exit after this many seconds without clients (0: never)
+            warmup: Request run before any client's, e.g. {'op': 'prefetch', 'args': {...}}
+        """
+        self.manager_factory = manager_factory
+        self.warmup = warmup
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outlook')
+        self._manager = None
+        self._writers = set()
+        self._busy = set()
+        self._last_activity = time.monotonic()
+        self._stopping: Optional[asyncio.Event] = None
+        self.flights = SingleFlight()
+
+    def run(self) -> int:
+        """Serve until stopped; returns the process exit status."""
+        return asyncio.run(self._serve())
+
+    async def _serve(self) -> int:
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        if not self._claim_socket():
+            return 1
+
+        self._manager = await loop.run_in_executor(self._executor, self.manager_factory)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path, limit=2 ** 24)
+        os.chmod(self.socket_path, 0o600)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._stopping.set)
+        print(f"Outlook daemon listening on {self.socket_path} (pid {os.getpid()})", file=sys.stderr)
+
+        watchdog = asyncio.ensure_future(self._watch_idle())
+        warming = asyncio.ensure_future(self._warm_up()) if self.warmup is not None else None
+        try:
+            await self._stopping.wait()
+        finally:
+            watchdog.cancel()
+            if warming is not None:
+                warming.cancel()
+            server.close()
+            await self._drain()
+            await server.wait_closed()
+            await loop.run_in_executor(self._executor, self._close_manager)
+            self._executor.shutdown()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        print(f"Outlook daemon stopped ({self.flights.executed} requests run, "
+              f"{self.flights.coalesced} coalesced into them)", file=sys.stderr)
+        return 0
+
+    async def _warm_up(self):
+        # Queued on the Outlook thread ahead of the first client request, which then finds it done
+        reply = await self._respond(json.dumps(self.warmup).encode('utf-8'))
+        if reply['ok']:
+            print(f"Warmup {self.warmup.get('op')}: {json.dumps(reply['result'])}", file=sys.stderr)
+        else:
+            print(f"Warmup {self.warmup.get('op')} failed: {reply['error']}", file=sys.stderr)
+
+    async def _drain(self):
+        """Let requests in progress finish, then drop the remaining connections."""
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        while self._busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self._writers):
+            writer.close()
+
+    def _claim_socket(self) -> bool:
+        """Remove a socket left by a dead daemon; False if a live one is serving it."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), mode=0o700, exist_ok=True)
+        if not os.path.exists(self.socket_path):
+            return True
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+            return True
+        finally:
+            probe.close()
+        print(f"Error: an Outlook daemon is already serving {self.socket_path}", file=sys.stderr)
+        return False
+
+    def _close_manager(self):
+        if self._manager is None:
+            return
+        self._manager.close()
+        if self._manager.index is not None:
+            self._manager.index.close()
+
+    async def _watch_idle(self):
+        if not self.idle_timeout:
+            return
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 4, 5.0))
+            if not self._writers and time.monotonic() - self._last_activity > self.idle_timeout:
+                print("Outlook daemon idle, shutting down", file=sys.stderr)
+                self._stopping.set()
+                return
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while not self._stopping.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                self._last_activity = time.monotonic()
+                self._busy.add(writer)
+                try:
+                    reply = await self._respond(line)
+                    writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                    await writer.drain()
+                finally:
+                    self._busy.discard(writer)
+                    self._last_activity = time.monotonic()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, line: bytes) -> Dict[str, object]:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+        except ValueError as e:
+            return {'id': None, 'ok': False, 'error': f"Malformed request: {e}"}
+
+        reply = {'id': request.get('id')}
+        if request.get('op') == 'ping':
+            reply.update(ok=True, result={'pong': True, 'pid': os.getpid()})
+            return reply
+        if request.get('op') == 'stats':
+            stats = self.flights.stats()
+            warm = getattr(self._manager, 'warm', None)
+            if warm is not None:
+                stats['warm'] = warm.stats()
+            reply.update(ok=True, result=stats)
+            return reply
+        if request.get('op') == 'shutdown':
+            self._stopping.set()
+            reply.update(ok=True, result=True)
+            return reply
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await self.flights.run(
+                request_key(request),
+                lambda: loop.run_in_executor(self._executor, handle_request, self._manager, request),
+                str(request.get('op')),
+            )
+        except RequestError as e:
+            reply.update(ok=False, error=str(e))
+        except Exception as e:
+            # A failing request must not take the daemon down with it
+            print(f"Error handling {request.get('op')!r}: {e!r}", file=sys.stderr)
+            reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+        else:
+            reply.update(ok=True, result=result)
+        return reply
@@ -4,18 +4,101 @@ Outlook Manager for macOS
 Manages Microsoft Outlook operations including email search functionality.
 """
 
-import subprocess
+import contextvars
+import os
 import sys
 import json
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from applescript_session import AppleScriptSession, ScriptBackend
+from applescript_templates import STALE_FOLDER, flag_arg, folder_groups_arg, get_template
+from bridge_metrics import metrics, report
+from bridge_records import Frame, ProtocolError, format_frame, is_frame, parse_frame, parse_number
+from deadline_scheduler import DeadlineScheduler, ScheduledBackend
+from folder_registry import FolderRegistry
+from folder_snapshot import FolderSnapshot, format_change
+from lookup_cache import LookupCache, lookup_key, parse_folder_counts
+from mail_export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_folders
+from mail_index import MailIndex, normalize_message_id
+from mime_headers import HeaderBlock, HeaderCache, decode_value, message_id_of, parse_headers, read_header_block
+from query_planner import CHUNK_SIZE, QueryPlan, SearchQuery, plan_search
+from warm_cache import PREFETCH_FOLDERS, WarmCache
+
+# Largest number of batch queries resolved by one script run
+BATCH_CHUNK_SIZE = 50
+
+# Worker processes searching the folders of different accounts at the same time
+DEFAULT_PARALLEL_ACCOUNTS = 4
+
+# Received-time range of the narrower search that hedges a slow one
+HEDGE_WINDOW_SECONDS = 30 * 24 * 3600
+# Subject matches of the hedge whose Message-ID is checked before it gives up
+HEDGE_VERIFY_LIMIT = 3
+
+T = TypeVar('T')
 
 
 class OutlookManager:
     """Manages Outlook operations using AppleScript on macOS."""
 
-    def __init__(self):
-        """Initialize the Outlook Manager."""
+    def __init__(self, session: Optional[ScriptBackend] = None, index: Optional[MailIndex] = None,
+                 folders: Optional[FolderRegistry] = None, cache: Optional[LookupCache] = None,
+                 snapshot: Optional[FolderSnapshot] = None,
+                 parallel_accounts: int = DEFAULT_PARALLEL_ACCOUNTS,
+                 scheduler: Optional[DeadlineScheduler] = None, warm: Optional[WarmCache] = None):
+        """
+        Initialize the Outlook Manager.
+
+        Args:
+            session: Backend to run scripts in (default: a new persistent AppleScript session)
+            index: Local metadata index consulted before live searches (default: none)
+            folders: Folder name -> id registry (default: one persisted in the cache directory)
+            cache: Recent-hit / not-found cache consulted before searching and opening (default: none)
+            snapshot: Folder message counts served by list_folders() (default: one persisted
+                      in the cache directory)
+            parallel_accounts: Worker processes that search same-named folders of several
+                               accounts at once (1: one script walks them in turn)
+            scheduler: Learns call latencies and sets each call's deadline from them, and
+                       lets slow searches be hedged (default: one over the persisted
+                       latencies for the AppleScript session, none for a given session)
+            warm: Recent messages of a few folders, filled by prefetch(), that opens of
+                  recent mail are matched against before scanning (default: none until
+                  prefetch() creates one)
+        """
         self.app_name = "Microsoft Outlook"
+        if session is None:
+            session = ScheduledBackend(AppleScriptSession(), scheduler)
+        elif scheduler is not None:
+            session = ScheduledBackend(session, scheduler)
+        self.session = session
+        self.scheduler = session.scheduler if isinstance(session, ScheduledBackend) else None
+        self.index = index
+        self.folders = folders or FolderRegistry(self._call)
+        self.cache = cache
+        self.snapshot = snapshot or FolderSnapshot(self._call)
+        self.parallel_accounts = parallel_accounts
+        self.warm = warm
+        self.headers = HeaderCache()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._forks: List[ScriptBackend] = []
+        self._idle_forks: List[ScriptBackend] = []
+        self._forks_lock = threading.Lock()
+
+    def close(self):
+        """Stop the script workers: the session's and those searching accounts in parallel."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        with self._forks_lock:
+            forks, self._forks, self._idle_forks = self._forks, [], []
+        for worker in forks:
+            worker.cancel()
+            worker.close()
+        self.session.close()
 
     def _run_applescript(self, script: str) -> Optional[str]:
         """
@@ -27,26 +110,155 @@ class OutlookManager:
         Returns:
             The output of the script or None if execution failed
         """
-        try:
-            result = subprocess.run(
-                ['osascript', '-e', script],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            print(f"Error executing AppleScript: {e.stderr}", file=sys.stderr)
+        return self.session.run(script)
+
+    def _call(self, name: str, argv: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Run a registered AppleScript template.
+
+        Args:
+            name: Template name from applescript_templates
+            argv: String arguments passed to the template's run handler
+
+        Returns:
+            The output of the script or None if execution failed
+        """
+        return self.session.call(get_template(name, self.app_name), argv)
+
+    def _call_in_folders(self, name: str, folders: List[str], argv: Optional[List[str]] = None,
+                         grouped: bool = False) -> Optional[str]:
+        """
+        Run a template against every folder registered under the given names.
+
+        The template receives the resolved folder ids as its first argument.
+
+        Args:
+            name: Template name from applescript_templates
+            folders: Folder names to resolve through the registry, in search order
+            argv: Further arguments after the folder ids
+            grouped: If True, pass one id group per folder name so the script can
+                     tell which name matched; otherwise a single merged group
+
+        Returns:
+            The script output, or "NOTFOUND" if no folder has any of the names. If
+            the script reports a folder id that no longer exists, the registry is
+            refreshed and the script run once more.
+        """
+        with metrics.folders(folders):
+            for attempt in range(2):
+                groups = [self.folders.resolve(folder) for folder in folders]
+                if not any(groups):
+                    return "NOTFOUND"
+                if not grouped:
+                    merged = []
+                    for group in groups:
+                        merged.extend(folder_id for folder_id in group if folder_id not in merged)
+                    groups = [merged]
+                result = self._call(name, [folder_groups_arg(groups)] + list(argv or []))
+                if result != STALE_FOLDER:
+                    return result
+                self.folders.invalidate()
+        return "NOTFOUND"
+
+    def _account_groups(self, folders: List[str]) -> Optional[Dict[str, List[List[int]]]]:
+        """
+        Split the folders' id groups by account, for searching the accounts in parallel.
+
+        Returns:
+            {account: one id group per folder name, empty where the account has no
+            such folder}, or None if the folders belong to fewer than two accounts,
+            parallel_accounts is 1 or the session cannot run calls in parallel
+        """
+        if self.parallel_accounts < 2:
+            return None
+        by_account: Dict[str, List[List[int]]] = {}
+        for position, folder in enumerate(folders):
+            self.folders.resolve(folder)
+            for entry in self.folders.lookup(folder):
+                groups = by_account.setdefault(str(entry['account']), [[] for _ in folders])
+                groups[position].append(entry['id'])
+        if len(by_account) < 2:
+            return None
+        worker = self._lease_worker()
+        if worker is None:
             return None
+        self._release_worker(worker)
+        return by_account
+
+    def _lease_worker(self) -> Optional[ScriptBackend]:
+        with self._forks_lock:
+            if self._idle_forks:
+                return self._idle_forks.pop()
+        worker = self.session.fork()
+        if worker is not None:
+            with self._forks_lock:
+                self._forks.append(worker)
+        return worker
+
+    def _release_worker(self, worker: ScriptBackend):
+        with self._forks_lock:
+            if worker in self._forks:
+                self._idle_forks.append(worker)
+
+    def _run_per_account(self, task: Callable[[ScriptBackend, List[List[int]]], T],
+                         account_groups: Dict[str, List[List[int]]],
+                         settled: Optional[Callable[[Dict[str, T]], bool]] = None) -> Dict[str, T]:
+        """
+        Run task(worker, groups) for every account at once, each on its own worker process.
+
+        Args:
+            task: Called with a worker and one account's folder id groups
+            account_groups: Output of _account_groups()
+            settled: Called with the results so far whenever a piece finishes; once it
+                     returns True, the pieces still running are cancelled
+
+        Returns:
+            The results of the pieces that finished, by account
+        """
+        running: Dict[str, ScriptBackend] = {}
+
+        def run_piece(account: str) -> T:
+            worker = self._lease_worker()
+            running[account] = worker
+            try:
+                return task(worker, account_groups[account])
+            finally:
+                running.pop(account, None)
+                self._release_worker(worker)
+
+        # Each piece runs in a copy of the caller's context, so its spans keep the folder tag
+        futures = {self._pool().submit(contextvars.copy_context().run, run_piece, account): account
+                   for account in account_groups}
+        results: Dict[str, T] = {}
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if settled is not None and settled(results):
+                    break
+        finally:
+            for future, account in futures.items():
+                if not future.cancel() and not future.done():
+                    worker = running.get(account)
+                    if worker is not None:
+                        worker.cancel()
+        return results
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.parallel_accounts,
+                                                thread_name_prefix='outlook-account')
+        return self._executor
+
+    def _folder_counts(self, folders: List[str]) -> Optional[Dict[str, int]]:
+        """Return {folder id: message count} of the named folders, or None if counting failed."""
+        result = self._call_in_folders('folder_counts', folders)
+        with metrics.span('parse', 'folder_counts', ','.join(folders)):
+            return parse_folder_counts(result)
 
     def is_outlook_running(self) -> bool:
         """Check if Microsoft Outlook is running."""
-        script = f'''
-        tell application "System Events"
-            return (name of processes) contains "{self.app_name}"
-        end tell
-        '''
-        result = self._run_applescript(script)
+        with metrics.precheck():
+            result = self._call('is_outlook_running')
         return result == "true"
 
     def open_email(self, email_id: str) -> bool:
@@ -63,20 +275,7 @@ class OutlookManager:
             print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
             return False
 
-        script = f'''
-        tell application "{self.app_name}"
-            try
-                set theMessage to message id {email_id}
-                open theMessage
-                activate
-                return "SUCCESS"
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
+        result = self._call('open_message', [str(email_id)])
 
         if result and result == "SUCCESS":
             return True
@@ -85,41 +284,41 @@ class OutlookManager:
             print(f"Error opening email: {error_msg}", file=sys.stderr)
             return False
 
-    def list_folders(self) -> List[Dict[str, any]]:
+    def list_folders(self, max_age: Optional[float] = None) -> List[Dict[str, any]]:
         """
         List all mail folders in Outlook with their message counts.
 
+        Args:
+            max_age: Answer from the folder snapshot without contacting Outlook if it
+                     was refreshed at most this many seconds ago (default: always refresh)
+
         Returns:
-            List of dictionaries containing folder information
+            List of dictionaries containing folder information ('id', 'name',
+            'count', 'unread')
         """
-        if not self.is_outlook_running():
-            print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+        if max_age is not None and self.snapshot.age() <= max_age:
+            return self.snapshot.listing()
+
+        if self.refresh_folder_snapshot() is None:
             return []
+        return self.snapshot.listing()
+
+    def refresh_folder_snapshot(self) -> Optional[List[Dict[str, object]]]:
+        """
+        Refresh the folder snapshot, recounting only folders whose markers changed.
 
-        script = f'''
-        tell application "{self.app_name}"
-            set folderInfo to {{}}
-            try
-                repeat with aFolder in (get every mail folder)
-                    set folderName to name of aFolder
-                    set msgCount to count messages of aFolder
-                    set info to folderName & "|" & msgCount
-                    set end of folderInfo to info
-                end repeat
-
-                set AppleScript's text item delimiters to "
-"
-                set resultText to folderInfo as text
-                set AppleScript's text item delimiters to ""
-                return resultText
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
+        Returns:
+            The changes since the previous snapshot (see folder_snapshot.diff_folders()),
+            or None if Outlook is not running or could not be read
+        """
+        if not self.is_outlook_running():
+            print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+            return None
+        return self.snapshot.refresh()
 
+    @staticmethod
+    def _parse_folder_list(result: Optional[str]) -> List[Dict[str, any]]:
+        """Parse the output of the list_folders template."""
         if not result:
             return []
 
@@ -127,18 +326,18 @@ class OutlookManager:
             print(f"Error listing folders: {result[6:]}", file=sys.stderr)
             return []
 
+        try:
+            frame = parse_frame(result, 2, 'folders')
+        except ProtocolError as e:
+            print(f"Error listing folders: {e}", file=sys.stderr)
+            return []
+
         folders = []
-        if result:
-            lines = result.split('\n')
-            for line in lines:
-                if '|' in line:
-                    parts = line.rsplit('|', 1)
-                    if len(parts) == 2:
-                        name, count = parts
-                        try:
-                            folders.append({'name': name, 'count': int(count)})
-                        except ValueError:
-                            continue
+        for name, count in frame.records:
+            try:
+                folders.append({'name': name, 'count': int(count)})
+            except ValueError:
+                continue
 
         return folders
 
@@ -155,107 +354,505 @@ class OutlookManager:
         Returns:
             True if found and opened, False otherwise
         """
-        if not self.is_outlook_running():
-            print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
-            return False
+        result = self.search_and_open_in_folders(subject, [folder], exact_match, internet_message_id)
+        if result['success']:
+            print(f"SUCCESS: Found and opened email")
+        return result['success']
 
-        # Escape double quotes in search term
-        escaped_subject = subject.replace('"', '\\"').replace('\\', '\\\\')
-        escaped_folder = folder.replace('"', '\\"')
-        escaped_message_id = internet_message_id.replace('"', '\\"').replace('<', '').replace('>', '') if internet_message_id else None
+    def search_and_open_in_folders(self, subject: str, folders: List[str], exact_match: bool = True,
+                                   internet_message_id: str = None, policy: str = "first") -> Dict[str, object]:
+        """
+        Search several folders in order with a single script run and open the match.
 
-        # Build the search condition
-        if exact_match:
-            subject_condition = f'subject is "{escaped_subject}"'
-        else:
-            subject_condition = f'subject contains "{escaped_subject}"'
-
-        script = f'''
-        tell application "{self.app_name}"
-            try
-                set foundMessage to missing value
-
-                -- Search through all folders with matching name
-                repeat with aFolder in (get every mail folder)
-                    if name of aFolder is "{escaped_folder}" then
-                        -- Get messages matching criteria
-                        set matchingMessages to (messages of aFolder whose {subject_condition})
-
-                        if (count of matchingMessages) > 0 then
-                            -- If we have internet_message_id, find exact match
-                            {"set msgIdToFind to " + '"' + escaped_message_id + '"' if escaped_message_id else ""}
-
-                            repeat with aMessage in matchingMessages
-                                {"try" if escaped_message_id else ""}
-                                    {"set msgSource to source of aMessage" if escaped_message_id else ""}
-                                    {"if msgSource contains msgIdToFind then" if escaped_message_id else ""}
-                                        set foundMessage to aMessage
-                                        exit repeat
-                                    {"end if" if escaped_message_id else ""}
-                                {"end try" if escaped_message_id else ""}
-                            end repeat
-
-                            -- If no internet_message_id match or no internet_message_id provided, use first match
-                            if foundMessage is missing value and (count of matchingMessages) > 0 then
-                                set foundMessage to item 1 of matchingMessages
-                            end if
-
-                            -- Open the message
-                            if foundMessage is not missing value then
-                                open foundMessage
-                                activate
-                                set msgSubject to subject of foundMessage
-                                set msgSender to sender of foundMessage
-                                set msgDate to time received of foundMessage
-                                return "SUCCESS|SUBJECT:" & msgSubject & "|SENDER:" & (address of msgSender) & "|DATE:" & (msgDate as string)
-                            end if
-                        end if
-                    end if
-                end repeat
-
-                return "NOTFOUND"
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
+        Args:
+            subject: The subject text to search for
+            folders: Folder names to search, in priority order
+            exact_match: If True, match exact subject; if False, match substring
+            internet_message_id: Internet Message-ID to find exact email
+            policy: "first" stops at the first folder with a match; "newest" searches
+                    every folder and opens the most recently received match
+
+        Returns:
+            Dictionary with 'success' and, on success, the matched 'folder', 'id',
+            'subject', 'sender', 'date', whether the Message-ID confirmed the
+            match ('matched_message_id') and which path found it ('source':
+            message-id-map, index, warm, cache, live or hedge); on failure an
+            'error' message
+        """
+        if policy not in ("first", "newest"):
+            raise ValueError(f"Unknown search policy: {policy}")
+
+        if not self.is_outlook_running():
+            return {'success': False, 'error': f"{self.app_name} is not running. Please start Outlook first."}
+
+        # A previously seen Message-ID opens directly by native id, no scan
+        if internet_message_id and self.index is not None:
+            outlook_id = self.index.lookup_message_id(internet_message_id)
+            if outlook_id is not None:
+                if self.open_verified_message(outlook_id, internet_message_id):
+                    indexed = self.index.find_by_message_id(internet_message_id)
+                    return {
+                        'success': True,
+                        'folder': indexed['folder'] if indexed else None,
+                        'id': outlook_id,
+                        'matched_message_id': True,
+                        'source': 'message-id-map',
+                    }
+                self.index.forget_message_id(internet_message_id)
+
+        # Answer from the local index when it has the message; stale hits fall through
+        indexed = self._indexed_match(subject, folders, exact_match, internet_message_id, policy)
+        if indexed is not None:
+            if self.open_email(str(indexed['id'])):
+                email_info = self._index_record_to_email(indexed)
+                email_info.update({
+                    'success': True,
+                    'id': indexed['id'],
+                    'matched_message_id': bool(internet_message_id) and
+                        indexed['message_id'] == normalize_message_id(internet_message_id),
+                    'source': 'index',
+                })
+                return email_info
+            self.index.remove_message(indexed['id'])
+
+        # Recent mail is matched against the prefetched window; only the open goes to Outlook
+        counts = None
+        if self.warm is not None and self.warm.covers(folders):
+            counts = self._folder_counts(folders)
+            warm = self._warm_open(subject, folders, exact_match, internet_message_id, policy, counts)
+            if warm is not None:
+                return warm
+
+        # Repeated queries are answered from the cache while the folders' counts are unchanged
+        cache_key = None
+        if self.cache is not None:
+            cache_key = lookup_key('open', subject, bool(exact_match), normalize_message_id(internet_message_id) or '',
+                                   folders, policy)
+            if counts is None:
+                counts = self._folder_counts(folders)
+            cached = self._cached_open(cache_key, counts)
+            if cached is not None:
+                if not cached['success']:
+                    cached['error'] = f"No email found with '{subject}' in {', '.join(folders)}"
+                return cached
+
+        argv = [subject, flag_arg(exact_match), normalize_message_id(internet_message_id) or '', policy]
+        source = 'live'
+        result = self._search_accounts(folders, argv)
+        if result is None:
+            hedged = self._hedged_search(folders, argv)
+            if hedged is not None:
+                result, source = hedged
+        if result is None:
+            result = self._call_in_folders('search_and_open', folders, argv, grouped=True)
 
         if not result:
-            return False
+            return {'success': False, 'error': 'AppleScript execution failed'}
 
         if result == "NOTFOUND":
-            print(f"No email found with '{subject}' in {folder}", file=sys.stderr)
-            return False
+            if cache_key is not None and counts is not None:
+                self.cache.put(cache_key, None, counts)
+            return {'success': False, 'error': f"No email found with '{subject}' in {', '.join(folders)}"}
 
         if result.startswith("ERROR:"):
-            print(f"Error: {result[6:]}", file=sys.stderr)
+            return {'success': False, 'error': result[6:]}
+
+        if is_frame(result):
+            try:
+                with metrics.span('parse', 'search_and_open', ','.join(folders)):
+                    frame = parse_frame(result, 6, 'opened')
+                group, msg_id, matched, msg_date, sender, msg_subject = frame.records[0]
+                outlook_id = int(msg_id)
+                folder_name = folders[int(group) - 1]
+            except (ProtocolError, ValueError, IndexError):
+                return {'success': False, 'error': f"Unexpected result: {result[:200]}"}
+
+            matched_by_id = matched == 'true'
+            if internet_message_id and self.index is not None and matched_by_id:
+                self.index.remember_message_id(internet_message_id, outlook_id)
+
+            message = {
+                'folder': folder_name,
+                'id': outlook_id,
+                'subject': msg_subject,
+                'sender': sender,
+                'date': msg_date,
+                'matched_message_id': matched_by_id,
+            }
+            if cache_key is not None and counts is not None:
+                self.cache.put(cache_key, message, counts)
+            return dict(message, success=True, source=source)
+
+        return {'success': False, 'error': f"Unexpected result: {result[:200]}"}
+
+    def prefetch(self, folders: Optional[List[str]] = None) -> Optional[Dict[str, int]]:
+        """
+        Load the newest messages of folders into the warm cache with one script run.
+
+        Args:
+            folders: Folder names to prefetch (default: Inbox and Sent Items)
+
+        Returns:
+            Mapping of folder name to the number of messages kept, or None if the
+            script run failed (the folders' old windows are dropped)
+        """
+        folders = folders or PREFETCH_FOLDERS
+        if self.warm is None:
+            self.warm = WarmCache()
+        since = time.time() - self.warm.window_seconds
+        result = self._call_in_folders('recent_messages', folders, [str(int(since))], grouped=True)
+        with metrics.span('parse', 'recent_messages', ','.join(folders)):
+            parsed = self._parse_recent(result, folders)
+        if parsed is None:
+            self.warm.drop(folders)
+            return None
+
+        counts, records = parsed
+        loaded = {}
+        for folder in folders:
+            folder_ids = [str(folder_id) for folder_id in self.folders.resolve(folder)]
+            loaded[folder] = self.warm.load(folder, [record for record in records if record['folder'] == folder],
+                                            {folder_id: counts.get(folder_id, 0) for folder_id in folder_ids}, since)
+        return loaded
+
+    @staticmethod
+    def _parse_recent(result: Optional[str],
+                      folders: List[str]) -> Optional[Tuple[Dict[str, int], List[Dict[str, object]]]]:
+        """Parse recent_messages output into {folder id: message count} and message dictionaries."""
+        if result == "NOTFOUND":
+            return {}, []
+        if not is_frame(result):
+            error = result[6:] if result and result.startswith("ERROR:") else "AppleScript execution failed"
+            print(f"Error prefetching {', '.join(folders)}: {error}", file=sys.stderr)
+            return None
+
+        try:
+            frame = parse_frame(result, 6, 'recent')
+            counts = {}
+            for entry in frame.meta:
+                if entry:
+                    folder_id, _, count = entry.partition('=')
+                    counts[folder_id] = int(count)
+        except (ProtocolError, ValueError) as e:
+            print(f"Error prefetching {', '.join(folders)}: {e}", file=sys.stderr)
+            return None
+
+        records = []
+        for msg_id, group, msg_subject, sender, received, internet_id in frame.records:
+            try:
+                records.append({
+                    'id': int(msg_id),
+                    'subject': msg_subject,
+                    'sender': sender,
+                    'received': parse_number(received),
+                    'message_id': normalize_message_id(internet_id),
+                    'folder': folders[int(group) - 1],
+                })
+            except (ValueError, IndexError):
+                continue
+        return counts, records
+
+    def _warm_open(self, subject: str, folders: List[str], exact_match: bool, internet_message_id: Optional[str],
+                   policy: str, counts: Optional[Dict[str, int]]) -> Optional[Dict[str, object]]:
+        """
+        Open the message the warm cache picks for a query, reloading windows whose folders changed.
+
+        Returns:
+            A search_and_open_in_folders() result with source 'warm', or None if
+            the cache cannot decide the query (or its pick no longer opens)
+        """
+        if counts is None:
+            self.warm.record(False)
+            return None
+        changed = [folder for folder in folders
+                   if not self.warm.is_current(folder, {str(folder_id): counts.get(str(folder_id))
+                                                        for folder_id in self.folders.resolve(folder)})]
+        if changed and self.prefetch(changed) is None:
+            self.warm.record(False)
+            return None
+
+        match = self.warm.lookup(subject, folders, exact_match, internet_message_id, policy)
+        if match is not None and self._call('open_message', [str(match['id'])]) != "SUCCESS":
+            self.warm.discard(match['id'])
+            match = None
+        self.warm.record(match is not None)
+        if match is None:
+            return None
+        if internet_message_id and self.index is not None and match['matched_message_id']:
+            self.index.remember_message_id(internet_message_id, match['id'])
+        return {
+            'success': True,
+            'folder': match['folder'],
+            'id': match['id'],
+            'subject': match['subject'],
+            'sender': match['sender'],
+            'date': datetime.fromtimestamp(match['received']).strftime('%Y-%m-%d %H:%M:%S'),
+            'matched_message_id': match['matched_message_id'],
+            'source': 'warm',
+        }
+
+    def _search_accounts(self, folders: List[str], argv: List[str]) -> Optional[str]:
+        """
+        Run search_and_open over each account's folders in parallel and open the winner.
+
+        The winner is the match the single script would have opened: with policy
+        "first" the earliest folder name with a match, then a match confirmed by
+        its Message-ID, then the newest. Nothing beats a confirmed match in the
+        first folder (or, with policy "newest", any confirmed match), so one ends
+        the search at once and the other accounts' searches are cancelled.
+
+        Args:
+            folders: Folder names, in priority order
+            argv: search_and_open arguments after the folder groups
+
+        Returns:
+            search_and_open output for the opened match, "NOTFOUND" or an error
+            reply; None if the accounts are not searched in parallel or a folder
+            id went stale (the caller then runs the single script)
+        """
+        first = argv[3] == "first"
+        with metrics.folders(folders):
+            account_groups = self._account_groups(folders)
+            if account_groups is None:
+                return None
+            template = get_template('search_and_open', self.app_name)
+
+            def search(worker: ScriptBackend, groups: List[List[int]]) -> Tuple[Optional[str], Optional[tuple]]:
+                result = worker.call(template, [folder_groups_arg(groups)] + argv + [flag_arg(False)])
+                with metrics.span('parse', 'search_and_open'):
+                    return result, self._match_rank(result, first)
+
+            def settled(results: Dict[str, Tuple[Optional[str], Optional[tuple]]]) -> bool:
+                return any(rank is not None and rank[:2] == (1, False) for _, rank in results.values())
+
+            results = self._run_per_account(search, account_groups, settled)
+
+        ranked = sorted((rank, result) for result, rank in results.values() if rank is not None)
+        if ranked:
+            result = ranked[0][1]
+            outlook_id = parse_frame(result, 6, 'opened').records[0][1]
+            opened = self._call('open_message', [outlook_id])
+            return result if opened == "SUCCESS" else (opened or "ERROR:Could not open the message")
+
+        replies = [result for result, _ in results.values()]
+        if STALE_FOLDER in replies:
+            return None
+        return next((reply for reply in replies if reply != "NOTFOUND"), "NOTFOUND")
+
+    def _hedged_search(self, folders: List[str], argv: List[str]) -> Optional[Tuple[str, str]]:
+        """
+        Run search_and_open and, once it runs long, a search of recent mail alongside it.
+
+        Most lookups are for recent mail, and a search is usually slow because it
+        walks years of it. After the search has run for the scheduler's hedge
+        delay for these folders (its 95th percentile there, when that is long
+        enough to be worth a second search), planned_search looks at the last
+        HEDGE_WINDOW_SECONDS on a second worker. The hedge's match is
+        only taken when it must be the one the full search would open: a match
+        in the first folder (any folder with policy "newest"), and one carrying
+        the wanted Message-ID when there is one. Whichever side answers first is
+        opened and the other is cancelled; a hedge without such a match leaves
+        the full search to finish within its own deadline.
+
+        Args:
+            folders: Folder names, in priority order
+            argv: search_and_open arguments after the folder groups
+
+        Returns:
+            (search_and_open output for the opened match, "NOTFOUND" or an error
+            reply, 'live' or 'hedge'); None if no scheduler has learned a hedge
+            delay for these folders or the session cannot run calls in parallel
+        """
+        if self.scheduler is None or self.parallel_accounts < 2:
+            return None
+        delay = self.scheduler.hedge_delay('search_and_open', ','.join(folders))
+        if delay is None:
+            return None
+        worker = self._lease_worker()
+        if worker is None:
+            return None
+        # Resolved up front: the hedge must not refresh the registry through the session the search holds
+        with metrics.folders(folders):
+            groups = [self.folders.resolve(folder) for folder in folders]
+
+        try:
+            # Found matches are opened below, so either side can be cancelled safely
+            primary = self._pool().submit(contextvars.copy_context().run, self._call_in_folders,
+                                          'search_and_open', folders, argv + [flag_arg(False)], True)
+            done, _ = wait([primary], timeout=delay)
+            hedge = None
+            if not done:
+                hedge = self._pool().submit(contextvars.copy_context().run, self._recent_match, worker, folders,
+                                            groups, argv)
+                done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+                if primary not in done and hedge.result() is None:
+                    done, _ = wait([primary])
+
+            if hedge is not None and hedge in done and hedge.result() is not None:
+                self.session.cancel()
+                result, source, opener = hedge.result(), 'hedge', worker
+            else:
+                if hedge is not None and not hedge.done():
+                    worker.cancel()
+                    wait([hedge])
+                result, source, opener = primary.result(), 'live', self.session
+
+            if is_frame(result):
+                outlook_id = parse_frame(result, 6, 'opened').records[0][1]
+                opened = opener.call(get_template('open_message', self.app_name), [outlook_id])
+                if opened != "SUCCESS":
+                    result = opened or "ERROR:Could not open the message"
+            return result, source
+        finally:
+            self._release_worker(worker)
+
+    def _recent_match(self, worker: ScriptBackend, folders: List[str], groups: List[List[int]],
+                      argv: List[str]) -> Optional[str]:
+        """
+        Find the match of a search_and_open query among recent mail, without opening it.
+
+        Every call goes to worker; the folders are already resolved to groups.
+
+        Returns:
+            A search_and_open style 'opened' frame for the match, or None if the
+            recent mail holds no match the full search would certainly open
+        """
+        subject, exact, message_id, policy = argv
+        plan = plan_search(SearchQuery(subject, exact=exact == "1", since=time.time() - HEDGE_WINDOW_SECONDS,
+                                       limit=None))
+        if not any(groups):
+            return None
+        with metrics.folders(folders):
+            result = worker.call(get_template('planned_search', self.app_name),
+                                 [folder_groups_arg(groups)] + plan.template_args((plan.start, plan.end)))
+            with metrics.span('parse', 'planned_search'):
+                records = self._parse_window(result, folders) if result != STALE_FOLDER else None
+        if not records:
+            return None
+
+        for record in records:
+            record['group'] = folders.index(record['folder']) + 1
+        if policy == "first":
+            # An earlier folder may hold an older match that the full search would open instead
+            if min(record['group'] for record in records) != 1:
+                return None
+            records = [record for record in records if record['group'] == 1]
+        records.sort(key=lambda record: -record['received'])
+
+        match = records[0]
+        if message_id:
+            # The full search prefers a match carrying the Message-ID, however old
+            template = get_template('message_headers', self.app_name)
+            for record in records[:HEDGE_VERIFY_LIMIT]:
+                headers = worker.call(template, [str(record['id'])])
+                if headers and headers != "NOTFOUND" and message_id_of(parse_headers(headers)) == message_id:
+                    match = record
+                    break
+            else:
+                return None
+
+        received = datetime.fromtimestamp(match['received']).strftime('%Y-%m-%d %H:%M:%S')
+        return format_frame('opened', [(match['group'], match['id'], "true" if message_id else "false", received,
+                                        match['sender'], match['subject'])], [match['received']])
+
+    @staticmethod
+    def _match_rank(result: Optional[str], first: bool) -> Optional[tuple]:
+        """Sort key of a search_and_open match (smaller wins), or None if the reply is no match."""
+        if not is_frame(result):
+            return None
+        try:
+            frame = parse_frame(result, 6, 'opened')
+            group, matched = int(frame.records[0][0]), frame.records[0][2] == 'true'
+            received = parse_number(frame.meta[0])
+        except (ProtocolError, ValueError, IndexError):
+            return None
+        # With policy "newest" every folder ranks like the first
+        return (group if first else 1, not matched, -received)
+
+    def _cached_open(self, key: str, counts: Optional[Dict[str, int]]) -> Optional[Dict[str, object]]:
+        """
+        Answer an open query from the lookup cache.
+
+        Returns:
+            A search_and_open_in_folders() result with source 'cache' (a cached
+            not-found has success False), or None if the query has to run live
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if not self.cache.is_current(entry, counts):
+            self.cache.forget(key)
+            return None
+        message = entry['message']
+        if message is None:
+            return {'success': False, 'source': 'cache'}
+        if self._call('open_message', [str(message['id'])]) == "SUCCESS":
+            return dict(message, success=True, source='cache')
+        self.cache.forget(key)
+        return None
+
+    def open_verified_message(self, outlook_id: int, message_id: str) -> bool:
+        """
+        Open a message by native id after checking it still carries the expected Message-ID.
+
+        Args:
+            outlook_id: Native Outlook message id from the lookup table
+            message_id: Internet Message-ID the id was recorded for
+
+        Returns:
+            True if the message exists, matches and was opened; False if the mapping is stale
+        """
+        # A message's Message-ID never changes, so headers seen before settle the check
+        cached = self.headers.get(int(outlook_id))
+        if cached is not None:
+            if message_id_of(cached) != normalize_message_id(message_id):
+                return False
+            if self._call('open_message', [str(int(outlook_id))]) == "SUCCESS":
+                return True
+            self.headers.discard(int(outlook_id))
             return False
 
-        if result.startswith("SUCCESS|"):
-            # Parse and display the email info
-            info = result[8:]  # Remove "SUCCESS|"
-            email_info = {}
-            parts = info.split('|')
+        result = self._call('open_verified_message', [str(int(outlook_id)), normalize_message_id(message_id)])
+        return result == "SUCCESS"
 
-            for part in parts:
-                if ':' in part:
-                    key, value = part.split(':', 1)
-                    email_info[key.lower()] = value
+    def message_headers(self, outlook_id: int) -> Optional[HeaderBlock]:
+        """
+        Return the parsed header block of a message, fetched from Outlook once per id.
 
-            print(f"SUCCESS: Found and opened email")
-            return True
+        Only the message's `headers` cross the bridge, never its body or attachments.
+
+        Args:
+            outlook_id: Native Outlook message id
 
-        return False
+        Returns:
+            The HeaderBlock, or None if the message does not exist
+        """
+        cached = self.headers.get(int(outlook_id))
+        if cached is not None:
+            return cached
 
-    def search_emails_by_subject(self, subject: str, folder: str = "inbox") -> List[Dict[str, str]]:
+        result = self._call('message_headers', [str(int(outlook_id))])
+        if not result or result == "NOTFOUND":
+            return None
+        with metrics.span('parse', 'message_headers'):
+            headers = parse_headers(result)
+        self.headers.put(int(outlook_id), headers)
+        return headers
+
+    def search_emails_by_subject(self, subject: str, folder: str = "inbox", exact: bool = False,
+                                 sender: Optional[str] = None, since: Optional[float] = None,
+                                 until: Optional[float] = None, limit: int = 1) -> List[Dict[str, str]]:
         """
         Search for emails by subject in a specific folder.
 
         Args:
-            subject: The subject text to search for (case-insensitive partial match)
+            subject: The subject text to search for (case-insensitive)
             folder: The folder name to search in (e.g., 'inbox', 'sent', or custom folder name)
+            exact: If True, match the whole subject; if False, match a substring
+            sender: Only messages whose sender address contains this text
+            since: Only messages received at or after this Unix timestamp
+            until: Only messages received before this Unix timestamp
+            limit: Maximum number of results, newest first
 
         Returns:
             List of dictionaries containing email information (including email ID)
@@ -264,85 +861,477 @@ class OutlookManager:
             print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
             return []
 
-        # Escape double quotes in search term and folder name
-        escaped_subject = subject.replace('"', '\\"')
-        escaped_folder = folder.replace('"', '\\"')
-
-        script = f'''
-        tell application "{self.app_name}"
-            set searchResults to {{}}
-            set searchTerm to "{escaped_subject}"
-            set foundResult to false
-
-            try
-                -- Search through all mail folders with matching name (handles multiple accounts)
-                repeat with aFolder in (get every mail folder)
-                    if name of aFolder is "{escaped_folder}" then
-                        set allMessages to messages of aFolder
-
-                        repeat with aMessage in allMessages
-                            set msgSubject to subject of aMessage
-
-                            -- AppleScript contains is case-insensitive by default
-                            if msgSubject contains searchTerm then
-                                set msgSender to sender of aMessage
-                                set msgDate to time received of aMessage
-                                set msgId to id of aMessage
-                                set msgInfo to "SUBJECT:" & msgSubject & "|SENDER:" & (address of msgSender) & "|DATE:" & (msgDate as string) & "|ID:" & msgId
-                                set end of searchResults to msgInfo
-                                set foundResult to true
-                                -- Stop after finding first result for speed
-                                exit repeat
-                            end if
-                        end repeat
-
-                        -- If found in this folder, stop searching other folders
-                        if foundResult then exit repeat
-                    end if
-                end repeat
-
-                -- Join results with newline
-                set AppleScript's text item delimiters to "
-"
-                set resultText to searchResults as text
-                set AppleScript's text item delimiters to ""
-
-                return resultText
-            on error errMsg
-                return "ERROR:" & errMsg
-            end try
-        end tell
-        '''
-
-        result = self._run_applescript(script)
+        if self.index is not None and sender is None and since is None and until is None:
+            indexed = self.index.search_subject(subject, folder, exact=exact, limit=limit)
+            if indexed:
+                return [self._index_record_to_email(record) for record in indexed]
 
-        if not result:
+        query = SearchQuery(subject, exact=exact, sender=sender, since=since, until=until, limit=limit)
+        return [self._index_record_to_email(record) for record in self.iter_messages(query, [folder])]
+
+    def iter_messages(self, query: SearchQuery, folders: List[str], offset: int = 0,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, object]]:
+        """
+        Stream a planned search over folders, newest messages first.
+
+        Subject and received-time predicates are evaluated by Outlook in a
+        `whose` clause. The time range is fetched in windows from newest to
+        oldest, each sized to return about chunk_size matches (see
+        query_planner), and every window's matches are yielded as soon as it
+        returns. Fetching stops once query.limit results have been yielded.
+
+        Args:
+            query: The search criteria
+            folders: Folder names to search
+            offset: Number of leading results to skip
+            chunk_size: Target number of matches per script run
+
+        Yields:
+            Message dictionaries (id, subject, sender, received, folder). A failed
+            script run is reported on stderr and ends the stream.
+        """
+        plan = plan_search(query)
+        if plan.limit is not None:
+            merged = self._list_accounts(plan, folders, offset, chunk_size)
+            if merged is not None:
+                yield from merged
+                return
+
+        windows = plan.windows(chunk_size)
+        skipped = yielded = 0
+        for window in windows:
+            records = self._search_window(plan, folders, window)
+            if records is None:
+                return
+            windows.record(len(records))
+
+            # Windows arrive newest first, so sorting each one keeps the stream ordered
+            records.sort(key=lambda record: record['received'], reverse=True)
+            for record in records:
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                yield record
+                yielded += 1
+                if plan.limit is not None and yielded >= plan.limit:
+                    return
+
+    def _list_accounts(self, plan: QueryPlan, folders: List[str], offset: int,
+                       chunk_size: int) -> Optional[List[Dict[str, object]]]:
+        """
+        Run a limited planned search for each account in parallel and merge the results.
+
+        Each account stops scanning once it has offset + limit matches, so the
+        merged, newest-first list holds the same results as one scan over all of them.
+
+        Returns:
+            The merged page of results, or None if the accounts are not searched in
+            parallel or a piece failed (the caller then scans them in one script)
+        """
+        wanted = offset + plan.limit
+        with metrics.folders(folders):
+            account_groups = self._account_groups(folders)
+            if account_groups is None:
+                return None
+            template = get_template('planned_search', self.app_name)
+
+            def scan(worker: ScriptBackend, groups: List[List[int]]) -> Optional[List[Dict[str, object]]]:
+                windows = plan.windows(chunk_size)
+                found = []
+                for window in windows:
+                    result = worker.call(template, [folder_groups_arg(groups)] + plan.template_args(window))
+                    if result == STALE_FOLDER:
+                        return None
+                    with metrics.span('parse', 'planned_search'):
+                        records = self._parse_window(result, folders)
+                    if records is None:
+                        return None
+                    windows.record(len(records))
+                    found.extend(records)
+                    if len(found) >= wanted:
+                        break
+                return found
+
+            results = self._run_per_account(scan, account_groups)
+
+        if any(records is None for records in results.values()):
+            return None
+        # Merged in account order, so ties keep the order the single script returns
+        merged = sorted((record for account in account_groups for record in results[account]),
+                        key=lambda record: record['received'], reverse=True)
+        return merged[offset:wanted]
+
+    def _search_window(self, plan: QueryPlan, folders: List[str],
+                       window: Tuple[float, float]) -> Optional[List[Dict[str, object]]]:
+        """Run planned_search for one time window and parse its records."""
+        result = self._call_in_folders('planned_search', folders, plan.template_args(window), grouped=True)
+        with metrics.span('parse', 'planned_search', ','.join(folders)):
+            return self._parse_window(result, folders)
+
+    @staticmethod
+    def _parse_window(result: Optional[str], folders: List[str]) -> Optional[List[Dict[str, object]]]:
+        """Parse planned_search output into message dictionaries, or None on failure."""
+        if result == "NOTFOUND":
             return []
+        if not is_frame(result):
+            error = result[6:] if result and result.startswith("ERROR:") else "AppleScript execution failed"
+            print(f"Error searching emails: {error}", file=sys.stderr)
+            return None
+
+        try:
+            frame = parse_frame(result, 5, 'results')
+        except ProtocolError as e:
+            print(f"Error searching emails: {e}", file=sys.stderr)
+            return None
+
+        records = []
+        for msg_id, group, msg_subject, sender, received in frame.records:
+            try:
+                records.append({
+                    'id': int(msg_id),
+                    'subject': msg_subject,
+                    'sender': sender,
+                    'received': parse_number(received),
+                    'folder': folders[int(group) - 1],
+                })
+            except (ValueError, IndexError):
+                continue
+        return records
+
+    def export_folder_metadata(self, folder: str) -> Optional[List[Dict[str, object]]]:
+        """
+        Export id, subject, sender, received time and Message-ID of every message in a folder.
+
+        All folders with a matching name are exported in a single script run using
+        bulk property fetches, so the cost is one bridge round trip per folder name.
+
+        Args:
+            folder: The folder name to export
+
+        Returns:
+            List of message dictionaries, or None if the export failed
+        """
+        if not self.is_outlook_running():
+            print(f"Error: {self.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+            return None
+
+        result = self._call_in_folders('export_folder', [folder])
+        with metrics.span('parse', 'export_folder', folder):
+            return self._parse_export(result, folder)
+
+    def iter_folder_chunks(self, folder_id: int, start: int = 0,
+                           chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Tuple[int, int, List[Dict[str, object]]]]:
+        """
+        Stream the metadata of one folder's messages, chunk_size messages per script run.
+
+        Unlike export_folder_metadata(), only one chunk is held at a time, so
+        memory use does not grow with the size of the folder.
+
+        Args:
+            folder_id: Outlook id of the folder (see FolderRegistry)
+            start: Number of leading messages to skip, e.g. those a previous run exported
+            chunk_size: Messages read per script run
+
+        Yields:
+            (position, total, records): how many of the folder's messages have been
+            read including this chunk, the folder's message count as of this chunk,
+            and the chunk's message dictionaries (id, subject, sender, received,
+            message_id). At least one, possibly empty, chunk is yielded unless the
+            first run fails; a failed run is reported on stderr and ends the stream
+            with position < total. A folder that no longer exists is reported and
+            yields one empty chunk with total 0.
+        """
+        position = start
+        while True:
+            result = self._call('export_range', [str(folder_id), str(position + 1), str(chunk_size)])
+            if result == STALE_FOLDER:
+                print(f"Warning: folder {folder_id} no longer exists; skipping it", file=sys.stderr)
+                yield 0, 0, []
+                return
+            with metrics.span('parse', 'export_range'):
+                chunk = self._parse_export_range(result, folder_id)
+            if chunk is None:
+                return
+            total, records = chunk
+            # Records with separator characters are dropped by the parser, so advance by the range read
+            position = min(position + chunk_size, max(total, position))
+            yield position, total, records
+            if position >= total:
+                return
+
+    @classmethod
+    def _parse_export_range(cls, result: Optional[str], folder_id: int) -> Optional[Tuple[int, List[Dict[str, object]]]]:
+        """Parse export_range output into the folder's message count and the chunk's messages."""
+        if result is None:
+            return None
 
         if result.startswith("ERROR:"):
-            print(f"Error searching emails: {result[6:]}", file=sys.stderr)
-            return []
+            print(f"Error exporting folder {folder_id}: {result[6:]}", file=sys.stderr)
+            return None
 
-        # Parse results
-        emails = []
-        if result:
-            lines = result.split('\n')
-            for line in lines:
-                if not line:
-                    continue
+        try:
+            frame = parse_frame(result, 5, 'messages')
+            total = int(parse_number(frame.meta[0]))
+        except (ProtocolError, ValueError, IndexError) as e:
+            print(f"Error exporting folder {folder_id}: {e or 'no message count'}", file=sys.stderr)
+            return None
+        return total, cls._export_records(frame)
 
-                email_info = {}
-                parts = line.split('|')
+    @staticmethod
+    def _parse_export(result: Optional[str], folder: str) -> Optional[List[Dict[str, object]]]:
+        """Parse export_folder output into message dictionaries, or None on failure."""
+        if result is None:
+            return None
 
-                for part in parts:
-                    if ':' in part:
-                        key, value = part.split(':', 1)
-                        email_info[key.lower()] = value
+        if result == "NOTFOUND":
+            print(f"Error exporting {folder}: no such folder", file=sys.stderr)
+            return None
 
-                if email_info:
-                    emails.append(email_info)
+        if result.startswith("ERROR:"):
+            print(f"Error exporting {folder}: {result[6:]}", file=sys.stderr)
+            return None
 
-        return emails
+        try:
+            frame = parse_frame(result, 5, 'messages')
+        except ProtocolError as e:
+            print(f"Error exporting {folder}: {e}", file=sys.stderr)
+            return None
+
+        return OutlookManager._export_records(frame)
+
+    @staticmethod
+    def _export_records(frame: Frame) -> List[Dict[str, object]]:
+        """Convert the records of a 'messages' frame into message dictionaries."""
+        records = []
+        for msg_id, msg_subject, sender, received, internet_id in frame.records:
+            try:
+                records.append({
+                    'id': int(msg_id),
+                    'subject': msg_subject,
+                    'sender': sender,
+                    'received': parse_number(received),
+                    'message_id': normalize_message_id(internet_id),
+                })
+            except ValueError:
+                continue
+
+        return records
+
+    def batch_resolve(self, queries: Iterable[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+        """
+        Resolve many search/open queries with as few bridge calls as possible.
+
+        Each query is a dictionary with 'subject' and/or 'message_id', optional
+        'folders' (default: ["Inbox"]), 'exact' (default: True), 'action'
+        ("search" or "open", default "search") and an opaque 'id' echoed back.
+        Queries answered by the Message-ID table or the index are yielded
+        immediately; the rest are grouped by folder list and resolved with one
+        script run per group (chunked to BATCH_CHUNK_SIZE queries).
+
+        Args:
+            queries: Iterable of query dictionaries, e.g. parsed NDJSON lines
+
+        Yields:
+            One result dictionary per query, as soon as it is known, carrying
+            the query's position ('index') and 'id' plus 'success', 'folder',
+            'message' (id, subject, sender, received) and 'source', or 'error'
+        """
+        groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, object]]]] = {}
+
+        for position, query in enumerate(queries):
+            error = self._batch_query_error(query)
+            if error:
+                yield self._batch_result(position, query, error=error)
+                continue
+
+            query = dict(query)
+            query.setdefault('action', 'search')
+            query.setdefault('exact', True)
+            folders = tuple(query.get('folders') or ['Inbox'])
+
+            shortcut = self._batch_shortcut(position, query)
+            if shortcut is not None:
+                yield shortcut
+                continue
+
+            groups.setdefault(folders, []).append((position, query))
+
+        if groups and not self.is_outlook_running():
+            error = f"{self.app_name} is not running. Please start Outlook first."
+            for items in groups.values():
+                for position, query in items:
+                    yield self._batch_result(position, query, error=error)
+            return
+
+        for folders, items in groups.items():
+            for start in range(0, len(items), BATCH_CHUNK_SIZE):
+                yield from self._batch_resolve_group(list(folders), items[start:start + BATCH_CHUNK_SIZE])
+
+    @staticmethod
+    def _batch_query_error(query: object) -> Optional[str]:
+        """Validate one batch query, returning an error message if it is unusable."""
+        if isinstance(query, ValueError):
+            return f"Invalid JSON: {query}"
+        if not isinstance(query, dict):
+            return "Query must be a JSON object"
+        if not query.get('subject') and not query.get('message_id'):
+            return "Query needs a subject or a message_id"
+        if query.get('action', 'search') not in ('search', 'open'):
+            return f"Unknown action: {query.get('action')}"
+        folders = query.get('folders')
+        if folders is not None and (not isinstance(folders, list) or
+                                    not all(isinstance(f, str) for f in folders)):
+            return "folders must be a list of folder names"
+        return None
+
+    @staticmethod
+    def _batch_result(position: int, query: object, folder: Optional[str] = None,
+                      message: Optional[Dict[str, object]] = None, source: Optional[str] = None,
+                      error: Optional[str] = None) -> Dict[str, object]:
+        """Build one batch output record."""
+        result = {
+            'index': position,
+            'id': query.get('id') if isinstance(query, dict) else None,
+            'success': error is None and message is not None,
+        }
+        if message is not None:
+            result.update({'folder': folder, 'message': message, 'source': source})
+        else:
+            result['error'] = error or "Not found"
+        return result
+
+    def _batch_shortcut(self, position: int, query: Dict[str, object]) -> Optional[Dict[str, object]]:
+        """Answer a batch query from the Message-ID table or the index, if possible."""
+        if self.index is None:
+            return None
+
+        opening = query['action'] == 'open'
+        message_id = query.get('message_id')
+
+        if message_id:
+            outlook_id = self.index.lookup_message_id(message_id)
+            if outlook_id is not None:
+                if not opening or self.open_verified_message(outlook_id, message_id):
+                    indexed = self.index.find_by_message_id(message_id)
+                    message = {'id': outlook_id}
+                    if indexed:
+                        message.update(subject=indexed['subject'], sender=indexed['sender'],
+                                       received=indexed['received'])
+                    return self._batch_result(position, query, indexed['folder'] if indexed else None,
+                                              message, 'message-id-map')
+                self.index.forget_message_id(message_id)
+
+        if query.get('subject'):
+            indexed = self._indexed_match(query['subject'], list(query.get('folders') or ['Inbox']),
+                                          bool(query['exact']), message_id)
+            if indexed is not None:
+                if not opening or self.open_email(str(indexed['id'])):
+                    message = {key: indexed[key] for key in ('id', 'subject', 'sender', 'received')}
+                    return self._batch_result(position, query, indexed['folder'], message, 'index')
+                self.index.remove_message(indexed['id'])
+
+        return None
+
+    def _batch_resolve_group(self, folders: List[str],
+                             items: List[Tuple[int, Dict[str, object]]]) -> Iterator[Dict[str, object]]:
+        """Resolve queries sharing one folder list with a single script run."""
+        query_args = []
+        for _, query in items:
+            query_args.extend([
+                str(query.get('subject') or ''),
+                flag_arg(query['exact']),
+                normalize_message_id(query.get('message_id')) or '',
+                flag_arg(query['action'] == 'open'),
+            ])
+
+        result = self._call_in_folders('batch_resolve', folders, query_args, grouped=True)
+
+        records = [] if result == "NOTFOUND" else None
+        if is_frame(result):
+            try:
+                with metrics.span('parse', 'batch_resolve', ','.join(folders)):
+                    records = parse_frame(result, 6, 'results').records
+            except ProtocolError:
+                pass
+
+        if records is None:
+            error = result[6:] if result and result.startswith("ERROR:") else "AppleScript execution failed"
+            for position, query in items:
+                yield self._batch_result(position, query, error=error)
+            return
+
+        found = {}
+        for query_index, group, msg_id, msg_subject, sender, received in records:
+            try:
+                found[int(query_index) - 1] = (
+                    folders[int(group) - 1],
+                    {'id': int(msg_id), 'subject': msg_subject, 'sender': sender,
+                     'received': parse_number(received)}
+                )
+            except (ValueError, IndexError):
+                continue
+
+        opened_any = any(query['action'] == 'open' for _, query in items)
+        for offset, (position, query) in enumerate(items):
+            if offset not in found:
+                yield self._batch_result(position, query,
+                                         error=f"Not found in {', '.join(folders)}")
+                continue
+            folder, message = found[offset]
+            if query.get('message_id') and self.index is not None:
+                self.index.remember_message_id(query['message_id'], message['id'])
+            yield self._batch_result(position, query, folder, message, 'live')
+
+        if opened_any:
+            self._call('activate')
+
+    def build_index(self, folders: List[str]) -> Dict[str, int]:
+        """
+        Rebuild the local index for the given folders.
+
+        Args:
+            folders: Folder names to export and index
+
+        Returns:
+            Mapping of folder name to the number of messages indexed
+        """
+        counts = {}
+        for folder in folders:
+            records = self.export_folder_metadata(folder)
+            if records is None:
+                continue
+            counts[folder] = self.index.replace_folder(folder, records)
+        return counts
+
+    def _indexed_match(self, subject: str, folders: List[str], exact_match: bool,
+                       internet_message_id: Optional[str], policy: str = "first") -> Optional[Dict[str, object]]:
+        """Pick the message search_and_open_in_folders would open, using only the index."""
+        if self.index is None:
+            return None
+
+        wanted_id = normalize_message_id(internet_message_id)
+        best = None
+        for folder in folders:
+            candidates = self.index.search_subject(subject, folder, exact=exact_match, limit=50)
+            if not candidates:
+                continue
+            match = next((c for c in candidates if wanted_id and c['message_id'] == wanted_id), candidates[0])
+            if best is None or match['received'] > best['received']:
+                best = match
+            if policy == "first":
+                break
+        return best
+
+    @staticmethod
+    def _index_record_to_email(record: Dict[str, object]) -> Dict[str, str]:
+        """Convert an index row to the dictionary shape returned by live searches."""
+        return {
+            'subject': record['subject'],
+            'sender': record['sender'],
+            'date': datetime.fromtimestamp(record['received']).strftime('%Y-%m-%d %H:%M:%S'),
+            'id': str(record['id']),
+            'folder': record['folder'],
+        }
 
     def display_search_results(self, emails: List[Dict[str, str]], folder: str):
         """
@@ -367,9 +1356,41 @@ class OutlookManager:
             print(f"   {'-'*76}")
 
 
+def parse_date(value: str) -> float:
+    """Parse a YYYY-MM-DD date or ISO timestamp (local time) into a Unix timestamp."""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def refresh_snapshot_in_background():
+    """Start a detached `list-folders --max-age 0` run that refreshes the folder snapshot."""
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--no-index', 'list-folders', '--max-age', '0'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def watch_folders(manager: OutlookManager, interval: float):
+    """Refresh the folder snapshot every interval seconds and print each change until interrupted."""
+    print(f"Watching folder counts every {interval:g}s (Ctrl-C to stop)...", flush=True)
+    try:
+        while True:
+            changes = manager.refresh_folder_snapshot()
+            if changes:
+                stamp = datetime.now().strftime('%H:%M:%S')
+                for change in changes:
+                    print(f"{stamp}  {format_change(change)}", flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     """Main function to run the Outlook Manager."""
     import argparse
+    import atexit
 
     parser = argparse.ArgumentParser(
         description="Outlook Manager for macOS - Search and manage emails",
@@ -379,6 +1400,10 @@ Examples:
   List all folders:
     python outlook_manager.py list-folders
 
+  List folders from a snapshot up to 5 minutes old, or watch counts change:
+    python outlook_manager.py list-folders --max-age 300
+    python outlook_manager.py list-folders --watch 30
+
   Search in inbox:
     python outlook_manager.py search "Meeting" --folder Inbox
 
@@ -388,23 +1413,145 @@ Examples:
   Search in custom folder:
     python outlook_manager.py search "atlas" --folder "MongoDB atlas"
 
+  Open the message saved in an .eml file (matched by its Subject and Message-ID headers):
+    python outlook_manager.py search --eml ~/Downloads/report.eml --folder Inbox
+
+  Show the parsed headers of a message by its Outlook id:
+    python outlook_manager.py headers 12345
+
+  Search several folders in order with one script run, JSON result:
+    python outlook_manager.py search "Report" --folder "Sent Items" --folder Inbox --json
+
+  List the 10 newest matches without opening anything:
+    python outlook_manager.py find "Report" --folder Inbox --sender example.com --since 2024-01-01 --limit 10
+
+  Stream every match as NDJSON, one line per message as it is fetched:
+    python outlook_manager.py find "Report" --limit 0 --stream
+
+  Resolve many queries from NDJSON on stdin, one JSON result per line:
+    echo '{"subject": "Report", "folders": ["Inbox", "Sent Items"]}' | python outlook_manager.py batch
+
+  Export the metadata of every message in two folders to NDJSON (or Parquet), resumably:
+    python outlook_manager.py export --folder Inbox --folder Archive -o mail.ndjson
+    python outlook_manager.py export --folder Inbox --folder Archive -o mail.ndjson --resume
+    python outlook_manager.py export --folder Inbox -o mail.parquet --format parquet
+
+  Build the local index, then query it:
+    python outlook_manager.py index build --folder Inbox --folder "Sent Items"
+    python outlook_manager.py index query "Report" --contains
+    python outlook_manager.py index query "RE: quartely reprot" --fuzzy
+
+  Keep a manager resident and send it requests over a Unix socket:
+    python outlook_manager.py serve --idle-timeout 900 &
+    python outlook_client.py search '{"subject": "Report", "folders": ["Inbox"]}'
+
+  Warm the resident manager with recent Inbox and Sent Items mail, then check the hit rate:
+    python outlook_manager.py serve --prefetch Inbox --prefetch "Sent Items" &
+    python outlook_client.py stats
+
+  Show where the time of a search goes (spawn, compile, execute, parse):
+    python outlook_manager.py --profile --profile-out /tmp/outlook find "Report"
+
+  Show the call latencies learned so far and the deadlines derived from them:
+    python outlook_manager.py deadlines
+
   Note: The script automatically opens the first matching email found.
         """
     )
 
+    parser.add_argument(
+        '--index',
+        type=str,
+        dest='index_path',
+        default=None,
+        help='Path of the local metadata index (default: ~/.cache/ai-power-toys/outlook_index.sqlite3)'
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='Skip the local index and always search Outlook directly'
+    )
+    parser.add_argument(
+        '--refresh-folders',
+        action='store_true',
+        help='Discard the cached folder name -> id registry before running'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Skip the recent-hit / not-found cache of search-and-open queries'
+    )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=DEFAULT_PARALLEL_ACCOUNTS,
+        metavar='N',
+        help='Search the folders of up to N accounts at once in separate workers '
+             f'(default: {DEFAULT_PARALLEL_ACCOUNTS}, 1 to search them in one script)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Time every bridge call by phase and print a summary to stderr on exit'
+    )
+    parser.add_argument(
+        '--profile-out',
+        type=str,
+        default=None,
+        metavar='PREFIX',
+        help='With --profile, also write PREFIX.prom (Prometheus text) and PREFIX.json'
+    )
+
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
 
     # List folders command
     list_parser = subparsers.add_parser('list-folders', help='List all mail folders')
+    list_parser.add_argument(
+        '--max-age',
+        type=float,
+        default=60.0,
+        help='Show the folder snapshot without contacting Outlook if it is at most this many seconds old; '
+             'an older one is shown at once and refreshed in the background (default: 60, 0 to refresh first)'
+    )
+    list_parser.add_argument(
+        '--watch',
+        type=float,
+        nargs='?',
+        const=30.0,
+        default=None,
+        metavar='SECONDS',
+        help='Keep refreshing the snapshot every SECONDS (default: 30) and print what changed'
+    )
 
     # Search command
     search_parser = subparsers.add_parser('search', help='Search emails by subject')
-    search_parser.add_argument('subject', type=str, help='Subject text to search for')
+    search_parser.add_argument('subject', type=str, nargs='?', default=None,
+                               help='Subject text to search for (default: the Subject of --eml)')
+    search_parser.add_argument(
+        '--eml',
+        type=str,
+        default=None,
+        help='Saved message (.eml) whose Subject and Message-ID to search for; only its headers are read'
+    )
     search_parser.add_argument(
         '--folder',
         type=str,
-        default='Inbox',
-        help='Folder to search in (default: Inbox). Use list-folders to see all available folders.'
+        action='append',
+        dest='folders',
+        help='Folder to search in (default: Inbox). Repeat to search several folders in order. '
+             'Use list-folders to see all available folders.'
+    )
+    search_parser.add_argument(
+        '--policy',
+        choices=['first', 'newest'],
+        default='first',
+        help='With several folders: stop at the first folder with a match (default) '
+             'or open the newest match across all of them'
+    )
+    search_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Output a JSON result including the folder that matched'
     )
     search_parser.add_argument(
         '--message-id',
@@ -425,17 +1572,161 @@ Examples:
         help='Use substring subject matching instead of exact'
     )
 
+    # Find command
+    find_parser = subparsers.add_parser('find', help='List matching emails, newest first, without opening them')
+    find_parser.add_argument('subject', type=str, nargs='?', default=None,
+                             help='Subject text to search for (omit to match any subject)')
+    find_parser.add_argument(
+        '--folder',
+        type=str,
+        action='append',
+        dest='folders',
+        help='Folder to search in (default: Inbox). Repeat to search several folders.'
+    )
+    find_parser.add_argument('--sender', type=str, default=None, help='Sender address contains this text')
+    find_parser.add_argument('--since', type=parse_date, default=None,
+                             help='Received on or after this date (YYYY-MM-DD or ISO timestamp)')
+    find_parser.add_argument('--until', type=parse_date, default=None,
+                             help='Received before this date (YYYY-MM-DD or ISO timestamp)')
+    find_parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20, 0 for all)')
+    find_parser.add_argument('--offset', type=int, default=0, help='Skip this many leading results (default: 0)')
+    find_parser.add_argument('--stream', action='store_true',
+                             help='Write each result as an NDJSON line as soon as it is fetched')
+    find_parser.add_argument('--exact', action='store_true', help='Match the whole subject instead of a substring')
+    find_parser.add_argument('--explain', action='store_true', help='Print the query plan before searching')
+    find_parser.add_argument('--json', action='store_true', help='Output JSON result')
+
+    # Headers command
+    headers_parser = subparsers.add_parser('headers', help='Show the parsed header block of a message')
+    headers_parser.add_argument('id', type=int, help='Outlook message id (as printed by search or find)')
+    headers_parser.add_argument('--json', action='store_true', help='Output the fields as JSON')
+
+    # Batch command
+    subparsers.add_parser(
+        'batch',
+        help='Read search/open queries as NDJSON from stdin and write one NDJSON result per query'
+    )
+
+    # Export command
+    export_parser = subparsers.add_parser(
+        'export',
+        help='Write id, subject, sender, date and Message-ID of every message in folders to NDJSON or Parquet'
+    )
+    export_parser.add_argument(
+        '--folder',
+        type=str,
+        action='append',
+        dest='folders',
+        help='Folder to export (default: Inbox). Repeat to export several folders.'
+    )
+    export_parser.add_argument('-o', '--output', type=str, required=True,
+                               help='NDJSON file, or directory of Parquet part files')
+    export_parser.add_argument('--format', type=str, choices=EXPORT_FORMATS, default=None,
+                               help='Output format (default: parquet if the output ends in .parquet, else ndjson)')
+    export_parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                               help=f'Messages read from Outlook per script run (default: {EXPORT_CHUNK_SIZE})')
+    export_parser.add_argument('--resume', action='store_true',
+                               help='Continue an interrupted export to the same output from its checkpoint')
+
+    # Deadlines command
+    deadlines_parser = subparsers.add_parser(
+        'deadlines',
+        help='Show the learned call latencies per operation and folders, and the deadlines set from them'
+    )
+    deadlines_parser.add_argument('--json', action='store_true', help='Output JSON result')
+    deadlines_parser.add_argument('--reset', action='store_true', help='Forget every learned latency')
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Keep one manager resident and answer JSON requests on a Unix socket (see outlook_client.py)'
+    )
+    serve_parser.add_argument('--socket', type=str, default=None,
+                              help='Socket path (default: ~/.cache/ai-power-toys/outlook_manager.sock)')
+    serve_parser.add_argument('--idle-timeout', type=float, default=600.0,
+                              help='Exit after this many seconds without clients, 0 for never (default: 600)')
+    serve_parser.add_argument('--prefetch', type=str, action='append', default=None, metavar='FOLDER',
+                              help='Load the newest messages of FOLDER into the warm cache on start; '
+                                   'may be repeated (e.g. --prefetch Inbox --prefetch "Sent Items")')
+
+    # Index commands
+    index_parser = subparsers.add_parser('index', help='Build or query the local metadata index')
+    index_subparsers = index_parser.add_subparsers(dest='index_command', help='Index commands')
+
+    index_build_parser = index_subparsers.add_parser('build', help='Export folders from Outlook into the index')
+    index_build_parser.add_argument(
+        '--folder',
+        type=str,
+        action='append',
+        dest='folders',
+        help='Folder to index, may be repeated (default: Inbox and Sent Items)'
+    )
+
+    index_query_parser = index_subparsers.add_parser('query', help='Search the index without contacting Outlook')
+    index_query_parser.add_argument('subject', type=str, help='Subject text to search for')
+    index_query_parser.add_argument('--folder', type=str, default=None, help='Restrict to this folder')
+    index_query_parser.add_argument(
+        '--contains',
+        action='store_false',
+        dest='exact',
+        help='Use substring subject matching instead of exact'
+    )
+    index_query_parser.add_argument(
+        '--fuzzy',
+        action='store_true',
+        help='Match similar subjects (typos, reordered words), most similar first'
+    )
+    index_query_parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20, 0 for all)')
+    index_query_parser.add_argument('--json', action='store_true', help='Output JSON result')
+
     args = parser.parse_args()
 
     if not args.command:
         parser.print_help()
         sys.exit(1)
 
-    manager = OutlookManager()
+    if args.command == 'index' and not args.index_command:
+        index_parser.print_help()
+        sys.exit(1)
+
+    if args.profile or args.profile_out:
+        metrics.enable()
+        atexit.register(report, args.profile_out)
+
+    if args.command == 'serve':
+        from outlook_daemon import OutlookDaemon
 
-    if args.command == 'list-folders':
+        def build_manager():
+            resident = OutlookManager(index=None if args.no_index else MailIndex(args.index_path),
+                                      cache=None if args.no_cache else LookupCache(),
+                                      parallel_accounts=args.parallel)
+            if args.refresh_folders:
+                resident.folders.invalidate()
+            return resident
+
+        warmup = {'op': 'prefetch', 'args': {'folders': args.prefetch}} if args.prefetch else None
+        sys.exit(OutlookDaemon(build_manager, args.socket, args.idle_timeout, warmup=warmup).run())
+
+    index = None if args.no_index and args.command != 'index' else MailIndex(args.index_path)
+    manager = OutlookManager(index=index, cache=None if args.no_cache else LookupCache(),
+                             parallel_accounts=args.parallel)
+
+    if args.refresh_folders:
+        manager.folders.invalidate()
+
+    if args.command == 'list-folders' and args.watch is not None:
+        watch_folders(manager, args.watch)
+
+    elif args.command == 'list-folders':
         print("\nListing all mail folders in Outlook...")
-        folders = manager.list_folders()
+        age = manager.snapshot.age()
+        if 0 < args.max_age < age < float('inf'):
+            # Stale: show what we have now and let a separate process refresh it
+            folders = manager.snapshot.listing()
+            print(f"(snapshot from {age:,.0f}s ago, refreshing in the background)")
+            refresh_snapshot_in_background()
+        else:
+            folders = manager.list_folders(max_age=args.max_age)
 
         if folders:
             print(f"\n{'='*80}")
@@ -449,19 +1740,143 @@ Examples:
             print("No folders found or an error occurred.")
 
     elif args.command == 'search':
-        print(f"\nSearching for '{args.subject}' in {args.folder}...")
-        success = manager.search_and_open_email(
+        folders = args.folders or ['Inbox']
+        if args.eml:
+            try:
+                eml_headers = read_header_block(args.eml)
+            except OSError as e:
+                print(f"Error reading {args.eml}: {e}", file=sys.stderr)
+                sys.exit(1)
+            args.subject = args.subject or decode_value(eml_headers.get('Subject'))
+            args.message_id = args.message_id or message_id_of(eml_headers)
+        if not args.subject:
+            search_parser.error('a subject (or an --eml file with a Subject header) is required')
+        if not args.json:
+            print(f"\nSearching for '{args.subject}' in {', '.join(folders)}...")
+        result = manager.search_and_open_in_folders(
             args.subject,
-            args.folder,
+            folders,
             exact_match=getattr(args, 'exact', True),
-            internet_message_id=getattr(args, 'message_id', None)
+            internet_message_id=getattr(args, 'message_id', None),
+            policy=args.policy
         )
-        if success:
+        if args.json:
+            print(json.dumps(result))
+        elif result['success']:
+            print(f"SUCCESS: Found and opened email in {result['folder'] or 'Outlook'}")
             print("✓ Email opened successfully in Outlook")
-            sys.exit(0)
         else:
+            print(f"Error: {result['error']}", file=sys.stderr)
             print("✗ No matching email found or error occurred")
+        sys.exit(0 if result['success'] else 1)
+
+    elif args.command == 'find':
+        folders = args.folders or ['Inbox']
+        query = SearchQuery(args.subject, exact=args.exact, sender=args.sender,
+                            since=args.since, until=args.until, limit=args.limit)
+        if args.explain:
+            print(plan_search(query).describe(), file=sys.stderr)
+        if not manager.is_outlook_running():
+            print(f"Error: {manager.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+            sys.exit(1)
+        results = manager.iter_messages(query, folders, offset=args.offset)
+        if args.stream:
+            count = 0
+            for record in results:
+                print(json.dumps(record), flush=True)
+                count += 1
+            sys.exit(0 if count else 1)
+
+        records = list(results)
+        if args.json:
+            print(json.dumps(records))
+        else:
+            manager.display_search_results(
+                [manager._index_record_to_email(record) for record in records],
+                ', '.join(folders)
+            )
+        sys.exit(0 if records else 1)
+
+    elif args.command == 'headers':
+        if not manager.is_outlook_running():
+            print(f"Error: {manager.app_name} is not running. Please start Outlook first.", file=sys.stderr)
             sys.exit(1)
+        headers = manager.message_headers(args.id)
+        if headers is None:
+            print(f"Error: no message with id {args.id}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            print(json.dumps({'message_id': message_id_of(headers), 'fields': headers.fields}))
+        else:
+            for name, value in headers.fields:
+                print(f"{name}: {value}")
+        sys.exit(0)
+
+    elif args.command == 'batch':
+        def read_queries():
+            for line in sys.stdin:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield e
+
+        failures = 0
+        for result in manager.batch_resolve(read_queries()):
+            failures += not result['success']
+            print(json.dumps(result), flush=True)
+        sys.exit(0 if failures == 0 else 1)
+
+    elif args.command == 'export':
+        if not manager.is_outlook_running():
+            print(f"Error: {manager.app_name} is not running. Please start Outlook first.", file=sys.stderr)
+            sys.exit(1)
+        summary = export_folders(manager, args.folders or ['Inbox'], args.output, fmt=args.format,
+                                 chunk_size=args.chunk_size, resume=args.resume)
+        if summary is None:
+            sys.exit(1)
+        print(f"Exported {summary['rows']:,} messages from {summary['folders']} folders to {summary['output']}")
+        sys.exit(0)
+
+    elif args.command == 'deadlines':
+        if args.reset:
+            manager.scheduler.model.clear()
+        rows = manager.scheduler.describe()
+        if args.json:
+            print(json.dumps(rows))
+        else:
+            print(f"{'Operation':<24} {'Folders':<30} {'calls':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'deadline':>9}")
+            for row in rows:
+                latencies = [f"{row[q]:.3f}s" if row[q] is not None else '-' for q in ('p50', 'p95', 'p99')]
+                deadline = f"{row['timeout']:.2f}s" if row['timeout'] is not None else 'default'
+                print(f"{row['operation']:<24} {row['folder'] or '-':<30} {row['samples']:>6} "
+                      f"{latencies[0]:>8} {latencies[1]:>8} {latencies[2]:>8} {deadline:>9}")
+        sys.exit(0)
+
+    elif args.command == 'index' and args.index_command == 'build':
+        folders = args.folders or ['Inbox', 'Sent Items']
+        print(f"\nIndexing {', '.join(folders)} into {index.path}...")
+        counts = manager.build_index(folders)
+        for folder in folders:
+            if folder in counts:
+                print(f"  {folder:<50} {counts[folder]:>15,}")
+            else:
+                print(f"  {folder:<50} {'failed':>15}")
+        sys.exit(0 if len(counts) == len(folders) else 1)
+
+    elif args.command == 'index' and args.index_command == 'query':
+        records = index.search_subject(args.subject, args.folder, exact=args.exact, limit=args.limit,
+                                       fuzzy=args.fuzzy)
+        if args.json:
+            print(json.dumps(records))
+        else:
+            manager.display_search_results(
+                [manager._index_record_to_email(record) for record in records],
+                args.folder or 'index'
+            )
+        sys.exit(0 if records else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Query planner for Outlook searches
+Turns a search request into a plan for the planned_search template: which
+subject predicate to push into the `whose` clause and which received-time
+windows to scan, newest first, so a search stops as soon as it has enough
+results instead of reading the whole folder, and every script run returns a
+bounded chunk.
+"""
+
+import time
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from applescript_templates import flag_arg
+
+
+# Width of the newest scan window
+FIRST_WINDOW_SECONDS = 7 * 24 * 3600
+# Bounds on how much one window may grow or shrink relative to the previous one
+WINDOW_GROWTH = 4
+MIN_WINDOW_SECONDS = 3600
+# Consecutive empty windows after which the rest of the range is scanned in one window
+EMPTY_WINDOWS_BEFORE_REST = 2
+# Matches one script run should return; later windows are sized from the match density seen so far
+CHUNK_SIZE = 200
+
+STRATEGY_EXACT = "exact"
+STRATEGY_CONTAINS = "contains"
+STRATEGY_ANY = "any"
+
+
+class SearchQuery:
+    """What to look for; every criterion is optional."""
+
+    def __init__(self, subject: Optional[str] = None, exact: bool = True, sender: Optional[str] = None,
+                 since: Optional[float] = None, until: Optional[float] = None,
+                 limit: Optional[int] = 20):
+        """
+        Args:
+            subject: Subject text (case-insensitive)
+            exact: If True, match the whole subject; if False, match a substring
+            sender: Substring of the sender address
+            since: Only messages received at or after this Unix timestamp
+            until: Only messages received before this Unix timestamp
+            limit: Maximum number of results, newest first (None or 0 for all)
+        """
+        self.subject = subject or None
+        self.exact = exact
+        self.sender = sender or None
+        self.since = since
+        self.until = until
+        self.limit = limit if limit and limit > 0 else None
+
+
+class QueryPlan:
+    """A subject strategy plus the received-time range to scan, newest first."""
+
+    def __init__(self, strategy: str, query: SearchQuery, start: float, end: float):
+        self.strategy = strategy
+        self.query = query
+        self.start = start
+        self.end = end
+
+    @property
+    def limit(self) -> Optional[int]:
+        return self.query.limit
+
+    def template_args(self, window: Tuple[float, float], open_newest: bool = False) -> List[str]:
+        """
+        Build the planned_search arguments following the folder groups.
+
+        Args:
+            window: (since, until) Unix timestamps of the window to scan
+            open_newest: Open the newest match of the window in Outlook
+        """
+        since, until = window
+        return [
+            self.strategy,
+            self.query.subject or '',
+            self.query.sender or '',
+            str(int(since)),
+            str(int(until)),
+            flag_arg(open_newest),
+        ]
+
+    def windows(self, chunk_size: int = CHUNK_SIZE) -> 'WindowScan':
+        """Return a newest-first window iterator over the plan's time range."""
+        return WindowScan(self, chunk_size)
+
+    def describe(self) -> str:
+        """Return a human-readable summary of the plan."""
+        predicates = []
+        if self.strategy == STRATEGY_EXACT:
+            predicates.append(f'subject is "{self.query.subject}"')
+        elif self.strategy == STRATEGY_CONTAINS:
+            predicates.append(f'subject contains "{self.query.subject}"')
+        predicates.append("time received in window")
+
+        lines = [f"whose {' and '.join(predicates)}"]
+        if self.query.sender:
+            # The sender is a record, which whose clauses cannot reach into
+            lines.append(f'then, per match in the script: keep sender address contains "{self.query.sender}" '
+                         f'(not part of the whose clause)')
+        lines.append(f"scan {_format_time(self.start)} .. {_format_time(self.end)} newest first, "
+                     f"first window {FIRST_WINDOW_SECONDS // 3600}h, then sized for ~{CHUNK_SIZE} matches each, "
+                     f"the rest at once after {EMPTY_WINDOWS_BEFORE_REST} empty windows")
+        lines.append(f"stop after {self.limit} result(s)" if self.limit else "read every window")
+        return "\n".join(lines)
+
+
+class WindowScan:
+    """
+    Iterates (since, until) windows from the newest end of a plan's range.
+
+    After running a window, report its match count with record(); the next
+    window is sized so it should return about chunk_size matches, growing or
+    shrinking by at most WINDOW_GROWTH per step. Once EMPTY_WINDOWS_BEFORE_REST
+    windows in a row came back empty, older mail is too sparse to be worth
+    slicing and the next window reaches back to the start of the range, so a
+    search for something that is not there costs three scans, not one per
+    step back to the epoch.
+    """
+
+    def __init__(self, plan: QueryPlan, chunk_size: int = CHUNK_SIZE):
+        self.plan = plan
+        self.chunk_size = chunk_size
+        self.width = float(FIRST_WINDOW_SECONDS)
+        self.empty = 0
+        self._end = plan.end
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        return self
+
+    def __next__(self) -> Tuple[float, float]:
+        if self._end <= self.plan.start:
+            raise StopIteration
+        since = max(self.plan.start, self._end - self.width)
+        window = (since, self._end)
+        self._end = since
+        return window
+
+    def record(self, count: int):
+        """Size the next window from the number of matches the last one returned."""
+        self.empty = self.empty + 1 if count == 0 else 0
+        if self.empty >= EMPTY_WINDOWS_BEFORE_REST:
+            self.width = float('inf')
+            return
+        scale = WINDOW_GROWTH if count == 0 else self.chunk_size / count
+        scale = min(max(scale, 1.0 / WINDOW_GROWTH), WINDOW_GROWTH)
+        self.width = max(self.width * scale, MIN_WINDOW_SECONDS)
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp > 0 else "start"
+
+
+def plan_search(query: SearchQuery, now: Optional[float] = None) -> QueryPlan:
+    """
+    Plan a search.
+
+    The subject predicate becomes `subject is` for exact matches, `subject
+    contains` for substrings and is dropped when no subject is given; the time
+    range is always part of the `whose` clause. A sender filter is not: the
+    sender is a record the clause cannot reach into, so planned_search checks
+    it for each message the clause returned. The range is scanned in windows
+    from newest to oldest (see WindowScan), so recent matches cost one small
+    scan and no single script run has to return the whole folder.
+
+    Args:
+        query: The search to plan
+        now: Current Unix time (default: time.time())
+
+    Returns:
+        The QueryPlan to execute
+    """
+    if query.subject and query.exact:
+        strategy = STRATEGY_EXACT
+    elif query.subject:
+        strategy = STRATEGY_CONTAINS
+    else:
+        strategy = STRATEGY_ANY
+
+    if query.until is not None:
+        end = query.until
+    else:
+        # A day of slack keeps messages with skewed future timestamps in the newest window
+        end = (now if now is not None else time.time()) + 24 * 3600
+    start = max(query.since or 0.0, 0.0)
+
+    return QueryPlan(strategy, query, start, end)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical requests
+Duplicate webhook deliveries and double-clicks start the same search two or
+three times at once. While a request with a given key is running, later
+requests with that key do not start their own run; they wait for the one in
+flight and all receive its result (or its exception). Once it finishes the
+key is free again, so a request arriving afterwards runs anew. Answers that
+should outlive the run are the lookup cache's job, not this one's.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Runs at most one coroutine per key at a time and shares its outcome with every caller."""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self._by_operation: Dict[str, Dict[str, int]] = {}
+
+    async def run(self, key: Optional[Hashable], factory: Callable[[], Awaitable[T]], operation: str = '') -> T:
+        """
+        Run factory() for key, or join the run already in flight for it.
+
+        Args:
+            key: Identity of the request; None never coalesces
+            factory: Starts the work; only called by the caller that runs it
+            operation: Label the counters are kept under
+
+        Returns:
+            The result of the shared run
+
+        Raises:
+            Whatever the shared run raised. A caller that is cancelled stops
+            waiting, but the run continues for the others.
+        """
+        counters = self._by_operation.setdefault(operation, {'executed': 0, 'coalesced': 0})
+        if key is None:
+            self.executed += 1
+            counters['executed'] += 1
+            return await factory()
+
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            counters['coalesced'] += 1
+            return await asyncio.shield(flight)
+
+        self.executed += 1
+        counters['executed'] += 1
+        flight = asyncio.ensure_future(factory())
+        self._in_flight[key] = flight
+        flight.add_done_callback(lambda done: self._land(key, done))
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, flight: asyncio.Future):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        # Retrieve the outcome so a run nobody waits for any more does not log a warning
+        if not flight.cancelled():
+            flight.exception()
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently running."""
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, object]:
+        """Return the counters: runs executed, requests coalesced into them, keys in flight, per operation."""
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._in_flight),
+            'operations': {operation: dict(counts) for operation, counts in self._by_operation.items()},
+        }
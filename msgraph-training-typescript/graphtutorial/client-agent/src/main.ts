@@ -21,6 +21,9 @@ app.whenReady().then(() => {
   console.log('🚀 AI Power Toys Started - monitoring emails...');
   connectToServer();
 
+  // Load recent Inbox/Sent Items metadata now so the first Open Email does not scan
+  warmOutlookCache();
+
   // Update unread count every 30 seconds
   setInterval(updateUnreadCount, 30000);
   updateUnreadCount(); // Initial update
@@ -1165,11 +1168,139 @@ async function handleCreateUrgentTask(data: any) {
   }
 }
 
+/**
+ * Send one request to the resident Outlook Manager daemon (`outlook_manager.py serve`).
+ * Resolves with the daemon's reply, or null if no daemon is listening.
+ */
+function outlookDaemonRequest(op: string, args: any, timeoutMs = 60000): Promise<any> {
+  const net = require('net');
+  const os = require('os');
+  const cacheDir = process.env.OUTLOOK_AGENT_CACHE_DIR || path.join(os.homedir(), '.cache', 'ai-power-toys');
+  const socketPath = path.join(cacheDir, 'outlook_manager.sock');
+
+  return new Promise((resolve) => {
+    let buffer = '';
+    let settled = false;
+    const client = net.createConnection(socketPath, () => {
+      client.write(JSON.stringify({ id: Date.now(), op, args }) + '\n');
+    });
+    const finish = (reply: any) => {
+      if (!settled) {
+        settled = true;
+        client.destroy();
+        resolve(reply);
+      }
+    };
+
+    client.setTimeout(timeoutMs, () => finish({ ok: false, error: 'Outlook daemon timed out' }));
+    client.on('data', (chunk: Buffer) => {
+      buffer += chunk.toString('utf8');
+      const newline = buffer.indexOf('\n');
+      if (newline >= 0) {
+        try {
+          finish(JSON.parse(buffer.slice(0, newline)));
+        } catch (parseError) {
+          finish({ ok: false, error: 'Malformed reply from Outlook daemon' });
+        }
+      }
+    });
+    // Nothing listening (or it went away before answering): the caller falls back to a one-off run
+    client.on('error', () => finish(null));
+    client.on('end', () => finish(null));
+  });
+}
+
+// Folders Open Email searches; the daemon keeps their newest messages warm
+const OPEN_EMAIL_FOLDERS = ['Inbox', 'Sent Items'];
+
+// How long a starting daemon may take to answer before requests fall back to one-off runs
+const OUTLOOK_DAEMON_START_MS = 15000;
+
+// The daemon this app started, resolving to whether it answers; cleared when that process exits
+let outlookDaemonStart: Promise<boolean> | null = null;
+
+/**
+ * Start the Outlook Manager daemon in the background so later requests skip Python startup.
+ * It prefetches the Open Email folders' recent messages before answering anything else.
+ * Only one start is in flight at a time: callers share its promise until the process exits,
+ * so a burst of requests does not spawn daemons that take the socket from each other.
+ */
+function startOutlookDaemon(): Promise<boolean> {
+  if (outlookDaemonStart) return outlookDaemonStart;
+
+  const { spawn } = require('child_process');
+  const scriptPath = path.join(__dirname, '..', 'outlook_manager.py');
+  const prefetchArgs = OPEN_EMAIL_FOLDERS.flatMap((folder) => ['--prefetch', folder]);
+  const daemon = spawn('python3', [scriptPath, 'serve', ...prefetchArgs], { detached: true, stdio: 'ignore' });
+  let exited = false;
+  const onExit = () => {
+    exited = true;
+    if (outlookDaemonStart === start) outlookDaemonStart = null;
+  };
+  daemon.on('exit', onExit);
+  daemon.on('error', onExit);
+  daemon.unref();
+
+  const start = (async () => {
+    const deadline = Date.now() + OUTLOOK_DAEMON_START_MS;
+    for (;;) {
+      // A daemon that was already serving makes this one exit, but still answers
+      const reply = await outlookDaemonRequest('ping', {}, 1000);
+      if (reply && reply.ok) return true;
+      if (exited || Date.now() >= deadline) return false;
+      await new Promise((resolve) => setTimeout(resolve, 200));
+    }
+  })();
+  outlookDaemonStart = start;
+  return start;
+}
+
+/**
+ * Warm the daemon's cache of recent Open Email folder metadata, starting the daemon if needed
+ */
+async function warmOutlookCache() {
+  const reply = await outlookDaemonRequest('prefetch', { folders: OPEN_EMAIL_FOLDERS }, 120000);
+  if (!reply) {
+    // A new daemon prefetches on its own as it starts
+    startOutlookDaemon();
+    return;
+  }
+  if (reply.ok && reply.result) {
+    const loaded = Object.entries(reply.result).map(([folder, count]) => `${folder}: ${count}`).join(', ');
+    console.log(`Outlook cache warmed (${loaded})`);
+  } else {
+    console.log('⚠️  Could not warm the Outlook cache:', reply.error || 'prefetch failed');
+  }
+}
+
+// Open-email requests in progress, by normalized subject / direction / Message-ID
+const openEmailsInFlight = new Map<string, Promise<void>>();
+let openEmailsCoalesced = 0;
+
 /**
  * URGENT TOY: Open Email Locally - Open email in Outlook web
+ * Duplicate webhook deliveries and double-clicks share the search already in progress
  * Note: Opening desktop Outlook via URL protocol is not supported on macOS
  */
-async function handleOpenEmailLocal(data: any) {
+function handleOpenEmailLocal(data: any): Promise<void> {
+  const key = JSON.stringify([
+    String(data.subject || '').trim().toLowerCase(),
+    Boolean(data.is_outgoing),
+    String(data.internet_message_id || '').trim().replace(/^<|>$/g, '')
+  ]);
+  const inFlight = openEmailsInFlight.get(key);
+  if (inFlight) {
+    openEmailsCoalesced++;
+    console.log(`Open Email: same request already in progress, sharing it (${openEmailsCoalesced} coalesced so far)`);
+    return inFlight;
+  }
+
+  const opening = openEmailLocal(data).finally(() => openEmailsInFlight.delete(key));
+  openEmailsInFlight.set(key, opening);
+  return opening;
+}
+
+async function openEmailLocal(data: any) {
   try {
     const { exec } = require('child_process');
     const path = require('path');
@@ -1189,51 +1320,62 @@ async function handleOpenEmailLocal(data: any) {
     const scriptPath = path.join(__dirname, '..', 'outlook_manager.py');
     const escapedSubject = data.subject.replace(/"/g, '\\"');
 
-    // Determine folder based on email direction
-    const folders = data.is_outgoing ? ['Sent Items', 'Inbox'] : ['Inbox', 'Sent Items'];
-    let found = false;
-
-    const tryFolder = (folderIndex: number) => {
-      if (folderIndex >= folders.length) {
-        if (!found) {
-          console.log('⚠️  Email not found in any folder');
-          exec('open -a "Microsoft Outlook"');
-        }
-        return;
-      }
+    // Determine folder order based on email direction; all folders are searched in one run
+    const folders = data.is_outgoing ? [...OPEN_EMAIL_FOLDERS].reverse() : OPEN_EMAIL_FOLDERS;
+    const folderArgs = folders.map((folder) => `--folder "${folder}"`).join(' ');
 
-      const folder = folders[folderIndex];
+    // Build command with internet_message_id if available
+    let command = `python3 "${scriptPath}" search "${escapedSubject}" ${folderArgs} --exact --json`;
 
-      // Build command with internet_message_id if available
-      let command = `python3 "${scriptPath}" search "${escapedSubject}" --folder "${folder}" --exact`;
-
-      if (data.internet_message_id) {
-        const escapedMessageId = data.internet_message_id.replace(/"/g, '\\"');
-        command += ` --message-id "${escapedMessageId}"`;
-      }
-
-      console.log(`Trying folder: ${folder}...`);
-
-      exec(command, (error: any, stdout: any, stderr: any) => {
-        if (error) {
-          console.log(`Not found in ${folder}, trying next...`);
-          if (stderr) console.log('stderr:', stderr);
-          tryFolder(folderIndex + 1);
-        } else {
-          console.log('✅ Email opened in Outlook');
-          if (stdout) console.log(stdout);
-          found = true;
-        }
-      });
-    };
+    if (data.internet_message_id) {
+      const escapedMessageId = data.internet_message_id.replace(/"/g, '\\"');
+      command += ` --message-id "${escapedMessageId}"`;
+    }
 
-    tryFolder(0);
+    console.log(`Searching folders: ${folders.join(', ')}...`);
 
     const { Notification } = require('electron');
     new Notification({
       title: '📧 Opening Email',
       body: `Opening: "${data.subject}"`
     }).show();
+
+    const report = (result: any, stderr?: string) => {
+      if (result && result.success) {
+        console.log(`✅ Email opened in Outlook (found in ${result.folder || 'message index'} via ${result.source})`);
+      } else {
+        console.log('⚠️  Email not found in any folder');
+        if (result && result.error) console.log('Reason:', result.error);
+        if (stderr) console.log('stderr:', stderr);
+        exec('open -a "Microsoft Outlook"');
+      }
+    };
+
+    // Prefer the resident daemon, starting it (once) if it is not up; run the script only if it cannot start
+    const searchArgs: any = { subject: data.subject, folders, exact: true };
+    if (data.internet_message_id) searchArgs.message_id = data.internet_message_id;
+    let reply = await outlookDaemonRequest('search', searchArgs);
+    if (!reply && await startOutlookDaemon()) {
+      reply = await outlookDaemonRequest('search', searchArgs);
+    }
+
+    if (reply) {
+      report(reply.ok ? reply.result : { success: false, error: reply.error });
+    } else {
+      await new Promise<void>((resolve) => {
+        exec(command, (error: any, stdout: any, stderr: any) => {
+          let result: any = null;
+          try {
+            result = JSON.parse(stdout.trim().split('\n').pop() || '');
+          } catch (parseError) {
+            result = null;
+          }
+          // The script exits non-zero when nothing was opened; its JSON still says why
+          report(result || (error ? { success: false, error: error.message } : null), stderr);
+          resolve();
+        });
+      });
+    }
   } catch (error) {
     console.error('Error opening email:', error);
     const { exec } = require('child_process');
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Stand-in script worker for running off macOS
+Speaks the AppleScriptSession framing protocol on stdin/stdout like the JXA
+worker (see WORKER_SOURCE in applescript_session.py), but answers template
+calls from a SyntheticMailbox instead of Outlook. Point the agent at it with
+
+    OUTLOOK_SCRIPT_WORKER="python3 stand_in_worker.py --messages 5000"
+
+Free-form scripts ("exec") cannot be answered and get an ERR reply. For
+exercising the session itself the worker can also crash or stall on purpose
+and log every request it receives.
+
+Usage:
+    python3 stand_in_worker.py [--messages 2000] [--accounts 1] [--seed 0] [--now TIMESTAMP]
+                               [--crash-after N] [--stall NAME=SECONDS] [--log PATH]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from applescript_templates import get_template
+from synthetic_mailbox import SyntheticBackend, SyntheticMailbox
+
+
+def read_request(stdin):
+    """Read one framed request; returns the decoded payload or None at end of input."""
+    header = stdin.readline()
+    if not header:
+        return None
+    body = stdin.read(int(header))
+    return json.loads(body.decode('utf-8'))
+
+
+def write_reply(stdout, status: str, text: str):
+    """Write one framed reply."""
+    data = text.encode('utf-8')
+    stdout.write(f"{status} {len(data)}\n".encode('ascii') + data)
+    stdout.flush()
+
+
+def answer(backend: SyntheticBackend, request: dict):
+    """Return the (status, text) reply to a request."""
+    op = request.get('op')
+    if op == 'ping':
+        return 'OK', 'pong'
+    if op == 'load':
+        return 'OK', ''
+    if op == 'exec':
+        return 'ERR', 'The stand-in worker only runs registered templates'
+    if op == 'call':
+        try:
+            template = get_template(request['name'])
+        except KeyError:
+            return 'ERR', f"Unknown template: {request['name']}"
+        output = backend.call(template, request.get('argv') or [])
+        if output is None:
+            return 'ERR', f"{request['name']} failed"
+        return 'OK', output
+    return 'ERR', f'Unknown op: {op}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Framing-protocol script worker backed by a synthetic mailbox')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages in the mailbox (default: 2000)')
+    parser.add_argument('--accounts', type=int, default=1, help='Accounts in the mailbox (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Mailbox seed (default: 0)')
+    parser.add_argument('--now', type=float, default=None, help='Newest received time (default: now)')
+    parser.add_argument('--crash-after', type=int, default=None,
+                        help='Exit without replying to the request after the first N')
+    parser.add_argument('--stall', action='append', default=[], metavar='NAME=SECONDS',
+                        help='Sleep before answering calls of this template (repeatable)')
+    parser.add_argument('--log', type=str, default=None,
+                        help='Append the op and template name of every request received to this file')
+    args = parser.parse_args()
+
+    stalls = {}
+    for entry in args.stall:
+        name, _, seconds = entry.partition('=')
+        stalls[name] = float(seconds)
+
+    backend = SyntheticBackend(SyntheticMailbox(messages=args.messages, accounts=args.accounts,
+                                                seed=args.seed, now=args.now))
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    handled = 0
+    while True:
+        try:
+            request = read_request(stdin)
+        except ValueError as e:
+            write_reply(stdout, 'ERR', f'Malformed request: {e}')
+            continue
+        if request is None:
+            break
+        if args.log:
+            with open(args.log, 'a', encoding='utf-8') as f:
+                f.write(f"{os.getpid()} {request.get('op')} {request.get('name', '')}\n")
+        if args.crash_after is not None and handled >= args.crash_after:
+            # Like osascript dying mid-call: the request was read but never answered
+            os._exit(3)
+        if request.get('name') in stalls:
+            time.sleep(stalls[request['name']])
+        status, text = answer(backend, request)
+        write_reply(stdout, status, text)
+        handled += 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+In-memory trigram index of normalised subjects
+Subjects arrive messy: "RE: FW:  Budget  review", "Re[2]: budget review",
+a Graph notification's subject with a trailing space. normalize_subject()
+strips reply and forward prefixes, folds case and collapses whitespace, and
+every distinct normalised subject is stored once and indexed by its
+three-character substrings. A substring query only verifies the subjects in
+the shortest posting list of its trigrams; a fuzzy query ranks subjects by the
+share of trigrams they have in common with it (Dice coefficient). Each
+subject's messages are kept newest first, so ranking stops reading a subject's
+messages, and the remaining subjects, as soon as they cannot make the results.
+
+Per-message data lives in flat arrays (message id, subject number, received
+time, folder number) next to interned subject and folder strings, so 100,000
+messages cost a few megabytes. Folders are replaced incrementally: only the
+messages that appeared, disappeared or changed are touched.
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Reply and forward markers in the languages Outlook and Graph commonly produce,
+# optionally numbered ("Re[2]:", "RE(3):")
+_MARKERS = ('re', 'fw', 'fwd', 'aw', 'wg', 'sv', 'antw', 'rv')
+# Markers that also open ordinary subjects ("Ref: invoice 123", "VS: budget"); they
+# are only stripped next to one of the markers above ("TR: RE: budget")
+_AMBIGUOUS_MARKERS = ('vs', 'tr', 'ref')
+_PREFIX = re.compile(r'^(?:(?:{})\s*(?:\[\d+\]|\(\d+\))?\s*[:：]\s*)+'.format(
+    '|'.join(_MARKERS + _AMBIGUOUS_MARKERS)))
+_MARKER_WORD = re.compile(r'[a-z]+')
+_WHITESPACE = re.compile(r'\s+')
+
+# Normalised subjects sharing fewer than this share of trigrams with a fuzzy query are not returned
+FUZZY_MIN_SCORE = 0.5
+
+# Removed messages tolerated, relative to live ones, before the arrays are compacted
+COMPACT_RATIO = 0.5
+
+
+def normalize_subject(subject: Optional[str]) -> str:
+    """
+    Normalise a subject for matching: Unicode NFKC, case folded, reply/forward
+    prefixes removed, runs of whitespace collapsed to one space.
+    """
+    text = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', subject or '')).strip().casefold()
+    prefix = _PREFIX.match(text)
+    if prefix is None or not any(word in _MARKERS for word in _MARKER_WORD.findall(prefix.group(0))):
+        return text
+    return text[prefix.end():].strip()
+
+
+def trigrams(text: str) -> List[str]:
+    """Return the distinct three-character substrings of normalised text, in order of first appearance."""
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+def _fuzzy_trigrams(text: str) -> List[str]:
+    # Padding gives the start and end of a subject, and two-letter words, trigrams of their own
+    return trigrams(f"  {text} ")
+
+
+class SubjectIndex:
+    """Substring and fuzzy subject lookup over messages, grouped by folder."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # Interned normalised subjects, their trigram counts, the rows carrying each
+        # (newest first unless listed in _unsorted) and the newest time among them
+        self._subjects: List[str] = []
+        self._subject_numbers: Dict[str, int] = {}
+        self._fuzzy_sizes = array('H')
+        self._rows_by_subject: List[array] = []
+        self._newest = array('d')
+        self._unsorted = set()
+        # Trigram -> ascending subject numbers, for substring and fuzzy lookup
+        self._postings: Dict[str, array] = {}
+        self._fuzzy_postings: Dict[str, array] = {}
+        # Interned original subjects, each with its normalised subject's number, and folder names
+        self._originals: List[str] = []
+        self._original_numbers: Dict[str, int] = {}
+        self._subject_of_original = array('I')
+        self._folders: List[str] = []
+        self._folder_numbers: Dict[str, int] = {}
+        # One row per message; a removed message's row stays until compact()
+        self._ids = array('q')
+        self._original_of = array('I')
+        self._received = array('d')
+        self._folder_of = array('H')
+        self._live = bytearray()
+        self._row_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def folders(self) -> List[str]:
+        """Return the names of the folders with messages in the index."""
+        live = {self._folder_of[row] for row in self._row_of.values()}
+        return [self._folders[number] for number in sorted(live)]
+
+    def add(self, folder: str, records: Iterable[Dict[str, object]]) -> int:
+        """
+        Add or update messages of a folder.
+
+        Args:
+            folder: Folder name the records belong to
+            records: Dictionaries with id, subject and received keys
+
+        Returns:
+            Number of messages added or changed
+        """
+        folder_number = self._intern_folder(folder)
+        changed = 0
+        for record in records:
+            outlook_id = int(record['id'])
+            subject = str(record.get('subject') or '')
+            received = float(record.get('received') or 0)
+            row = self._row_of.get(outlook_id)
+            if row is not None:
+                if (self._originals[self._original_of[row]] == subject and self._received[row] == received
+                        and self._folder_of[row] == folder_number):
+                    continue
+                self._drop(row)
+            self._append(outlook_id, subject, received, folder_number)
+            changed += 1
+        self._maybe_compact()
+        return changed
+
+    def replace_folder(self, folder: str, records: Iterable[Dict[str, object]]) -> int:
+        """
+        Make the folder's messages exactly the given ones, touching only what differs.
+
+        Returns:
+            Number of messages added, changed or removed
+        """
+        records = list(records)
+        keep = {int(record['id']) for record in records}
+        folder_number = self._folder_numbers.get(folder.casefold())
+        removed = 0
+        if folder_number is not None:
+            for outlook_id, row in list(self._row_of.items()):
+                if self._folder_of[row] == folder_number and outlook_id not in keep:
+                    self._drop(row)
+                    removed += 1
+        return self.add(folder, records) + removed
+
+    def remove(self, outlook_id: int) -> bool:
+        """Drop one message; returns False if it was not indexed."""
+        row = self._row_of.get(int(outlook_id))
+        if row is None:
+            return False
+        self._drop(row)
+        self._maybe_compact()
+        return True
+
+    def search(self, text: str, folder: Optional[str] = None, limit: int = 20,
+               fuzzy: bool = False, min_score: float = FUZZY_MIN_SCORE) -> List[Dict[str, object]]:
+        """
+        Find messages whose normalised subject contains (or resembles) the normalised text.
+
+        Substring matches rank a subject equal to the text first, then one
+        starting with it, then the rest, newest first within each. Fuzzy
+        matches rank by trigram similarity, then newest first.
+
+        Args:
+            text: Subject text as it arrived; normalised like the indexed subjects
+            folder: Restrict to this folder name (case-insensitive)
+            limit: Maximum number of results (0 or less for all)
+            fuzzy: Rank by similarity instead of requiring a substring
+            min_score: Lowest similarity a fuzzy match may have (0-1)
+
+        Returns:
+            Dictionaries with id, subject (as stored), folder, received and score
+            (1.0 for an equal normalised subject)
+        """
+        query = normalize_subject(text)
+        if limit is None or limit <= 0:
+            limit = math.inf
+        folder_number = None
+        if folder is not None:
+            folder_number = self._folder_numbers.get(folder.casefold())
+            if folder_number is None:
+                return []
+
+        if fuzzy:
+            scored = self._fuzzy_subjects(query, min_score)
+        else:
+            scored = self._substring_subjects(query)
+
+        # Best subjects first; a subject's newest time bounds every row it has
+        candidates = sorted(((rank, self._newest[subject], subject, score) for subject, rank, score in scored),
+                            reverse=True)
+        received, live, folder_of = self._received, self._live, self._folder_of
+        # Min-heap of the best rows so far as (rank, received, -row, score); top[0] is the worst kept
+        top: List[Tuple[float, float, int, float]] = []
+        for rank, newest, subject, score in candidates:
+            if len(top) >= limit and (rank, newest) < top[0][:2]:
+                break
+            for row in self._sorted_rows(subject):
+                if not live[row] or (folder_number is not None and folder_of[row] != folder_number):
+                    continue
+                entry = (rank, received[row], -row, score)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+                else:
+                    break
+        return [{
+            'id': self._ids[-row],
+            'subject': self._originals[self._original_of[-row]],
+            'folder': self._folders[folder_of[-row]],
+            'received': received[-row],
+            'score': round(score, 3),
+        } for _, _, row, score in sorted(top, reverse=True)]
+
+    def _sorted_rows(self, subject: int) -> array:
+        """Return the subject's rows, newest first."""
+        if subject in self._unsorted:
+            self._unsorted.discard(subject)
+            self._rows_by_subject[subject] = array('I', sorted(self._rows_by_subject[subject],
+                                                               key=self._received.__getitem__, reverse=True))
+        return self._rows_by_subject[subject]
+
+    def _substring_subjects(self, query: str) -> Iterable[Tuple[int, float, float]]:
+        """Yield (subject number, rank, score) of every subject containing the query."""
+        if len(query) < 3:
+            candidates = range(len(self._subjects))
+        else:
+            postings = []
+            for trigram in trigrams(query):
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    return
+                postings.append(posting)
+            candidates = min(postings, key=len)
+        subjects = self._subjects
+        for number in candidates:
+            subject = subjects[number]
+            if query in subject:
+                rank = 2 if subject == query else 1 if subject.startswith(query) else 0
+                yield number, rank, len(query) / len(subject) if subject else 1.0
+
+    def _fuzzy_subjects(self, query: str, min_score: float) -> Iterable[Tuple[int, float, float]]:
+        """Yield (subject number, rank, score) of every subject similar enough to the query."""
+        if not query:
+            return
+        wanted = _fuzzy_trigrams(query)
+        shared = Counter()
+        for trigram in wanted:
+            posting = self._fuzzy_postings.get(trigram)
+            if posting is not None:
+                shared.update(posting)
+        # Even a subject made of nothing but shared trigrams needs this many to reach min_score
+        least = math.ceil(min_score * len(wanted) / (2.0 - min_score)) if min_score < 2 else len(wanted)
+        sizes = self._fuzzy_sizes
+        for number, common in shared.items():
+            if common >= least:
+                score = 2.0 * common / (len(wanted) + sizes[number])
+                if score >= min_score:
+                    yield number, score, score
+
+    def _intern_folder(self, folder: str) -> int:
+        key = folder.casefold()
+        number = self._folder_numbers.get(key)
+        if number is None:
+            number = self._folder_numbers[key] = len(self._folders)
+            self._folders.append(folder)
+        return number
+
+    def _intern_subject(self, subject: str) -> int:
+        normalized = normalize_subject(subject)
+        number = self._subject_numbers.get(normalized)
+        if number is not None:
+            return number
+        number = self._subject_numbers[normalized] = len(self._subjects)
+        self._subjects.append(normalized)
+        self._rows_by_subject.append(array('I'))
+        for trigram in trigrams(normalized):
+            self._postings.setdefault(trigram, array('I')).append(number)
+        fuzzy = _fuzzy_trigrams(normalized)
+        for trigram in fuzzy:
+            self._fuzzy_postings.setdefault(trigram, array('I')).append(number)
+        self._fuzzy_sizes.append(min(len(fuzzy), 0xFFFF))
+        self._newest.append(float('-inf'))
+        return number
+
+    def _append(self, outlook_id: int, subject: str, received: float, folder_number: int):
+        original = self._original_numbers.get(subject)
+        if original is None:
+            original = self._original_numbers[subject] = len(self._originals)
+            self._originals.append(subject)
+            self._subject_of_original.append(self._intern_subject(subject))
+        subject_number = self._subject_of_original[original]
+        row = len(self._ids)
+        self._ids.append(outlook_id)
+        self._original_of.append(original)
+        self._received.append(received)
+        self._folder_of.append(folder_number)
+        self._live.append(1)
+        self._rows_by_subject[subject_number].append(row)
+        self._unsorted.add(subject_number)
+        # Only ever raised: after a removal it may be newer than any live row, which ranking tolerates
+        if received > self._newest[subject_number]:
+            self._newest[subject_number] = received
+        self._row_of[outlook_id] = row
+
+    def _drop(self, row: int):
+        self._live[row] = 0
+        del self._row_of[self._ids[row]]
+
+    def _maybe_compact(self):
+        if len(self._ids) - len(self._row_of) > COMPACT_RATIO * max(len(self._row_of), 1024):
+            self.compact()
+
+    def compact(self):
+        """Rebuild the arrays from the live messages, dropping removed rows and unused subjects."""
+        rows = sorted(self._row_of.values())
+        live = [(self._ids[row], self._originals[self._original_of[row]], self._received[row],
+                 self._folders[self._folder_of[row]]) for row in rows]
+        self._reset()
+        for outlook_id, subject, received, folder in live:
+            self._append(outlook_id, subject, received, self._intern_folder(folder))
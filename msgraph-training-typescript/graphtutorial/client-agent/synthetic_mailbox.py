@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Synthetic mailbox backend
+A generated, in-memory mailbox that answers the Outlook script templates with
+the same record frames and status replies the AppleScript versions return, so
+OutlookManager and everything above the bridge can be run and benchmarked
+without a Mac or Outlook:
+
+    mailbox = SyntheticMailbox(messages=100000, accounts=3)
+    manager = OutlookManager(session=SyntheticBackend(mailbox),
+                             folders=FolderRegistry(None, path=''))
+
+Subjects and senders follow a Zipf-like distribution (a few threads are very
+common, most are rare), received times are skewed towards the present, and
+the same seed always produces the same mailbox.
+"""
+
+import bisect
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate
+from typing import Callable, Dict, List, Optional, Tuple
+
+from applescript_session import ScriptBackend
+from applescript_templates import FIELD_SEPARATOR, STALE_FOLDER, ScriptTemplate
+from bridge_metrics import metrics
+from bridge_records import format_frame
+from mail_index import normalize_message_id
+
+
+# Default folders of every account and the share of mail each receives
+DEFAULT_FOLDERS = [
+    ("Inbox", 40), ("Archive", 25), ("Sent Items", 15), ("Deleted Items", 5),
+    ("Projects", 6), ("Newsletters", 5), ("Receipts", 2), ("Travel", 2),
+]
+
+# Received times span this many seconds back from `now`
+HISTORY_SECONDS = 2 * 365 * 24 * 3600
+
+# Mail received this recently (outside Sent Items) starts out unread
+UNREAD_SECONDS = 3 * 24 * 3600
+
+_TOPICS = ["Quarterly", "Weekly", "Budget", "Release", "Design", "Hiring", "Security", "Customer",
+           "Roadmap", "Incident", "Offsite", "Vendor", "Board", "Training", "Launch", "Audit"]
+_NOUNS = ["review", "sync", "update", "report", "plan", "follow-up", "notes", "proposal",
+          "invoice", "approval", "retro", "status | draft", "summary: final", "request"]
+_NAMES = ["alex", "sam", "jordan", "taylor", "morgan", "casey", "riley", "jamie", "drew", "quinn"]
+_DOMAINS = ["example.com", "contoso.com", "fabrikam.net", "northwind.org", "lists.example.com"]
+
+# Message tuple fields
+RECEIVED, ID, SUBJECT, SENDER = range(4)
+
+# Templates that walk the messages of the folders in their first argument
+_SCANNING_TEMPLATES = {'search_and_open', 'planned_search', 'export_folder', 'batch_resolve',
+                       'open_by_message_id_scan', 'recent_messages'}
+
+
+def _zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    weights = []
+    total = 0.0
+    for rank in range(1, count + 1):
+        total += rank ** -exponent
+        weights.append(total)
+    return weights
+
+
+def _parse_groups(arg: str) -> List[List[int]]:
+    """Decode the folder groups argument ("1,2;;3"), like parseFolderGroups does."""
+    return [[int(folder_id) for folder_id in group.split(',') if folder_id] for group in arg.split(';')]
+
+
+def applescript_date(timestamp: float) -> str:
+    """Format a Unix timestamp the way AppleScript coerces a date to text."""
+    moment = datetime.fromtimestamp(timestamp)
+    return f"{moment:%A}, {moment.day} {moment:%B %Y} at {moment:%H:%M:%S}"
+
+
+class SyntheticMailbox:
+    """Generated folders and messages of several accounts."""
+
+    def __init__(self, messages: int = 10000, accounts: int = 3, seed: int = 0,
+                 now: Optional[float] = None, subject_skew: float = 1.1):
+        """
+        Generate the mailbox.
+
+        Args:
+            messages: Total number of messages across all accounts and folders
+            accounts: Number of accounts, each with the DEFAULT_FOLDERS
+            seed: Random seed; equal arguments produce equal mailboxes
+            now: Newest possible received time (default: time.time())
+            subject_skew: Zipf exponent of the subject and sender distributions
+        """
+        self.seed = seed
+        self.now = int(now if now is not None else time.time())
+        rng = random.Random(seed)
+
+        # folder id -> {'id', 'name', 'account', 'unread'}; ids are sparse like Outlook's
+        self.folders: Dict[int, Dict[str, object]] = {}
+        folder_weights = []
+        for account_index in range(accounts):
+            account = f"Account {account_index + 1}"
+            for folder_index, (name, weight) in enumerate(DEFAULT_FOLDERS):
+                folder_id = 100 * (account_index + 1) + folder_index
+                self.folders[folder_id] = {'id': folder_id, 'name': name, 'account': account, 'unread': 0}
+                # The first account carries most of the mail
+                folder_weights.append(weight / (account_index + 1))
+
+        pool_size = min(max(messages // 25, 50), 40000)
+        bases = [f"{rng.choice(_TOPICS)} {rng.choice(_NOUNS)} #{n}" for n in range(pool_size)]
+        self.subjects = [variant for base in bases for variant in (base, "Re: " + base, "Fwd: " + base)]
+        self.senders = [f"{rng.choice(_NAMES)}.{n}@{rng.choice(_DOMAINS)}" for n in range(max(pool_size // 10, 10))]
+
+        folder_ids = list(self.folders)
+        picked_folders = rng.choices(folder_ids, weights=folder_weights, k=messages)
+        picked_bases = rng.choices(range(pool_size), cum_weights=_zipf_cum_weights(pool_size, subject_skew), k=messages)
+        picked_variants = rng.choices((0, 1, 2), weights=(65, 30, 5), k=messages)
+        picked_senders = rng.choices(range(len(self.senders)),
+                                     cum_weights=_zipf_cum_weights(len(self.senders), subject_skew), k=messages)
+
+        # Per folder, messages in received order with a parallel list of times for bisecting
+        self._messages: Dict[int, List[Tuple[int, int, str, str]]] = {folder_id: [] for folder_id in folder_ids}
+        for n in range(messages):
+            received = self.now - int(HISTORY_SECONDS * rng.random() ** 2)
+            subject = self.subjects[picked_bases[n] * 3 + picked_variants[n]]
+            self._messages[picked_folders[n]].append((received, n + 1, subject, self.senders[picked_senders[n]]))
+        self._times: Dict[int, List[int]] = {}
+        self._by_id: Dict[int, Tuple[int, Tuple[int, int, str, str]]] = {}
+        for folder_id, folder_messages in self._messages.items():
+            folder_messages.sort()
+            self._times[folder_id] = [message[RECEIVED] for message in folder_messages]
+            for message in folder_messages:
+                self._by_id[message[ID]] = (folder_id, message)
+            if self.folders[folder_id]['name'] != "Sent Items":
+                recent = len(folder_messages) - bisect.bisect_left(self._times[folder_id], self.now - UNREAD_SECONDS)
+                self.folders[folder_id]['unread'] = recent
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def message_id(self, outlook_id: int) -> str:
+        """Return the Internet Message-ID header value of a message."""
+        # The "msg" prefix keeps one id from being a substring match of another
+        return f"<msg{outlook_id}.{self.seed}@synthetic.example>"
+
+    def headers(self, outlook_id: int) -> Optional[str]:
+        """
+        Return a message's header block like Outlook's `headers` property, or None.
+
+        Some blocks carry decoys for loose matching: an In-Reply-To with the
+        previous message's id, an X-Original-Message-ID field before the real
+        one, or a Message-ID folded onto a continuation line.
+        """
+        message = self.find(outlook_id)
+        if message is None:
+            return None
+        lines = [
+            f"Received: from mx.synthetic.example by mail.synthetic.example; {formatdate(message[RECEIVED])}",
+            f"From: {message[SENDER]}",
+            f"Subject: {message[SUBJECT]}",
+            f"Date: {formatdate(message[RECEIVED])}",
+        ]
+        if outlook_id > 1:
+            lines.append(f"In-Reply-To: {self.message_id(outlook_id - 1)}")
+        if outlook_id % 5 == 0:
+            lines.append(f"X-Original-Message-ID: {self.message_id(outlook_id + 1)}")
+        if outlook_id % 7 == 0:
+            lines += ["Message-ID:", f"\t{self.message_id(outlook_id)}"]
+        else:
+            lines.append(f"Message-ID: {self.message_id(outlook_id)}")
+        lines.append("MIME-Version: 1.0")
+        return "\r\n".join(lines) + "\r\n"
+
+    def messages(self, folder_id: int) -> List[Tuple[int, int, str, str]]:
+        """Return a folder's (received, id, subject, sender) tuples, oldest first."""
+        return self._messages[folder_id]
+
+    def window(self, folder_id: int, since: float, until: float) -> List[Tuple[int, int, str, str]]:
+        """Return a folder's messages received in [since, until), oldest first."""
+        times = self._times[folder_id]
+        return self._messages[folder_id][bisect.bisect_left(times, since):bisect.bisect_left(times, until)]
+
+    def find(self, outlook_id: int) -> Optional[Tuple[int, int, str, str]]:
+        """Return a message by its Outlook id, or None if it does not exist."""
+        entry = self._by_id.get(outlook_id)
+        return entry[1] if entry else None
+
+    def find_by_message_id(self, message_id: str) -> Optional[Tuple[int, int, str, str]]:
+        """Return the message with this Internet Message-ID, or None."""
+        wanted = normalize_message_id(message_id) or ''
+        outlook_id = wanted.split('@', 1)[0][len("msg"):].partition('.')[0]
+        if not outlook_id.isdigit() or normalize_message_id(self.message_id(int(outlook_id))) != wanted:
+            return None
+        return self.find(int(outlook_id))
+
+    def add_message(self, folder_id: int, subject: str, sender: str, received: Optional[float] = None,
+                    unread: bool = True) -> int:
+        """Deliver a new message to a folder and return its Outlook id."""
+        outlook_id = max(self._by_id, default=0) + 1
+        message = (int(received if received is not None else time.time()), outlook_id, subject, sender)
+        position = bisect.bisect_right(self._times[folder_id], message[RECEIVED])
+        self._messages[folder_id].insert(position, message)
+        self._times[folder_id].insert(position, message[RECEIVED])
+        self._by_id[outlook_id] = (folder_id, message)
+        self.folders[folder_id]['unread'] += unread
+        return outlook_id
+
+    def delete_folder(self, folder_id: int):
+        """Remove a folder and its messages; ids handed out before now go stale."""
+        for message in self._messages.pop(folder_id):
+            del self._by_id[message[ID]]
+        del self._times[folder_id]
+        del self.folders[folder_id]
+
+    def subject_frequencies(self) -> List[Tuple[str, int]]:
+        """Return (subject, message count) pairs, most common first."""
+        counts: Dict[str, int] = {}
+        for folder_messages in self._messages.values():
+            for message in folder_messages:
+                counts[message[SUBJECT]] = counts.get(message[SUBJECT], 0) + 1
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+
+def _matches(subject: str, wanted: str, exact: bool) -> bool:
+    # AppleScript text comparisons ignore case
+    return subject.casefold() == wanted if exact else wanted in subject.casefold()
+
+
+class SyntheticBackend(ScriptBackend):
+    """Answers Outlook script templates from a SyntheticMailbox."""
+
+    def __init__(self, mailbox: SyntheticMailbox, latency: float = 0.0, scan_latency: float = 0.0,
+                 stall_rate: float = 0.0, stall_seconds: float = 0.0, seed: int = 0):
+        """
+        Args:
+            mailbox: The mailbox to answer from
+            latency: Seconds every call sleeps, standing in for the Apple Event round trip
+            scan_latency: Further seconds per message in the folders a searching
+                          template is given, standing in for Outlook walking them
+            stall_rate: Share of calls that stall for stall_seconds more, standing in
+                        for Outlook being busy (syncing, a modal dialog)
+            stall_seconds: Length of a stall
+            seed: Seed of the stall draws
+        """
+        self.mailbox = mailbox
+        self.latency = latency
+        self.scan_latency = scan_latency
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self._random = random.Random(seed)
+        self.calls: Dict[str, int] = {}
+        self.opened: List[int] = []
+        self._cancelled = threading.Event()
+        self._handlers: Dict[str, Callable[[List[str]], str]] = {
+            'is_outlook_running': lambda argv: "true",
+            'activate': lambda argv: "",
+            'open_message': self._open_message,
+            'open_verified_message': self._open_verified_message,
+            'list_folders': self._list_folders,
+            'list_folder_ids': self._list_folder_ids,
+            'folder_markers': self._folder_markers,
+            'folder_counts': self._folder_counts,
+            'search_and_open': self._search_and_open,
+            'planned_search': self._planned_search,
+            'export_folder': self._export_folder,
+            'export_range': self._export_range,
+            'recent_messages': self._recent_messages,
+            'batch_resolve': self._batch_resolve,
+            'open_by_message_id_scan': self._open_by_message_id_scan,
+            'message_headers': self._message_headers,
+        }
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Free-form AppleScript cannot be answered from a synthetic mailbox."""
+        print("Error: the synthetic backend only runs registered templates", file=sys.stderr)
+        return None
+
+    def call(self, template: ScriptTemplate, argv: Optional[List[str]] = None,
+             timeout: Optional[float] = None) -> Optional[str]:
+        """Answer a template call the way the AppleScript template would."""
+        handler = self._handlers.get(template.name)
+        if handler is None:
+            return f"ERROR:synthetic backend has no template {template.name!r}"
+        self.calls[template.name] = self.calls.get(template.name, 0) + 1
+        argv = list(argv or [])
+        delay = self.latency
+        if self.scan_latency and template.name in _SCANNING_TEMPLATES:
+            scanned = sum(len(self.mailbox.messages(folder_id)) for group in _parse_groups(argv[0])
+                          for folder_id in group if folder_id in self.mailbox.folders)
+            delay += self.scan_latency * scanned
+        if self.stall_rate and self._random.random() < self.stall_rate:
+            delay += self.stall_seconds
+        with metrics.execute(template.name):
+            self._cancelled.clear()
+            # Like the AppleScript session, a call past its timeout is abandoned
+            waited = delay if timeout is None else min(delay, timeout)
+            if waited and self._cancelled.wait(waited):
+                return None
+            if waited < delay:
+                print(f"Error executing AppleScript {template.name}: AppleScript timeout", file=sys.stderr)
+                return None
+            return handler(argv)
+
+    def fork(self) -> 'SyntheticBackend':
+        """Return a backend over the same mailbox (and call counters) for a concurrent caller."""
+        forked = SyntheticBackend(self.mailbox, self.latency, self.scan_latency,
+                                  self.stall_rate, self.stall_seconds)
+        forked._random = self._random
+        forked.calls = self.calls
+        forked.opened = self.opened
+        return forked
+
+    def cancel(self):
+        """Cut the simulated latency of the call in progress short; the call returns None."""
+        self._cancelled.set()
+
+    def _open(self, outlook_id: int):
+        self.opened.append(outlook_id)
+
+    def _has_message_id(self, outlook_id: int, wanted: str) -> bool:
+        # Exact comparison, like the templates' messageIdMatches
+        return normalize_message_id(self.mailbox.message_id(outlook_id)) == wanted
+
+    def _message_headers(self, argv: List[str]) -> str:
+        headers = self.mailbox.headers(int(argv[0]))
+        return "NOTFOUND" if headers is None else headers
+
+    def _open_message(self, argv: List[str]) -> str:
+        if self.mailbox.find(int(argv[0])) is None:
+            return f"ERROR:Can't get message id {argv[0]}."
+        self._open(int(argv[0]))
+        return "SUCCESS"
+
+    def _open_verified_message(self, argv: List[str]) -> str:
+        message = self.mailbox.find(int(argv[0]))
+        if message is None or not self._has_message_id(message[ID], argv[1]):
+            return "STALE"
+        self._open(message[ID])
+        return "SUCCESS"
+
+    def _list_folders(self, argv: List[str]) -> str:
+        return format_frame('folders', ((folder['name'], len(self.mailbox.messages(folder_id)))
+                                        for folder_id, folder in self.mailbox.folders.items()))
+
+    def _list_folder_ids(self, argv: List[str]) -> str:
+        return format_frame('folder_ids', ((folder_id, folder['name'], folder['account'])
+                                           for folder_id, folder in self.mailbox.folders.items()))
+
+    def _folder_markers(self, argv: List[str]) -> str:
+        return format_frame('markers', ((folder_id, folder['name'], folder['unread'])
+                                        for folder_id, folder in self.mailbox.folders.items()))
+
+    def _folder_counts(self, argv: List[str]) -> str:
+        folder_ids = _parse_groups(argv[0])[0]
+        if any(folder_id not in self.mailbox.folders for folder_id in folder_ids):
+            return STALE_FOLDER
+        return format_frame('counts', ((folder_id, len(self.mailbox.messages(folder_id))) for folder_id in folder_ids))
+
+    def _search_and_open(self, argv: List[str]) -> str:
+        groups = _parse_groups(argv[0])
+        wanted, exact, message_id, policy = argv[1].casefold(), argv[2] == "1", argv[3], argv[4]
+        open_found = len(argv) < 6 or argv[5] == "1"
+        found = None
+        stale = False
+        for group_index, group in enumerate(groups, 1):
+            for folder_id in group:
+                if folder_id not in self.mailbox.folders:
+                    stale = True
+                    continue
+                # Outlook lists a folder's messages newest first
+                matching = [m for m in reversed(self.mailbox.messages(folder_id)) if _matches(m[SUBJECT], wanted, exact)]
+                if not matching:
+                    continue
+                by_id = [m for m in matching if message_id and self._has_message_id(m[ID], message_id)]
+                candidate, candidate_by_id = (by_id[0], True) if by_id else (matching[0], False)
+                if (found is None or (candidate_by_id and not found[2])
+                        or (candidate_by_id == found[2] and candidate[RECEIVED] > found[1][RECEIVED])):
+                    found = (group_index, candidate, candidate_by_id)
+            if policy == "first" and found is not None:
+                break
+
+        if found is None:
+            return STALE_FOLDER if stale else "NOTFOUND"
+        group_index, message, by_id = found
+        if open_found:
+            self._open(message[ID])
+        return format_frame('opened', [(group_index, message[ID], "true" if by_id else "false",
+                                        applescript_date(message[RECEIVED]), message[SENDER], message[SUBJECT])],
+                            [message[RECEIVED]])
+
+    def _planned_search(self, argv: List[str]) -> str:
+        groups = _parse_groups(argv[0])
+        mode, wanted, sender_filter = argv[1], argv[2].casefold(), argv[3].casefold()
+        since, until, open_newest = float(argv[4]), float(argv[5]), argv[6] == "1"
+        results = []
+        newest = None
+        stale = False
+        for group_index, group in enumerate(groups, 1):
+            for folder_id in group:
+                if folder_id not in self.mailbox.folders:
+                    stale = True
+                    continue
+                for message in self.mailbox.window(folder_id, since, until):
+                    if mode != "any" and not _matches(message[SUBJECT], wanted, mode == "exact"):
+                        continue
+                    if sender_filter and sender_filter not in message[SENDER].casefold():
+                        continue
+                    results.append((message[ID], group_index, message[SUBJECT], message[SENDER], message[RECEIVED]))
+                    if newest is None or message[RECEIVED] > newest[RECEIVED]:
+                        newest = message
+
+        if stale and not results:
+            return STALE_FOLDER
+        meta = [""]
+        if open_newest and newest is not None:
+            self._open(newest[ID])
+            meta = [newest[ID], normalize_message_id(self.mailbox.message_id(newest[ID]))]
+        return format_frame('results', results, meta)
+
+    def _export_folder(self, argv: List[str]) -> str:
+        records = []
+        for folder_id in _parse_groups(argv[0])[0]:
+            if folder_id not in self.mailbox.folders:
+                return STALE_FOLDER
+            records.extend((message[ID], message[SUBJECT], message[SENDER], message[RECEIVED],
+                            normalize_message_id(self.mailbox.message_id(message[ID])))
+                           for message in self.mailbox.messages(folder_id))
+        return format_frame('messages', records)
+
+    def _export_range(self, argv: List[str]) -> str:
+        folder_id, first, count = int(argv[0]), int(argv[1]), int(argv[2])
+        if folder_id not in self.mailbox.folders:
+            return STALE_FOLDER
+        messages = self.mailbox.messages(folder_id)
+        records = [(message[ID], message[SUBJECT], message[SENDER], message[RECEIVED],
+                    normalize_message_id(self.mailbox.message_id(message[ID])))
+                   for message in messages[max(first - 1, 0):first - 1 + count]]
+        return format_frame('messages', records, [len(messages)])
+
+    def _recent_messages(self, argv: List[str]) -> str:
+        since = float(argv[1])
+        records = []
+        counts = []
+        for group_index, group in enumerate(_parse_groups(argv[0]), 1):
+            for folder_id in group:
+                if folder_id not in self.mailbox.folders:
+                    return STALE_FOLDER
+                counts.append(f"{folder_id}={len(self.mailbox.messages(folder_id))}")
+                records.extend((message[ID], group_index, message[SUBJECT], message[SENDER], message[RECEIVED],
+                                normalize_message_id(self.mailbox.message_id(message[ID])))
+                               for message in self.mailbox.window(folder_id, since, float('inf')))
+        return format_frame('recent', records, counts)
+
+    def _batch_resolve(self, argv: List[str]) -> str:
+        groups = _parse_groups(argv[0])
+        query_count = (len(argv) - 1) // 4
+        results = []
+        stale = False
+        for query_index in range(1, query_count + 1):
+            base = 1 + (query_index - 1) * 4
+            wanted, exact, message_id, open_match = (argv[base].casefold(), argv[base + 1] == "1",
+                                                     argv[base + 2], argv[base + 3] == "1")
+            found = None
+            for group_index, group in enumerate(groups, 1):
+                for folder_id in group:
+                    if folder_id not in self.mailbox.folders:
+                        stale = True
+                        continue
+                    if found is not None:
+                        continue
+                    candidates = [m for m in reversed(self.mailbox.messages(folder_id))
+                                  if not wanted or _matches(m[SUBJECT], wanted, exact)]
+                    if message_id:
+                        found = next((m for m in candidates if self._has_message_id(m[ID], message_id)), None)
+                    elif candidates:
+                        found = candidates[0]
+                    if found is None and wanted and candidates:
+                        found = candidates[0]
+                    if found is not None:
+                        found_group = group_index
+                if found is not None:
+                    break
+            if found is not None:
+                if open_match:
+                    self._open(found[ID])
+                results.append((query_index, found_group, found[ID], found[SUBJECT], found[SENDER], found[RECEIVED]))
+
+        if stale and len(results) < query_count:
+            return STALE_FOLDER
+        return format_frame('results', results)
+
+    def _open_by_message_id_scan(self, argv: List[str]) -> str:
+        message = self.mailbox.find_by_message_id(argv[0])
+        if message is None:
+            return "NOTFOUND"
+        self._open(message[ID])
+        return f"SUCCESS{FIELD_SEPARATOR}{message[ID]}"
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+AppleScriptSession against the stand-in worker
+Covers the framing protocol, restarting a crashed worker (and not resending
+what may already have run) and timeouts, without osascript.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+CLIENT_AGENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CLIENT_AGENT)
+
+from applescript_session import AppleScriptSession  # noqa: E402
+from applescript_templates import get_template  # noqa: E402
+from synthetic_mailbox import SyntheticBackend, SyntheticMailbox  # noqa: E402
+
+WORKER = os.path.join(CLIENT_AGENT, 'stand_in_worker.py')
+NOW = 1700000000
+
+
+def worker_command(*options):
+    return [sys.executable, WORKER, '--messages', '3000', '--now', str(NOW), *options]
+
+
+class AppleScriptSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.log = tempfile.mkstemp(suffix='.log')
+        os.close(handle)
+        self.addCleanup(os.unlink, self.log)
+
+    def received(self, name):
+        """Requests for a template, by the pid of the worker that read them."""
+        with open(self.log, encoding='utf-8') as f:
+            return [line.split()[0] for line in f if line.split()[2:] == [name]]
+
+    def session(self, *options, timeout=10.0):
+        session = AppleScriptSession(worker_command('--log', self.log, *options), timeout=timeout)
+        self.addCleanup(session.close)
+        return session
+
+    def test_framing_round_trips_large_and_non_ascii_replies(self):
+        session = self.session()
+        expected = SyntheticBackend(SyntheticMailbox(messages=3000, accounts=1, now=NOW))
+        template = get_template('export_folder')
+        folder_id = str(next(iter(expected.mailbox.folders)))
+
+        output = session.call(template, [folder_id])
+        self.assertGreater(len(output.encode('utf-8')), 65536, 'reply should span several reads')
+        self.assertEqual(output, expected.call(template, [folder_id]).strip(' \t\r\n'))
+        # Replies keep following each other on the same worker
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+        status, text = session.request({'op': 'exec', 'source': 'return "é\n"'})
+        self.assertEqual(status, 'ERR')
+        self.assertEqual(len(set(self.received('export_folder') + self.received('is_outlook_running'))), 1)
+
+    def test_crashed_worker_is_restarted_for_read_only_calls(self):
+        session = self.session('--crash-after', '1')
+        template = get_template('is_outlook_running')
+
+        self.assertEqual(session.call(template), 'true')
+        # The first worker dies reading the second call; a new one answers it
+        self.assertEqual(session.call(template), 'true')
+        workers = self.received('is_outlook_running')
+        self.assertEqual(len(workers), 3)
+        self.assertEqual(len(set(workers)), 2)
+
+    def test_open_is_not_resent_after_the_worker_read_it(self):
+        session = self.session('--crash-after', '1')
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+
+        self.assertIsNone(session.call(get_template('open_message'), ['101']))
+        self.assertEqual(len(self.received('open_message')), 1)
+        # The next call gets a new worker
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+
+    def test_open_goes_to_a_new_worker_when_the_old_one_died_idle(self):
+        session = self.session()
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+        session._process.kill()
+        session._process.wait()
+
+        self.assertIsNotNone(session.call(get_template('open_message'), ['101']))
+        self.assertEqual(len(self.received('open_message')), 1)
+
+    def test_timeout_kills_the_worker_and_the_next_call_starts_a_new_one(self):
+        session = self.session('--stall', 'folder_markers=5', timeout=0.5)
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+
+        status, text = session.request({'op': 'call', 'name': 'folder_markers', 'key': 'x', 'source': '',
+                                        'path': None, 'argv': []})
+        self.assertEqual((status, text), ('ERR', 'AppleScript timeout'))
+        self.assertEqual(len(self.received('folder_markers')), 1, 'a timed out call is not retried')
+        self.assertEqual(session.call(get_template('is_outlook_running')), 'true')
+        self.assertEqual(len(set(self.received('is_outlook_running'))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
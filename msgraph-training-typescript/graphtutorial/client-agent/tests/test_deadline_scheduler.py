@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+DeadlineScheduler and ScheduledBackend
+Covers learned deadlines, the hedge delay gate, which templates are safe to
+repeat, and that only those are retried after running into their deadline.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from applescript_session import ScriptBackend  # noqa: E402
+from applescript_templates import get_template  # noqa: E402
+from deadline_scheduler import (DeadlineScheduler, LatencyModel, ScheduledBackend,  # noqa: E402
+                                is_safe_to_retry)
+
+
+class StallingBackend(ScriptBackend):
+    """Runs out the deadline of every call, like a stalled Outlook, and records the deadlines given."""
+
+    def __init__(self):
+        self.deadlines = []
+
+    def call(self, template, argv=None, timeout=None):
+        self.deadlines.append(timeout)
+        time.sleep(timeout)
+        return None
+
+
+class DeadlineSchedulerTest(unittest.TestCase):
+
+    def scheduler(self, **options):
+        return DeadlineScheduler(LatencyModel(path=''), **options)
+
+    def test_deadline_follows_the_learned_latencies(self):
+        scheduler = self.scheduler(default_timeout=30.0, min_timeout=2.0)
+        self.assertEqual(scheduler.timeout_for('export_folder', 'Inbox'), 30.0)
+        for _ in range(10):
+            scheduler.observe('export_folder', 'Inbox', 4.0)
+        self.assertEqual(scheduler.timeout_for('export_folder', 'Inbox'), 8.0)
+        # Other folders learn on their own
+        self.assertEqual(scheduler.timeout_for('export_folder', 'Archive'), 30.0)
+
+        scheduler.observe('export_folder', 'Inbox', 8.0, timed_out=True)
+        self.assertEqual(scheduler.timeout_for('export_folder', 'Inbox'), 16.0)
+        scheduler.observe('export_folder', 'Inbox', 4.0)
+        self.assertEqual(scheduler.timeout_for('export_folder', 'Inbox'), 8.0)
+
+    def test_only_slow_operations_are_hedged(self):
+        scheduler = self.scheduler(min_hedge_delay=2.0)
+        for _ in range(10):
+            scheduler.observe('search_and_open', 'Inbox', 0.3)
+            scheduler.observe('search_and_open', 'Archive', 5.0)
+        self.assertIsNone(scheduler.hedge_delay('search_and_open', 'Inbox'))
+        self.assertEqual(scheduler.hedge_delay('search_and_open', 'Archive'), 5.0)
+        self.assertIsNone(scheduler.hedge_delay('search_and_open', 'Sent Items'))
+
+    def test_is_safe_to_retry(self):
+        self.assertTrue(is_safe_to_retry('recent_messages', ['1', '0', '50']))
+        self.assertTrue(is_safe_to_retry('folder_counts'))
+        self.assertFalse(is_safe_to_retry('open_message', ['101']))
+        self.assertTrue(is_safe_to_retry('search_and_open', ['1', 'Budget', '1', '', 'first', '0']))
+        self.assertFalse(is_safe_to_retry('search_and_open', ['1', 'Budget', '1', '', 'first', '1']))
+        self.assertFalse(is_safe_to_retry('search_and_open', ['1', 'Budget']))
+        self.assertTrue(is_safe_to_retry('batch_resolve', ['1', 'a', '1', '', '0', 'b', '1', '', '0']))
+        self.assertFalse(is_safe_to_retry('batch_resolve', ['1', 'a', '1', '', '0', 'b', '1', '', '1']))
+
+
+class ScheduledBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stalling = StallingBackend()
+        self.scheduler = DeadlineScheduler(LatencyModel(path=''), default_timeout=0.05, min_timeout=0.01,
+                                           max_timeout=1.0)
+        self.backend = ScheduledBackend(self.stalling, self.scheduler)
+
+    def test_a_read_only_template_is_retried_once_with_a_longer_deadline(self):
+        self.assertIsNone(self.backend.call(get_template('folder_counts'), ['101']))
+        self.assertEqual(self.stalling.deadlines, [0.05, 0.1])
+        self.assertEqual((self.scheduler.retries, self.scheduler.timeouts), (1, 2))
+
+    def test_templates_that_open_a_message_are_not_repeated(self):
+        self.assertIsNone(self.backend.call(get_template('open_message'), ['101']))
+        self.assertIsNone(self.backend.call(get_template('search_and_open'),
+                                            ['1', 'Budget', '1', '', 'first', '1']))
+        self.assertEqual(len(self.stalling.deadlines), 2)
+        self.assertEqual(self.scheduler.retries, 0)
+
+    def test_a_search_that_does_not_open_is_retried(self):
+        self.backend.call(get_template('search_and_open'), ['1', 'Budget', '1', '', 'first', '0'])
+        self.assertEqual(len(self.stalling.deadlines), 2)
+
+    def test_a_caller_given_timeout_is_not_retried(self):
+        self.assertIsNone(self.backend.call(get_template('folder_counts'), ['101'], timeout=0.02))
+        self.assertEqual(self.stalling.deadlines, [0.02])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+LookupCache and the cached Message-ID lookup of open_outlook_email.py
+Covers invalidation by folder counts, TTLs, eviction, processes sharing the
+file, and which folders a cached Message-ID lookup counts.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from folder_snapshot import FolderSnapshot  # noqa: E402
+from lookup_cache import LookupCache, lookup_key  # noqa: E402
+from open_outlook_email import OutlookManager  # noqa: E402
+from synthetic_mailbox import SyntheticBackend, SyntheticMailbox  # noqa: E402
+
+
+class LookupCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        os.unlink(self.path)
+        self.addCleanup(lambda: os.path.exists(self.path) and os.unlink(self.path))
+
+    def stored_keys(self):
+        with open(self.path, encoding='utf-8') as f:
+            return [key for key, _ in json.load(f)['entries']]
+
+    def test_entry_is_current_only_while_counts_are_unchanged(self):
+        cache = LookupCache(self.path)
+        key = lookup_key('open', "Budget", True, '', ["Inbox"], "first")
+        cache.put(key, {'id': 7}, {'101': 10})
+
+        entry = cache.get(key)
+        self.assertEqual(entry['message'], {'id': 7})
+        self.assertTrue(cache.is_current(entry, {'101': 10}))
+        self.assertFalse(cache.is_current(entry, {'101': 11}))
+        self.assertFalse(cache.is_current(entry, None))
+
+    def test_misses_expire_before_hits(self):
+        cache = LookupCache(self.path, hit_ttl=60, miss_ttl=1)
+        cache.put('hit', {'id': 1}, {})
+        cache.put('miss', None, {})
+        for entry in cache._load().values():
+            entry['stored_at'] = time.time() - 5
+        self.assertIsNotNone(cache.get('hit'))
+        self.assertIsNone(cache.get('miss'))
+
+    def test_reads_do_not_write_and_recency_decides_eviction(self):
+        cache = LookupCache(self.path, capacity=2)
+        cache.put('a', None, {})
+        cache.put('b', None, {})
+        written = os.stat(self.path).st_mtime_ns
+        cache.get('a')
+        self.assertEqual(os.stat(self.path).st_mtime_ns, written)
+
+        cache.put('c', None, {})
+        self.assertEqual(self.stored_keys(), ['a', 'c'])
+
+    def test_processes_keep_each_others_entries(self):
+        first, second = LookupCache(self.path), LookupCache(self.path)
+        first.put('a', None, {})
+        self.assertEqual(len(second), 1)
+        second.put('b', None, {})
+        first.put('c', None, {})
+        self.assertEqual(sorted(self.stored_keys()), ['a', 'b', 'c'])
+
+        second.forget('a')
+        self.assertEqual(sorted(self.stored_keys()), ['b', 'c'])
+
+
+class CachedMessageIdLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mailbox = SyntheticMailbox(messages=500, accounts=2, seed=1)
+        self.backend = SyntheticBackend(self.mailbox)
+        self.manager = OutlookManager(session=self.backend, cache=LookupCache(''),
+                                      snapshot=FolderSnapshot(None, path=''))
+        self.manager.snapshot.run_template = self.manager._call
+        self.inbox = next(folder_id for folder_id, folder in self.mailbox.folders.items() if folder['name'] == "Inbox")
+
+    def lookup(self, message_id):
+        with contextlib.redirect_stderr(io.StringIO()):
+            return self.manager.search_by_message_id_header(message_id)
+
+    def test_hit_is_verified_without_counting_folders(self):
+        outlook_id = next(iter(self.mailbox._by_id))
+        message_id = self.mailbox.message_id(outlook_id)
+        self.assertTrue(self.lookup(message_id))
+        self.backend.calls.clear()
+
+        self.assertTrue(self.lookup(message_id))
+        self.assertEqual(self.backend.calls, {'open_verified_message': 1})
+
+    def test_miss_recounts_only_folders_whose_marker_changed(self):
+        missing = "<nowhere@synthetic.example>"
+        self.assertFalse(self.lookup(missing))
+        self.backend.calls.clear()
+
+        self.assertFalse(self.lookup(missing))
+        self.assertNotIn('open_by_message_id_scan', self.backend.calls)
+        self.assertNotIn('folder_counts', self.backend.calls)
+
+        # New mail changes the Inbox's marker: the cached miss is no longer trusted
+        self.mailbox.add_message(self.inbox, "Late arrival", "late@example.com")
+        self.assertFalse(self.lookup(missing))
+        self.assertEqual(self.backend.calls.get('folder_counts'), 1)
+        self.assertEqual(self.backend.calls.get('open_by_message_id_scan'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Query plans and newest-first window scans
+Covers the chosen subject strategy, how windows grow and shrink with the
+matches they return, the single scan of the rest of the range after empty
+windows, and what describe() reports.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_planner import (FIRST_WINDOW_SECONDS, STRATEGY_ANY, STRATEGY_CONTAINS, STRATEGY_EXACT,  # noqa: E402
+                           WINDOW_GROWTH, SearchQuery, plan_search)
+
+NOW = 1700000000.0
+
+
+class QueryPlannerTest(unittest.TestCase):
+
+    def test_strategy_follows_the_subject(self):
+        self.assertEqual(plan_search(SearchQuery("Budget"), now=NOW).strategy, STRATEGY_EXACT)
+        self.assertEqual(plan_search(SearchQuery("Budget", exact=False), now=NOW).strategy, STRATEGY_CONTAINS)
+        self.assertEqual(plan_search(SearchQuery(), now=NOW).strategy, STRATEGY_ANY)
+
+    def test_a_miss_scans_the_rest_of_the_range_after_two_empty_windows(self):
+        plan = plan_search(SearchQuery("Nothing"), now=NOW)
+        windows = plan.windows()
+        scanned = []
+        for window in windows:
+            scanned.append(window)
+            windows.record(0)
+        self.assertEqual(len(scanned), 3)
+        self.assertEqual(scanned[0][1] - scanned[0][0], FIRST_WINDOW_SECONDS)
+        self.assertEqual(scanned[1][1] - scanned[1][0], FIRST_WINDOW_SECONDS * WINDOW_GROWTH)
+        self.assertEqual(scanned[2][0], plan.start)
+        # Adjacent, newest first
+        self.assertEqual(scanned[1][1], scanned[0][0])
+        self.assertEqual(scanned[2][1], scanned[1][0])
+
+    def test_windows_are_sized_from_the_matches_seen(self):
+        windows = plan_search(SearchQuery("Report", since=0), now=NOW).windows(chunk_size=100)
+        first = next(windows)
+        windows.record(400)
+        second = next(windows)
+        self.assertEqual(second[1] - second[0], (first[1] - first[0]) / WINDOW_GROWTH)
+
+        # A window with matches resets the run of empty ones
+        windows.record(0)
+        next(windows)
+        windows.record(100)
+        next(windows)
+        windows.record(0)
+        self.assertNotEqual(next(windows)[0], 0)
+
+    def test_since_bounds_the_range(self):
+        plan = plan_search(SearchQuery("Budget", since=NOW - 3600), now=NOW)
+        self.assertEqual(list(plan.windows()), [(NOW - 3600, NOW + 24 * 3600)])
+
+    def test_describe_reports_the_sender_as_a_post_filter(self):
+        description = plan_search(SearchQuery("Budget", sender="bob@example.com"), now=NOW).describe()
+        whose = description.splitlines()[0]
+        self.assertNotIn("sender", whose)
+        self.assertIn('sender address contains "bob@example.com" (not part of the whose clause)', description)
+
+
+if __name__ == '__main__':
+    unittest.main()
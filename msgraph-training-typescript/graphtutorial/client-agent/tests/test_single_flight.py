@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+SingleFlight and the daemon's request keys
+Covers which requests share a run (request_key()), that concurrent callers of
+one key get one run and its result or exception, and that a key is free again
+once its run finished.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outlook_daemon import request_key  # noqa: E402
+from single_flight import SingleFlight  # noqa: E402
+
+
+class RequestKeyTest(unittest.TestCase):
+
+    def test_searches_differing_in_case_or_message_id_brackets_share_a_key(self):
+        first = {'op': 'search', 'args': {'subject': " Budget Review ", 'folders': ["Inbox"],
+                                          'message_id': "<a@x>"}}
+        second = {'op': 'search', 'args': {'subject': "budget review", 'folders': ["INBOX"],
+                                           'message_id': "a@x", 'exact': True, 'policy': "first"}}
+        self.assertIsNotNone(request_key(first))
+        self.assertEqual(request_key(first), request_key(second))
+
+    def test_searches_differing_in_meaning_do_not(self):
+        base = {'subject': "Budget", 'folders': ["Inbox"]}
+        key = request_key({'op': 'search', 'args': base})
+        self.assertNotEqual(key, request_key({'op': 'search', 'args': dict(base, exact=False)}))
+        self.assertNotEqual(key, request_key({'op': 'search', 'args': dict(base, policy="newest")}))
+        self.assertNotEqual(key, request_key({'op': 'search', 'args': dict(base, folders=["Sent Items"])}))
+        self.assertNotEqual(key, request_key({'op': 'open', 'args': {'id': "Budget"}}))
+
+    def test_open_and_find_keys(self):
+        self.assertEqual(request_key({'op': 'open', 'args': {'id': 7}}),
+                         request_key({'op': 'open', 'args': {'id': "7"}}))
+        self.assertNotEqual(request_key({'op': 'open', 'args': {'id': 7}}),
+                            request_key({'op': 'headers', 'args': {'id': 7}}))
+        self.assertEqual(request_key({'op': 'find', 'args': {'subject': "a", 'limit': 5}}),
+                         request_key({'op': 'find', 'args': {'limit': 5, 'subject': "a"}}))
+
+    def test_batches_and_malformed_requests_never_coalesce(self):
+        self.assertIsNone(request_key({'op': 'batch', 'args': {'queries': []}}))
+        self.assertIsNone(request_key({'op': 'search', 'args': ["Budget"]}))
+        self.assertIsNone(request_key({'op': 'unknown', 'args': {}}))
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_run(self):
+        flights = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return len(runs)
+
+        async def main():
+            results = await asyncio.gather(*(flights.run('k', work, 'search') for _ in range(3)))
+            # The key is free again: a later request runs anew
+            later = await flights.run('k', work, 'search')
+            return results, later
+
+        results, later = asyncio.run(main())
+        self.assertEqual(results, [1, 1, 1])
+        self.assertEqual(later, 2)
+        self.assertEqual(flights.stats(), {'executed': 2, 'coalesced': 2, 'in_flight': 0,
+                                           'operations': {'search': {'executed': 2, 'coalesced': 2}}})
+
+    def test_every_caller_gets_the_exception_and_none_keys_run_alone(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("Outlook is not running")
+
+        async def main():
+            return await asyncio.gather(*(flights.run('k', fail) for _ in range(2)),
+                                        *(flights.run(None, fail) for _ in range(2)), return_exceptions=True)
+
+        outcomes = asyncio.run(main())
+        self.assertTrue(all(isinstance(outcome, RuntimeError) for outcome in outcomes))
+        self.assertEqual((flights.executed, flights.coalesced), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
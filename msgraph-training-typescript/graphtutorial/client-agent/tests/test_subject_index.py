@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+SubjectIndex and MailIndex subject lookups
+Covers ranking, result limits (0 meaning all), incremental folder updates and
+MailIndex's Message-ID lookups.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_index import MailIndex  # noqa: E402
+from subject_index import SubjectIndex, normalize_subject  # noqa: E402
+
+MESSAGES = [
+    {'id': 1, 'subject': "Budget review", 'received': 100},
+    {'id': 2, 'subject': "RE: Budget review", 'received': 300},
+    {'id': 3, 'subject': "Budget review (v2)", 'received': 200},
+    {'id': 4, 'subject': "Quarterly budget review", 'received': 400},
+    {'id': 5, 'subject': "Lunch on Friday", 'received': 500},
+]
+
+
+class SubjectIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SubjectIndex()
+        self.index.add("Inbox", MESSAGES)
+
+    def ids(self, text, **options):
+        return [match['id'] for match in self.index.search(text, **options)]
+
+    def test_normalize_subject(self):
+        self.assertEqual(normalize_subject("RE: FW:  Budget \t review "), "budget review")
+        self.assertEqual(normalize_subject("Re[2]: AW: Budget"), "budget")
+        self.assertEqual(normalize_subject(None), "")
+
+    def test_ambiguous_markers_are_kept_unless_next_to_a_reply_marker(self):
+        self.assertEqual(normalize_subject("Ref: invoice 123"), "ref: invoice 123")
+        self.assertEqual(normalize_subject("VS: budget"), "vs: budget")
+        self.assertEqual(normalize_subject("tr: onboarding"), "tr: onboarding")
+        self.assertEqual(normalize_subject("TR: RE: budget"), "budget")
+        self.assertEqual(normalize_subject("RE: Ref: invoice 123"), "invoice 123")
+
+        self.index.add("Archive", [{'id': 10, 'subject': "Ref: invoice 123", 'received': 50},
+                                   {'id': 11, 'subject': "Invoice 123", 'received': 60}])
+        # "Invoice 123" does not contain "ref: invoice 123"; both contain "invoice 123"
+        self.assertEqual(self.ids("Ref: invoice 123"), [10])
+        self.assertEqual(self.ids("invoice 123"), [11, 10])
+
+    def test_contains_ranks_equal_then_prefix_then_rest_newest_first(self):
+        self.assertEqual(self.ids("budget review"), [2, 1, 3, 4])
+
+    def test_contains_limits(self):
+        self.assertEqual(self.ids("budget review", limit=1), [2])
+        self.assertEqual(self.ids("budget review", limit=0), [2, 1, 3, 4])
+        self.assertEqual(self.ids("budget review", limit=-1), [2, 1, 3, 4])
+        self.assertEqual(self.ids("nothing like it", limit=0), [])
+
+    def test_fuzzy_limits(self):
+        self.assertEqual(self.ids("budgt reviw", fuzzy=True, limit=1), [2])
+        everything = self.ids("budgt reviw", fuzzy=True, limit=0)
+        self.assertEqual(everything[:2], [2, 1])
+        self.assertNotIn(5, everything)
+        self.assertEqual(self.ids("budgt reviw", fuzzy=True), everything)
+
+    def test_folder_filter_and_incremental_replace(self):
+        self.index.add("Archive", [{'id': 9, 'subject': "Budget review", 'received': 50}])
+        self.assertEqual(self.ids("budget review", folder="archive"), [9])
+        self.assertEqual(self.ids("budget review", folder="Missing"), [])
+
+        self.index.replace_folder("Inbox", [MESSAGES[0], dict(MESSAGES[3], subject="Holiday plans")])
+        self.assertEqual(self.ids("budget review", limit=0), [1, 9])
+        self.assertTrue(self.index.remove(1))
+        self.assertFalse(self.index.remove(1))
+        self.assertEqual(self.ids("budget review"), [9])
+
+
+class MailIndexSubjectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MailIndex(':memory:')
+        self.addCleanup(self.index.close)
+        self.index.replace_folder("Inbox", [dict(message, sender="a@example.com", message_id=f"<{message['id']}@x>")
+                                            for message in MESSAGES])
+
+    def test_limit_zero_returns_every_match(self):
+        self.assertEqual(len(self.index.search_subject("budget review", exact=False, limit=0)), 4)
+        self.assertEqual(len(self.index.search_subject("budget review", fuzzy=True, limit=0)), 4)
+        self.assertEqual([row['id'] for row in self.index.search_subject("Budget review", limit=0)], [1])
+        self.assertEqual(len(self.index.search_subject("budget review", exact=False, limit=1)), 1)
+
+    def test_trigram_index_follows_folder_updates(self):
+        self.assertEqual(len(self.index.search_subject("budget review", exact=False, limit=0)), 4)
+        self.index.replace_folder("Inbox", [dict(MESSAGES[0], sender="a@example.com", message_id="<1@x>")])
+        self.assertEqual([row['id'] for row in self.index.search_subject("budget", exact=False)], [1])
+        self.index.remove_message(1)
+        self.assertEqual(self.index.search_subject("budget", exact=False), [])
+
+    def test_message_id_lookups(self):
+        self.assertEqual(self.index.lookup_message_id(" <3@x> "), 3)
+        self.index.remember_message_id("<elsewhere@x>", 42)
+        self.assertEqual(self.index.lookup_message_id("elsewhere@x"), 42)
+        self.index.forget_message_id("3@x")
+        self.assertIsNone(self.index.lookup_message_id("<3@x>"))
+        self.assertEqual(len(self.index.search_subject("budget review", exact=False, limit=0)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
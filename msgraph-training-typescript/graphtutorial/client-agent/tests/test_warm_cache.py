@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+WarmCache windows
+Covers when a window decides a lookup on its own (whole folder known, match
+inside a partial window, Message-ID matches) and when it must leave the answer
+to a scan, plus the first/newest policies and invalidation by counts.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warm_cache import WarmCache  # noqa: E402
+
+NOW = 1700000000.0
+SINCE = NOW - 1000
+
+
+def record(outlook_id, subject, received, message_id=None):
+    return {'id': outlook_id, 'subject': subject, 'sender': "a@example.com", 'received': received,
+            'message_id': message_id or f"{outlook_id}@example.com", 'folder': "Inbox"}
+
+
+class WarmCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = WarmCache()
+        # Two of the Inbox's five messages arrived since the cutoff
+        self.cache.load("Inbox", [record(1, "Budget", NOW - 100), record(2, "Lunch", NOW - 50)],
+                        {'101': 5}, SINCE)
+        # Sent Items holds three messages, all of them in the window
+        self.cache.load("Sent Items", [record(11, "Budget", NOW - 10), record(12, "Offsite", NOW - 900),
+                                       record(13, "Lunch", NOW - 5000)], {'102': 3}, SINCE)
+
+    def lookup_id(self, *args, **options):
+        found = self.cache.lookup(*args, **options)
+        return None if found is None else found['id']
+
+    def test_a_match_inside_a_partial_window_is_the_folders_newest(self):
+        self.assertEqual(self.lookup_id("budget", ["Inbox"]), 1)
+        self.assertEqual(self.lookup_id("LUN", ["Inbox"], exact=False), 2)
+
+    def test_no_match_in_a_partial_window_is_left_to_a_scan(self):
+        self.assertIsNone(self.lookup_id("Offsite", ["Inbox"]))
+        self.assertIsNone(self.lookup_id("Offsite", ["Inbox", "Sent Items"]))
+
+    def test_a_complete_window_decides_misses_too(self):
+        self.assertEqual(self.lookup_id("Offsite", ["Sent Items"]), 12)
+        self.assertEqual(self.lookup_id("Lunch", ["Sent Items"]), 13)
+        self.assertIsNone(self.cache.lookup("Holiday", ["Sent Items"]))
+        # ...and lets the next folder answer
+        self.assertEqual(self.lookup_id("Budget", ["Sent Items", "Inbox"]), 11)
+
+    def test_policies(self):
+        self.assertEqual(self.lookup_id("Budget", ["Inbox", "Sent Items"], policy="first"), 1)
+        self.assertEqual(self.lookup_id("Budget", ["Inbox", "Sent Items"], policy="newest"), 11)
+
+    def test_message_id_matches(self):
+        found = self.cache.lookup("Budget", ["Inbox"], message_id="<1@example.com>")
+        self.assertEqual((found['id'], found['matched_message_id']), (1, True))
+        # The scan would prefer an older match carrying the Message-ID, which a partial window cannot rule out
+        self.assertIsNone(self.cache.lookup("Budget", ["Inbox"], message_id="<old@example.com>"))
+        # A complete window can: the newest subject match is opened instead
+        found = self.cache.lookup("Budget", ["Sent Items"], message_id="<old@example.com>")
+        self.assertEqual((found['id'], found['matched_message_id']), (11, False))
+        # A match by Message-ID wins over a newer one by subject in another folder
+        self.cache.load("Archive", [record(21, "Budget", NOW - 1, "21@example.com")], {'103': 1}, SINCE)
+        found = self.cache.lookup("Budget", ["Archive", "Inbox"], message_id="1@example.com", policy="newest")
+        self.assertEqual(found['id'], 1)
+
+    def test_windows_are_tied_to_counts_and_missing_ones_miss(self):
+        self.assertTrue(self.cache.is_current("inbox", {'101': 5}))
+        self.assertFalse(self.cache.is_current("Inbox", {'101': 6}))
+        self.assertIsNone(self.cache.lookup("Budget", ["Deleted Items"]))
+        self.cache.discard(1)
+        self.assertIsNone(self.cache.lookup("Budget", ["Inbox"]))
+
+    def test_a_window_cut_at_the_limit_starts_at_its_oldest_message(self):
+        cache = WarmCache(limit=2)
+        cache.load("Inbox", [record(1, "Budget", NOW - 30), record(2, "Lunch", NOW - 20),
+                             record(3, "Offsite", NOW - 10)], {'101': 3}, SINCE)
+        window = cache.stats()['folders']['Inbox']
+        self.assertEqual((window['messages'], window['complete'], window['since']), (2, False, NOW - 20))
+        self.assertIsNone(cache.lookup("Budget", ["Inbox"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
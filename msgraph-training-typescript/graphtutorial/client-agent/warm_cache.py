@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Warm cache of recent folder metadata
+Nearly every message the agent opens arrived in the last few days, yet the
+first open after a start scans whole folders. OutlookManager.prefetch() loads
+id, subject, sender, received time and Message-ID of the newest messages of a
+few folders (Inbox and Sent Items by default) with one recent_messages script
+run and keeps them here, so an open of recent mail is matched in memory and
+only the open itself goes to Outlook.
+
+Each folder's window holds every message received after its cutoff, so a
+lookup is answered only when the window alone decides which message the full
+search_and_open scan would open: the folder's newest subject match, or the
+match carrying the wanted Message-ID, must lie inside it. Anything else is a
+miss and the caller scans. A window stores the message counts its folders had
+when it was loaded; the caller reloads it once Outlook's counts differ.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from mail_index import normalize_message_id
+
+# Folders prefetched when none are given: where the agent opens mail from
+PREFETCH_FOLDERS = ["Inbox", "Sent Items"]
+
+# Newest messages kept per folder name
+PREFETCH_LIMIT = 500
+
+# Only messages received this recently are fetched
+PREFETCH_WINDOW_SECONDS = 14 * 24 * 3600
+
+
+def _matches(subject: str, wanted: str, exact: bool) -> bool:
+    # Both sides are case folded, like Outlook compares subjects
+    return subject == wanted if exact else wanted in subject
+
+
+class WarmCache:
+    """The newest messages of a few folders, by folder name, plus hit and miss counters."""
+
+    def __init__(self, limit: int = PREFETCH_LIMIT, window_seconds: float = PREFETCH_WINDOW_SECONDS):
+        """
+        Args:
+            limit: Newest messages kept per folder name
+            window_seconds: How far back a prefetch reaches
+        """
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._windows: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+
+    def covers(self, folders: List[str]) -> bool:
+        """Return True if every folder has a loaded window."""
+        with self._lock:
+            return all(folder.casefold() in self._windows for folder in folders)
+
+    def is_current(self, folder: str, counts: Dict[str, int]) -> bool:
+        """
+        Return True if the folder's window was loaded when its folders had these counts.
+
+        Args:
+            folder: Folder name
+            counts: {folder id: message count} of every folder with that name, now
+        """
+        with self._lock:
+            window = self._windows.get(folder.casefold())
+        return window is not None and window['counts'] == counts
+
+    def load(self, folder: str, records: List[Dict[str, object]], counts: Dict[str, int], since: float) -> int:
+        """
+        Replace a folder's window.
+
+        Args:
+            folder: Folder name
+            records: Every message of the folders with that name received at or after since
+            counts: {folder id: message count} of those folders when the records were read
+            since: Unix timestamp the records reach back to
+
+        Returns:
+            Number of messages kept
+        """
+        records = sorted(records, key=lambda record: record['received'], reverse=True)
+        if len(records) > self.limit:
+            # Messages received at the cutoff itself may have been dropped with the older ones
+            records = records[:self.limit]
+            cutoff = records[-1]['received']
+        elif len(records) >= sum(counts.values()):
+            # The whole folder is known: nothing older can match
+            cutoff = float('-inf')
+        else:
+            cutoff = since
+        window = {
+            'name': folder,
+            'records': records,
+            'subjects': [str(record['subject'] or '').casefold() for record in records],
+            'cutoff': cutoff,
+            'counts': dict(counts),
+            'loaded_at': time.time(),
+        }
+        with self._lock:
+            self._windows[folder.casefold()] = window
+            self.loads += 1
+        return len(records)
+
+    def drop(self, folders: List[str]):
+        """Forget the windows of folders, e.g. after a reload failed."""
+        with self._lock:
+            for folder in folders:
+                self._windows.pop(folder.casefold(), None)
+
+    def discard(self, outlook_id: int):
+        """Remove a message that could not be opened from every window."""
+        with self._lock:
+            for window in self._windows.values():
+                keep = [position for position, record in enumerate(window['records']) if record['id'] != outlook_id]
+                if len(keep) < len(window['records']):
+                    window['records'] = [window['records'][position] for position in keep]
+                    window['subjects'] = [window['subjects'][position] for position in keep]
+
+    def lookup(self, subject: str, folders: List[str], exact: bool = True, message_id: Optional[str] = None,
+               policy: str = "first") -> Optional[Dict[str, object]]:
+        """
+        Pick the message search_and_open would open, if the windows decide it.
+
+        Args:
+            subject: The subject text searched for
+            folders: Folder names, in priority order
+            exact: If True, match the whole subject; if False, a substring
+            message_id: Internet Message-ID of the wanted message
+            policy: "first" or "newest", as for search_and_open
+
+        Returns:
+            The window's record (id, subject, sender, received, message_id,
+            folder) with 'matched_message_id', or None if a folder has no window
+            or a message outside the windows could change the answer
+        """
+        wanted = (subject or '').casefold()
+        wanted_id = normalize_message_id(message_id)
+        with self._lock:
+            windows = [self._windows.get(folder.casefold()) for folder in folders]
+        if any(window is None for window in windows):
+            return None
+
+        best = None
+        best_by_id = False
+        for window in windows:
+            complete = window['cutoff'] == float('-inf')
+            matches = [record for record, key in zip(window['records'], window['subjects'])
+                       if _matches(key, wanted, exact)]
+            candidate = None
+            by_id = False
+            if wanted_id:
+                candidate = next((record for record in matches if record['message_id'] == wanted_id), None)
+                by_id = candidate is not None
+                if candidate is None:
+                    # The scan prefers a match carrying the Message-ID, however old
+                    if not complete:
+                        return None
+                    candidate = matches[0] if matches else None
+            elif matches:
+                candidate = matches[0]
+            elif not complete:
+                # An older message of this folder may match
+                return None
+
+            if candidate is not None and (best is None or (by_id and not best_by_id)
+                                          or (by_id == best_by_id and candidate['received'] > best['received'])):
+                best, best_by_id = candidate, by_id
+            if policy == "first" and best is not None:
+                break
+
+        if best is None:
+            return None
+        return dict(best, matched_message_id=best_by_id)
+
+    def record(self, hit: bool):
+        """Count one open that consulted the cache."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Return the hit and miss counts, the hit rate and what each window holds."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'loads': self.loads,
+                'folders': {
+                    window['name']: {
+                        'messages': len(window['records']),
+                        'complete': window['cutoff'] == float('-inf'),
+                        'since': None if window['cutoff'] == float('-inf') else window['cutoff'],
+                        'loaded_at': window['loaded_at'],
+                    } for window in self._windows.values()
+                },
+            }
@@ -140,7 +140,7 @@ echo ""
 echo "3. Update Teams app manifest:"
 echo "   - Edit teams-app/manifest.json"
 echo "   - Replace YOUR_BOT_APP_ID_HERE with: $BOT_APP_ID"
-echo "   - Create app package: cd teams-app && zip -r pcp-bot.zip manifest.json color.png outline.png"
+echo "   - Create app package: python3 teams-app/create_placeholder_icons.py"
 echo ""
 echo "4. Install app in Teams:"
 echo "   - Upload pcp-bot.zip to Teams"
@@ -1,98 +1,580 @@
 #!/usr/bin/env python3
 """
-Create placeholder icons for Teams app package.
-This script creates simple colored placeholder icons for testing.
+Create placeholder icons and the pcp-bot.zip package for the Teams app.
+
+Every output is content-addressed: the icons are keyed by a hash of their
+drawing instructions and font, the package by the hashes of manifest.json and
+the icons. Keys are kept in .package-cache.json next to the outputs, which is
+committed with them; an output whose key and file are unchanged is left alone,
+so a run with nothing to do only hashes a few small files. Outputs the cache
+has no entry for (a checkout without it) are adopted as they are, the package
+after checking it holds the current members. Pillow is needed only when an
+icon actually has to be redrawn, and it is never installed from here.
+
+The zip is reproducible: fixed member order, timestamps and permissions, so
+equal inputs give a byte-identical pcp-bot.zip on any machine.
+
+With --tenants, builds one package per tenant instead (see build_tenants()):
+each gets its own bot App ID, name and accent colour in its own directory.
 """
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    print("✅ PIL/Pillow is installed")
-except ImportError:
-    print("❌ PIL/Pillow not installed. Installing...")
-    import subprocess
-    import sys
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
-    from PIL import Image, ImageDraw, ImageFont
-    print("✅ PIL/Pillow installed successfully")
-
-def create_color_icon():
-    """Create 192x192px color icon"""
-    # Create image with Microsoft Teams blue background
-    img = Image.new('RGB', (192, 192), color='#0078D4')
-    draw = ImageDraw.Draw(img)
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+
+CACHE_FILENAME = ".package-cache.json"
+PACKAGE_FILENAME = "pcp-bot.zip"
+MANIFEST_FILENAME = "manifest.json"
+
+# Bumped when the meaning of a cache entry changes
+CACHE_VERSION = 1
+
+# Candidate fonts for the "PCP" caption, first existing one wins
+FONT_PATHS = ["/System/Library/Fonts/Helvetica.ttc"]
+
+# Timestamp of every zip member (the earliest a zip can store)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Drawing instructions of each icon: ImageDraw method, coordinates, keyword arguments.
+# A ("caption", text, options) step draws horizontally centered text.
+ICONS = {
+    "color.png": {
+        # 192x192px, Microsoft Teams blue background, robot (circle head + rectangle body)
+        "mode": "RGB",
+        "size": [192, 192],
+        "background": "#0078D4",
+        "steps": [
+            ["ellipse", [66, 40, 126, 100], {"fill": "#FFFFFF", "outline": "#000000", "width": 2}],  # Head
+            ["ellipse", [80, 60, 90, 70], {"fill": "#000000"}],  # Eyes
+            ["ellipse", [102, 60, 112, 70], {"fill": "#000000"}],
+            ["arc", [76, 70, 116, 90], {"start": 0, "end": 180, "fill": "#000000", "width": 2}],  # Smile
+            ["rectangle", [76, 100, 116, 140], {"fill": "#FFFFFF", "outline": "#000000", "width": 2}],  # Body
+            ["line", [96, 40, 96, 30], {"fill": "#FFFFFF", "width": 2}],  # Antennae
+            ["ellipse", [93, 26, 99, 32], {"fill": "#FFD700"}],
+            ["caption", "PCP", {"y": 150, "size": 20, "fill": "#FFFFFF"}],
+        ],
+    },
+    "outline.png": {
+        # 32x32px, white robot outline on a transparent background
+        "mode": "RGBA",
+        "size": [32, 32],
+        "background": [0, 0, 0, 0],
+        "steps": [
+            ["ellipse", [11, 6, 21, 16], {"outline": "#FFFFFF", "width": 1}],  # Head
+            ["point", [[14, 10], [18, 10]], {"fill": "#FFFFFF"}],  # Eyes
+            ["rectangle", [12, 16, 20, 24], {"outline": "#FFFFFF", "width": 1}],  # Body
+            ["line", [16, 6, 16, 3], {"fill": "#FFFFFF", "width": 1}],  # Antennae
+            ["point", [[16, 2]], {"fill": "#FFFFFF"}],
+        ],
+    },
+}
+
+# Package members, in archive order
+PACKAGE_MEMBERS = [MANIFEST_FILENAME, "color.png", "outline.png"]
 
-    # Draw a simple robot/bot icon (circle head + rectangle body)
-    # Head (circle)
-    draw.ellipse([66, 40, 126, 100], fill='#FFFFFF', outline='#000000', width=2)
 
-    # Eyes
-    draw.ellipse([80, 60, 90, 70], fill='#000000')
-    draw.ellipse([102, 60, 112, 70], fill='#000000')
+def sha256_file(path):
+    """Return the SHA-256 of a file, or None if it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def sha256_json(value):
+    """Return the SHA-256 of a JSON value in canonical form."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def find_font():
+    """Return the caption font path, or None to use Pillow's built-in font."""
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
 
-    # Smile
-    draw.arc([76, 70, 116, 90], start=0, end=180, fill='#000000', width=2)
 
-    # Body (rectangle)
-    draw.rectangle([76, 100, 116, 140], fill='#FFFFFF', outline='#000000', width=2)
+def icon_key(spec, font_path):
+    """Hash everything an icon's pixels depend on: its drawing steps and the caption font."""
+    uses_font = any(step[0] == "caption" for step in spec["steps"])
+    font = (sha256_file(font_path) if font_path else "default") if uses_font else None
+    return sha256_json({"version": CACHE_VERSION, "spec": spec, "font": font})
 
-    # Antennae
-    draw.line([96, 40, 96, 30], fill='#FFFFFF', width=2)
-    draw.ellipse([93, 26, 99, 32], fill='#FFD700')
 
-    # Add text "PCP"
+def spec_key(spec):
+    """Hash an icon's drawing steps alone, which do not depend on the host's fonts."""
+    return sha256_json({"version": CACHE_VERSION, "spec": spec})
+
+
+def import_pillow():
+    """Import Pillow, exiting with an install hint if it is missing."""
     try:
-        font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 20)
-    except:
-        font = ImageFont.load_default()
-
-    # Draw text
-    text_bbox = draw.textbbox((0, 0), "PCP", font=font)
-    text_width = text_bbox[2] - text_bbox[0]
-    text_x = (192 - text_width) // 2
-    draw.text((text_x, 150), "PCP", fill='#FFFFFF', font=font)
-
-    img.save('color.png')
-    print("✅ Created color.png (192x192px)")
-
-def create_outline_icon():
-    """Create 32x32px outline icon"""
-    # Create transparent background
-    img = Image.new('RGBA', (32, 32), color=(0, 0, 0, 0))
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        print("❌ PIL/Pillow is needed to redraw the icons: pip install Pillow", file=sys.stderr)
+        sys.exit(1)
+    return Image, ImageDraw, ImageFont
+
+
+def draw_icon(spec, font_path, mode=None, background=None):
+    """
+    Draw an icon from its spec.
+
+    Args:
+        spec: Entry of ICONS
+        font_path: Caption font (None for Pillow's built-in font)
+        mode, background: Override the spec's, e.g. "RGBA" and (0, 0, 0, 0) to
+                          draw the artwork alone for compositing onto other backgrounds
+
+    Returns:
+        The PIL image
+    """
+    Image, ImageDraw, ImageFont = import_pillow()
+
+    background = spec["background"] if background is None else background
+    if isinstance(background, list):
+        background = tuple(background)
+    img = Image.new(mode or spec["mode"], tuple(spec["size"]), color=background)
     draw = ImageDraw.Draw(img)
 
-    # Draw simple white robot outline
-    # Head
-    draw.ellipse([11, 6, 21, 16], outline='#FFFFFF', width=1)
+    for method, xy, options in spec["steps"]:
+        if method == "caption":
+            try:
+                font = ImageFont.truetype(font_path, options["size"]) if font_path else ImageFont.load_default()
+            except OSError:
+                font = ImageFont.load_default()
+            text_bbox = draw.textbbox((0, 0), xy, font=font)
+            text_x = (spec["size"][0] - (text_bbox[2] - text_bbox[0])) // 2
+            draw.text((text_x, options["y"]), xy, fill=options["fill"], font=font)
+        elif method == "point":
+            draw.point([tuple(p) for p in xy], **options)
+        else:
+            getattr(draw, method)(xy, **options)
+    return img
+
+
+def save_png(img, path):
+    """Save an image as PNG atomically."""
+    # PNG metadata is left out so equal pixels give equal files
+    img.save(path + '.tmp', format='PNG', optimize=True)
+    os.replace(path + '.tmp', path)
+
+
+def render_icon(spec, path, font_path):
+    """Draw an icon from its spec and save it as PNG."""
+    save_png(draw_icon(spec, font_path), path)
+
+
+def write_package(path, members, source_dir='.'):
+    """Write the package zip reproducibly: fixed order, timestamps and permissions."""
+    with zipfile.ZipFile(path + '.tmp', 'w') as archive:
+        for name in members:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            info.create_system = 3
+            with open(os.path.join(source_dir, name), 'rb') as f:
+                archive.writestr(info, f.read(), compresslevel=9)
+    os.replace(path + '.tmp', path)
+
+
+def load_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_cache(path, cache):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(path + '.tmp', path)
+
+
+def is_current(cache, name, key, path=None):
+    """True if name was last built from key and its file (path, default name) is still that build."""
+    entry = cache.get(name)
+    return bool(entry) and entry.get("key") == key and entry.get("sha256") == sha256_file(path or name)
+
+
+def package_holds(path, members, source_dir='.'):
+    """True if the zip at path holds exactly the members, in order, with their current contents."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            if archive.namelist() != list(members):
+                return False
+            return all(hashlib.sha256(archive.read(name)).hexdigest() == sha256_file(os.path.join(source_dir, name))
+                       for name in members)
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def check_manifest():
+    """Fail early on a manifest Teams would reject for the reasons we can see locally."""
+    try:
+        with open(MANIFEST_FILENAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ {MANIFEST_FILENAME} is not valid JSON: {e}", file=sys.stderr)
+        sys.exit(1)
+    icons = manifest.get("icons", {})
+    if icons.get("color") != "color.png" or icons.get("outline") != "outline.png":
+        print(f"❌ {MANIFEST_FILENAME} must reference color.png and outline.png as its icons", file=sys.stderr)
+        sys.exit(1)
+
+
+def build(force=False, check=False, cache_path=CACHE_FILENAME):
+    """
+    Bring the icons and the package up to date.
+
+    Args:
+        force: Rebuild everything, ignoring the cache
+        check: Only report what is out of date, without writing anything
+        cache_path: Where the build keys are kept
+
+    Returns:
+        Names of the outputs that were (or, with check, would be) rebuilt
+    """
+    check_manifest()
+    cache = {} if force else load_cache(cache_path)
+    font_path = find_font()
+    rebuilt = []
+    # Entries recorded without rebuilding anything (adopted or hand-edited files)
+    recorded = False
+
+    for name, spec in ICONS.items():
+        key = icon_key(spec, font_path)
+        entry = cache.get(name) or {}
+        current = sha256_file(name)
+        # The committed icons were drawn on a host with other fonts; same steps, same file is up to date
+        if current is not None and entry.get("sha256") == current and (
+                entry.get("key") == key or entry.get("spec") == spec_key(spec)):
+            print(f"✅ {name} is up to date")
+            continue
+        if current is not None and not force and (not entry or entry.get("key") == key):
+            if entry:
+                # Replaced by hand since it was drawn: package it as it is
+                print(f"✅ {name} was edited by hand, keeping it (--force redraws it)")
+            else:
+                print(f"✅ {name} has no build record, keeping it (--force redraws it)")
+            if not check:
+                cache[name] = {"key": key, "spec": spec_key(spec), "sha256": current}
+                recorded = True
+            continue
+        rebuilt.append(name)
+        if check:
+            print(f"⚠️  {name} is out of date")
+            continue
+        render_icon(spec, name, font_path)
+        cache[name] = {"key": key, "spec": spec_key(spec), "sha256": sha256_file(name)}
+        print(f"✅ Created {name} ({spec['size'][0]}x{spec['size'][1]}px)")
+
+    package_key = sha256_json({"version": CACHE_VERSION,
+                               "members": [[name, sha256_file(name)] for name in PACKAGE_MEMBERS]})
+    if is_current(cache, PACKAGE_FILENAME, package_key):
+        print(f"✅ {PACKAGE_FILENAME} is up to date")
+    elif not force and PACKAGE_FILENAME not in cache and package_holds(PACKAGE_FILENAME, PACKAGE_MEMBERS):
+        print(f"✅ {PACKAGE_FILENAME} has no build record but holds the current files, keeping it")
+        if not check:
+            cache[PACKAGE_FILENAME] = {"key": package_key, "sha256": sha256_file(PACKAGE_FILENAME)}
+            recorded = True
+    else:
+        rebuilt.append(PACKAGE_FILENAME)
+        if check:
+            print(f"⚠️  {PACKAGE_FILENAME} is out of date")
+        else:
+            write_package(PACKAGE_FILENAME, PACKAGE_MEMBERS)
+            cache[PACKAGE_FILENAME] = {"key": package_key, "sha256": sha256_file(PACKAGE_FILENAME)}
+            print(f"✅ Created {PACKAGE_FILENAME} ({', '.join(PACKAGE_MEMBERS)})")
+
+    if (rebuilt or recorded) and not check:
+        save_cache(cache_path, cache)
+    return rebuilt
+
+
+# Tenant fields: id names the output directory, the rest end up in the manifest
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+APP_ID_PATTERN = re.compile(r'^[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$')
+COLOR_PATTERN = re.compile(r'^#[0-9a-fA-F]{6}$')
+
+# Artwork drawn once per batch and shared with the worker processes
+_shared = {}
+
+
+def load_tenants(path):
+    """
+    Read the tenant list: a JSON array of objects with "id" (output directory),
+    "app_id" (bot App ID), "name" (short app name) and "accent_color" ("#RRGGBB"),
+    optionally "full_name" and "package_name".
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tenants = json.load(f)
+    if not isinstance(tenants, list):
+        raise ValueError("the tenant list must be a JSON array")
+    return tenants
+
+
+def tenant_error(tenant, seen):
+    """Return why a tenant entry cannot be built, or None."""
+    if not isinstance(tenant, dict):
+        return "not an object"
+    # The id names the tenant's directory and cache entry, so it has to be a string as given
+    tenant_id = tenant.get("id")
+    if not isinstance(tenant_id, str) or not TENANT_ID_PATTERN.match(tenant_id):
+        return f"invalid id {tenant_id!r} (a string of letters, digits, '.', '_' and '-')"
+    if tenant_id in seen:
+        return f"duplicate id {tenant_id!r}"
+    if not APP_ID_PATTERN.match(str(tenant.get("app_id", ""))):
+        return f"invalid app_id {tenant.get('app_id')!r} (a GUID)"
+    if not tenant.get("name") or len(str(tenant["name"])) > 30:
+        return "name is required and at most 30 characters"
+    if not COLOR_PATTERN.match(str(tenant.get("accent_color", ""))):
+        return f"invalid accent_color {tenant.get('accent_color')!r} (#RRGGBB)"
+    return None
+
+
+def tenant_manifest(base, tenant):
+    """Return the base manifest rewritten for a tenant's App ID, name and accent colour."""
+    manifest = json.loads(json.dumps(base))
+    app_id = tenant["app_id"]
+    manifest["id"] = app_id
+    for bot in manifest.get("bots", []):
+        bot["botId"] = app_id
+    if "webApplicationInfo" in manifest:
+        manifest["webApplicationInfo"]["id"] = app_id
+        manifest["webApplicationInfo"]["resource"] = f"api://botid-{app_id}"
+    manifest["name"] = {"short": tenant["name"], "full": tenant.get("full_name") or manifest["name"]["full"]}
+    manifest["accentColor"] = tenant["accent_color"]
+    if tenant.get("package_name"):
+        manifest["packageName"] = tenant["package_name"]
+    return manifest
+
+
+def _init_worker(artwork_png, outline_png, base_manifest):
+    from PIL import Image
+    import io
+
+    _shared["artwork"] = Image.open(io.BytesIO(artwork_png)).convert("RGBA")
+    _shared["outline_png"] = outline_png
+    _shared["manifest"] = base_manifest
 
-    # Eyes
-    draw.point([(14, 10), (18, 10)], fill='#FFFFFF')
 
-    # Body
-    draw.rectangle([12, 16, 20, 24], outline='#FFFFFF', width=1)
+def _build_tenant(job):
+    """Write one tenant's manifest, icons and package; runs in a worker process."""
+    from PIL import Image
 
-    # Antennae
-    draw.line([16, 6, 16, 3], fill='#FFFFFF', width=1)
-    draw.point([(16, 2)], fill='#FFFFFF')
+    tenant, directory = job
+    started = time.perf_counter()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(tenant_manifest(_shared["manifest"], tenant), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+        # Only the background differs between tenants; the artwork is composited onto it
+        artwork = _shared["artwork"]
+        color = Image.new("RGBA", artwork.size, tenant["accent_color"])
+        color.alpha_composite(artwork)
+        save_png(color.convert("RGB"), os.path.join(directory, "color.png"))
+        with open(os.path.join(directory, "outline.png"), 'wb') as f:
+            f.write(_shared["outline_png"])
+
+        package = os.path.join(directory, PACKAGE_FILENAME)
+        write_package(package, PACKAGE_MEMBERS, directory)
+        return {"id": tenant["id"], "seconds": time.perf_counter() - started, "sha256": sha256_file(package)}
+    except (OSError, ValueError) as e:
+        return {"id": tenant["id"], "seconds": time.perf_counter() - started, "error": str(e)}
+    except Exception as e:
+        # Anything else is still this tenant's failure, not the batch's
+        return {"id": tenant["id"], "seconds": time.perf_counter() - started, "error": f"{type(e).__name__}: {e}"}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def build_tenants(tenants_path, out_dir, jobs=None, force=False, check=False):
+    """
+    Build one package per tenant into out_dir/<tenant id>/ using a process pool.
+
+    The shared artwork (the robot and caption of color.png, and outline.png,
+    which is the same for every tenant) is drawn once and handed to the
+    workers, which only fill in each tenant's background, manifest and zip.
+    Tenants are content-addressed like single builds: one whose entry, base
+    manifest and artwork are unchanged since its last build is skipped.
+
+    Args:
+        tenants_path: Tenant list (see load_tenants())
+        out_dir: Directory receiving one subdirectory per tenant
+        jobs: Worker processes (default: one per CPU)
+        force: Rebuild every tenant regardless of the cache
+        check: Only mark the tenants that would be built as stale; build nothing
+
+    Returns:
+        The batch summary: counts, timings and per-tenant results
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    started = time.perf_counter()
+    check_manifest()
+    with open(MANIFEST_FILENAME, 'r', encoding='utf-8') as f:
+        base_manifest = json.load(f)
+    tenants = load_tenants(tenants_path)
+
+    if not check:
+        os.makedirs(out_dir, exist_ok=True)
+    cache_path = os.path.join(out_dir, CACHE_FILENAME)
+    cache = {} if force else load_cache(cache_path)
+    font_path = find_font()
+    artwork_key = sha256_json([icon_key(spec, font_path) for spec in ICONS.values()])
+
+    results = [None] * len(tenants)
+    pending = []
+    seen = set()
+    for position, tenant in enumerate(tenants):
+        error = tenant_error(tenant, seen)
+        if error:
+            results[position] = {"id": tenant.get("id") if isinstance(tenant, dict) else position, "error": error}
+            continue
+        seen.add(tenant["id"])
+        key = sha256_json({"version": CACHE_VERSION, "tenant": tenant, "manifest": base_manifest,
+                           "artwork": artwork_key})
+        directory = os.path.join(out_dir, tenant["id"])
+        if is_current(cache, tenant["id"], key, os.path.join(directory, PACKAGE_FILENAME)):
+            results[position] = {"id": tenant["id"], "skipped": True}
+            continue
+        if check:
+            results[position] = {"id": tenant["id"], "stale": True}
+            continue
+        pending.append((position, tenant, directory, key))
+
+    render_seconds = 0.0
+    if pending:
+        import io
+
+        render_started = time.perf_counter()
+        # The color icon's artwork on a transparent background; each tenant supplies the background
+        artwork = io.BytesIO()
+        draw_icon(ICONS["color.png"], font_path, mode="RGBA", background=(0, 0, 0, 0)).save(artwork, format='PNG')
+        outline = io.BytesIO()
+        draw_icon(ICONS["outline.png"], font_path).save(outline, format='PNG', optimize=True)
+        render_seconds = time.perf_counter() - render_started
+
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(artwork.getvalue(), outline.getvalue(), base_manifest)) as pool:
+            futures = [pool.submit(_build_tenant, (tenant, directory)) for _, tenant, directory, _ in pending]
+            for (position, tenant, _, key), future in zip(pending, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker died or the job could not be sent to it
+                    result = {"id": tenant["id"], "error": f"{type(e).__name__}: {e}"}
+                if "error" not in result:
+                    cache[tenant["id"]] = {"key": key, "sha256": result["sha256"]}
+                results[position] = result
+        save_cache(cache_path, cache)
+
+    build_seconds = [r["seconds"] for r in results if "seconds" in r and "error" not in r]
+    return {
+        "tenants": len(tenants),
+        "built": len(build_seconds),
+        "skipped": sum(1 for r in results if r.get("skipped")),
+        "stale": sum(1 for r in results if r.get("stale")),
+        "failed": sum(1 for r in results if "error" in r),
+        "jobs": jobs if pending else 0,
+        "render_seconds": round(render_seconds, 4),
+        "tenant_seconds": {"p50": round(_percentile(build_seconds, 0.5), 4),
+                           "p95": round(_percentile(build_seconds, 0.95), 4),
+                           "max": round(max(build_seconds, default=0.0), 4)},
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "results": results,
+    }
 
-    img.save('outline.png')
-    print("✅ Created outline.png (32x32px)")
 
 if __name__ == '__main__':
-    import os
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create the Teams app icons and pcp-bot.zip, "
+                                                 "rebuilding only what changed")
+    parser.add_argument('--force', action='store_true',
+                        help='Redraw the icons and rebuild the package regardless of the cache')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report what is out of date (with --tenants, which tenants); exit 1 if anything is')
+    parser.add_argument('--cache', type=str, default=None,
+                        help=f'Build cache file (default: {CACHE_FILENAME} next to this script)')
+    parser.add_argument('--tenants', type=str, default=None,
+                        help='JSON tenant list; build one package per tenant instead (see load_tenants())')
+    parser.add_argument('--out-dir', type=str, default='build/tenants',
+                        help='With --tenants, where the per-tenant directories go (default: build/tenants)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='With --tenants, worker processes (default: one per CPU)')
+    parser.add_argument('--summary', type=str, default=None,
+                        help='With --tenants, also write the batch summary as JSON to this file')
+    args = parser.parse_args()
+    cache_path = os.path.abspath(args.cache) if args.cache else None
+    tenants_path = os.path.abspath(args.tenants) if args.tenants else None
+    out_dir = os.path.abspath(args.out_dir)
+    summary_path = os.path.abspath(args.summary) if args.summary else None
 
     # Change to the directory where this script is located
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-    print("🎨 Creating placeholder icons for Teams app...")
+    if tenants_path:
+        print(f"🎨 {'Checking' if args.check else 'Building'} tenant packages in {out_dir}...")
+        print()
+        try:
+            summary = build_tenants(tenants_path, out_dir, jobs=args.jobs, force=args.force, check=args.check)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not read the tenant list: {e}", file=sys.stderr)
+            sys.exit(1)
+        for result in summary["results"]:
+            if "error" in result:
+                print(f"❌ {result['id']}: {result['error']}")
+            elif result.get("stale"):
+                print(f"⚠️  {result['id']} is out of date")
+        if args.check:
+            print(f"{summary['stale']} out of date, {summary['skipped']} up to date, {summary['failed']} invalid "
+                  f"of {summary['tenants']} tenants")
+            sys.exit(1 if summary["stale"] or summary["failed"] else 0)
+        print(f"✅ {summary['built']} built, {summary['skipped']} up to date, {summary['failed']} failed "
+              f"of {summary['tenants']} tenants in {summary['total_seconds']:.2f}s")
+        timings = summary['tenant_seconds']
+        if summary['built']:
+            print(f"   Artwork drawn once in {summary['render_seconds'] * 1000:.1f}ms; per tenant "
+                  f"p50 {timings['p50'] * 1000:.1f}ms, p95 {timings['p95'] * 1000:.1f}ms on {summary['jobs']} workers")
+        if summary_path:
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+        sys.exit(1 if summary["failed"] else 0)
+
+    print("🎨 Building the Teams app package...")
     print()
 
-    create_color_icon()
-    create_outline_icon()
+    rebuilt = build(force=args.force, check=args.check, cache_path=cache_path or CACHE_FILENAME)
 
     print()
-    print("✅ Icons created successfully!")
-    print()
-    print("📝 Next steps:")
-    print("1. Update manifest.json with your Bot App ID")
-    print("2. Run: zip -r pcp-bot.zip manifest.json color.png outline.png")
-    print("3. Upload pcp-bot.zip to Microsoft Teams")
+    if args.check:
+        sys.exit(1 if rebuilt else 0)
+    if not rebuilt:
+        print("✅ Nothing to do, package is up to date")
+    else:
+        print("✅ Package built successfully!")
+        print()
+        print("📝 Next steps:")
+        print("1. Update manifest.json with your Bot App ID (then run this again)")
+        print(f"2. Upload {PACKAGE_FILENAME} to Microsoft Teams")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Build cache of create_placeholder_icons.py
+Covers what a build leaves alone (committed outputs, outputs without a build
+record, hand-edited icons), what it rebuilds when an input changes, and the
+reproducible package. Runs without Pillow: no test needs an icon redrawn.
+
+Usage:
+    python3 -m unittest discover -s tests
+"""
+
+import contextlib
+import copy
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TEAMS_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TEAMS_APP)
+
+import create_placeholder_icons as icons  # noqa: E402
+
+OUTPUTS = [icons.MANIFEST_FILENAME, "color.png", "outline.png", icons.PACKAGE_FILENAME, icons.CACHE_FILENAME]
+
+
+class BuildCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        # A copy of the committed outputs, as a fresh checkout has them
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name in OUTPUTS:
+            shutil.copy(os.path.join(TEAMS_APP, name), self.directory)
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.addCleanup(os.chdir, cwd)
+
+    def build(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return icons.build(**options)
+
+    def test_committed_outputs_are_up_to_date_on_any_host(self):
+        self.assertEqual(self.build(check=True), [])
+        self.assertEqual(self.build(), [])
+
+    def test_outputs_without_a_build_record_are_adopted(self):
+        os.unlink(icons.CACHE_FILENAME)
+        self.assertEqual(self.build(check=True), [])
+        self.assertFalse(os.path.exists(icons.CACHE_FILENAME), '--check writes nothing')
+
+        self.assertEqual(self.build(), [])
+        self.assertEqual(sorted(icons.load_cache(icons.CACHE_FILENAME)),
+                         ["color.png", "outline.png", icons.PACKAGE_FILENAME])
+
+    def test_a_changed_manifest_rebuilds_only_the_package_reproducibly(self):
+        package = icons.sha256_file(icons.PACKAGE_FILENAME)
+        with open(icons.MANIFEST_FILENAME, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        self.assertEqual(self.build(check=True), [icons.PACKAGE_FILENAME])
+        self.assertEqual(icons.sha256_file(icons.PACKAGE_FILENAME), package)
+
+        self.assertEqual(self.build(), [icons.PACKAGE_FILENAME])
+        self.assertTrue(icons.package_holds(icons.PACKAGE_FILENAME, icons.PACKAGE_MEMBERS))
+        rebuilt = icons.sha256_file(icons.PACKAGE_FILENAME)
+        self.assertNotEqual(rebuilt, package)
+        self.assertEqual(self.build(), [])
+
+        icons.write_package('again.zip', icons.PACKAGE_MEMBERS)
+        self.assertEqual(icons.sha256_file('again.zip'), rebuilt)
+
+    def test_a_hand_edited_icon_is_kept_and_packaged(self):
+        with open("outline.png", 'ab') as f:
+            f.write(b'\0')
+        self.assertEqual(self.build(check=True), [icons.PACKAGE_FILENAME])
+        self.assertEqual(self.build(), [icons.PACKAGE_FILENAME])
+        self.assertTrue(icons.package_holds(icons.PACKAGE_FILENAME, icons.PACKAGE_MEMBERS))
+
+    def test_a_changed_drawing_redraws_the_icon(self):
+        spec = copy.deepcopy(icons.ICONS)
+        spec["outline.png"]["background"] = [0, 0, 0, 255]
+        with mock.patch.object(icons, 'ICONS', spec):
+            self.assertEqual(self.build(check=True), ["outline.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()